@@ -3,12 +3,13 @@ from datetime import datetime
 from typing import Annotated
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.logger import logger
-from app.db.session import get_db
+from app.db.session import async_session_maker, get_db, get_read_db, is_replica
+from app.db.pagination import NEXT_CURSOR_HEADER, next_cursor, paginate
 from app.api.v1.auth import get_current_user
 from app.models import User, MatchAnalysis, ChatMessage, SubscriptionType
 from app.schemas import (
@@ -22,10 +23,13 @@ from app.schemas import (
     ChatMessageResponse,
     ChatHistoryResponse
 )
-from app.services import cache_service, CACHE_TTL
+from app.services import cache_service, CACHE_TTL, chat_answer_cache
+from app.services.chat_memory import chat_memory_service
 from app.services.analysis import check_analysis_limit, calculate_value_bet, MatchAnalyzer
+from app.services.stats import prediction_stats_service
 from app.providers import get_football_provider, get_ai_provider
 from app.providers.base import BaseFootballProvider, BaseAIProvider
+from app.providers.ai.prompt_builder import estimate_tokens
 
 router = APIRouter(prefix="/analyze", tags=["Analysis"])
 
@@ -126,19 +130,38 @@ async def analyze_match(
 @router.get("/history", response_model=list[MatchAnalysisListResponse])
 async def get_analysis_history(
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-    limit: int = 20,
-    offset: int = 0
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    offset: int = Query(0, ge=0, deprecated=True)
 ):
-    """Get user's analysis history."""
+    """Get user's analysis history (next page cursor in the X-Next-Cursor header)."""
     result = await db.execute(
-        select(MatchAnalysis)
-        .where(MatchAnalysis.user_id == current_user.id)
-        .order_by(MatchAnalysis.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+        paginate(
+            select(
+                MatchAnalysis.id,
+                MatchAnalysis.home_team,
+                MatchAnalysis.away_team,
+                MatchAnalysis.league_name,
+                MatchAnalysis.match_date,
+                MatchAnalysis.predicted_outcome,
+                MatchAnalysis.confidence_score,
+                MatchAnalysis.was_correct,
+                MatchAnalysis.created_at
+            ).where(MatchAnalysis.user_id == current_user.id),
+            MatchAnalysis.created_at,
+            MatchAnalysis.id,
+            limit,
+            cursor=cursor,
+            offset=offset
+        )
     )
-    analyses = result.scalars().all()
+    analyses = result.all()
+    
+    cursor = next_cursor(analyses, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
     return [
         MatchAnalysisListResponse(
@@ -152,15 +175,32 @@ async def get_analysis_history(
             was_correct=a.was_correct,
             created_at=a.created_at
         )
-        for a in analyses
+        for a in analyses[:limit]
     ]
 
 
+@router.get("/accuracy", response_model=dict)
+async def get_prediction_accuracy(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    scope: str = Query("global", pattern="^(global|league|model)$"),
+    min_predictions: int = Query(1, ge=1),
+    limit: int = Query(50, ge=1, le=200)
+):
+    """Accuracy of the settled predictions: overall (with calibration), per league or per model."""
+    if scope == "global":
+        return {"scope": scope, "stats": await prediction_stats_service.get(db, "global")}
+    return {
+        "scope": scope,
+        "stats": await prediction_stats_service.list(db, scope, min_predictions=min_predictions, limit=limit)
+    }
+
+
 @router.get("/{analysis_id}", response_model=MatchAnalysisResponse)
 async def get_analysis(
     analysis_id: uuid.UUID,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_read_db)]
 ):
     """Get a specific analysis."""
     logger.info(
@@ -171,14 +211,16 @@ async def get_analysis(
         }}
     )
     
-    result = await db.execute(
-        select(MatchAnalysis)
-        .where(
-            MatchAnalysis.id == str(analysis_id),
-            MatchAnalysis.user_id == current_user.id
-        )
+    query = select(MatchAnalysis).where(
+        MatchAnalysis.id == str(analysis_id),
+        MatchAnalysis.user_id == current_user.id
     )
-    analysis = result.scalar_one_or_none()
+    analysis = (await db.execute(query)).scalar_one_or_none()
+    
+    if not analysis and is_replica(db):
+        # Analyse tout juste créée, pas encore répliquée
+        async with async_session_maker() as primary_db:
+            analysis = (await primary_db.execute(query)).scalar_one_or_none()
     
     if not analysis:
         logger.warning(
@@ -227,7 +269,8 @@ async def chat_about_match(
     chat_req: ChatMessageCreate,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
-    ai_service: AIProvider
+    ai_service: AIProvider,
+    background_tasks: BackgroundTasks
 ):
     """Ask a follow-up question about a match analysis (Pro/Lifetime only)."""
     
@@ -253,27 +296,35 @@ async def chat_about_match(
             detail="Analyse non trouvée."
         )
         
-    # Get chat history
-    history_result = await db.execute(
-        select(ChatMessage)
-        .where(ChatMessage.analysis_id == analysis_id)
-        .order_by(ChatMessage.created_at.asc())
-    )
-    history = history_result.scalars().all()
+    # Conversation memory: rolling summary + recent messages (bounded prompt)
+    memory_summary, history = await chat_memory_service.load(db, str(analysis.id))
     
-    # Call AI
-    ai_response = await ai_service.chat_analysis(
-        analysis_summary=analysis.summary,
-        history=history,
-        user_question=chat_req.content
-    )
+    # Réponse déjà générée pour une question similaire (même analyse, ou même match
+    # et même pronostic) ; seulement en début de conversation, sans contexte antérieur
+    ai_response, question_vector = None, None
+    prediction = (analysis.prediction_home, analysis.prediction_draw, analysis.prediction_away)
+    if not history and not memory_summary:
+        ai_response, question_vector = await chat_answer_cache.lookup(
+            chat_req.content, str(analysis.id), analysis.fixture_id, prediction
+        )
+    
+    if ai_response is None:
+        # Call AI
+        ai_response = await ai_service.chat_analysis(
+            analysis_summary=analysis.summary,
+            history=history,
+            user_question=chat_req.content,
+            memory_summary=memory_summary
+        )
+        chat_answer_cache.store(question_vector, ai_response, str(analysis.id), analysis.fixture_id, prediction)
     
     # Save user message
     user_msg = ChatMessage(
         analysis_id=analysis_id,
         user_id=current_user.id,
         role="user",
-        content=chat_req.content
+        content=chat_req.content,
+        token_count=estimate_tokens(chat_req.content)
     )
     db.add(user_msg)
     
@@ -282,13 +333,25 @@ async def chat_about_match(
         analysis_id=analysis_id,
         user_id=current_user.id,
         role="assistant",
-        content=ai_response
+        content=ai_response,
+        token_count=estimate_tokens(ai_response)
     )
     db.add(assistant_msg)
     
     await db.commit()
     await db.refresh(assistant_msg)
     
+    chat_memory_service.record_turn(
+        str(analysis.id),
+        analysis.summary,
+        memory_summary,
+        history,
+        user_msg.token_count,
+        assistant_msg.token_count
+    )
+    # Replier les anciens messages dans le résumé après la réponse
+    background_tasks.add_task(chat_memory_service.update, str(analysis.id))
+    
     return assistant_msg
 
 
@@ -296,7 +359,7 @@ async def chat_about_match(
 async def get_chat_history(
     analysis_id: uuid.UUID,
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_read_db)]
 ):
     """Get the chat history for a specific analysis."""
     # Check if analysis belongs to user
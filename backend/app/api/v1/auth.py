@@ -7,16 +7,19 @@ from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
 from app.core.logger import get_logger
 from app.core.security import (
-    verify_password,
-    get_password_hash,
+    hash_password,
+    verify_and_update_password,
     create_access_token,
     create_refresh_token,
     decode_access_token
 )
-from app.models import User, MatchAnalysis, Coupon
+from app.models import User
+from app.services.analysis_quota import analysis_quota_service
+from app.services.user_cache import user_cache
+from app.services.user_stats import user_stats_service
 from app.schemas import (
     UserCreate, UserLogin, UserResponse, Token, RefreshTokenRequest,
     VerifyOTP, UserUpdate, PasswordChange, 
@@ -65,11 +68,15 @@ async def get_current_user(
     except ValueError:
         raise credentials_exception
     
-    result = await db.execute(select(User).where(User.id == user_uuid))
-    user = result.scalar_one_or_none()
-    
+    # Snapshot en cache : la plupart des requêtes s'authentifient sans la base
+    user = await user_cache.get(user_uuid)
     if user is None:
-        raise credentials_exception
+        result = await db.execute(select(User).where(User.id == user_uuid))
+        user = result.scalar_one_or_none()
+        
+        if user is None:
+            raise credentials_exception
+        await user_cache.set(user)
     
     if not user.is_active:
         raise HTTPException(
@@ -80,6 +87,26 @@ async def get_current_user(
     return user
 
 
+async def get_current_user_for_update(
+    current_user: Annotated[User, Depends(get_current_user)],
+    db: Annotated[AsyncSession, Depends(get_db)]
+) -> User:
+    """
+    Live row of the current user, attached to the request session: for
+    endpoints modifying the user or reading its credentials (the user
+    returned by `get_current_user` may be a detached cached snapshot).
+    Callers invalidate the snapshot after committing.
+    """
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def register(
     user_data: UserCreate,
@@ -111,7 +138,7 @@ async def register(
         otp_code = generate_otp()
         user = User(
             email=user_data.email,
-            hashed_password=get_password_hash(user_data.password),
+            hashed_password=await hash_password(user_data.password),
             full_name=user_data.full_name,
             is_verified=False,
             otp_code=otp_code,
@@ -184,6 +211,7 @@ async def verify_otp(
     user.otp_code = None
     user.otp_expires_at = None
     await db.commit()
+    await user_cache.invalidate(user.id)
     
     return user
 
@@ -241,7 +269,8 @@ async def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    if not verify_password(form_data.password, user.hashed_password):
+    password_valid, new_hash = await verify_and_update_password(form_data.password, user.hashed_password)
+    if not password_valid:
         logger.log_auth(
             'login_failed',
             user_id=str(user.id),
@@ -261,6 +290,10 @@ async def login(
     # Update last login
     user.last_login_at = datetime.utcnow()
     
+    # Hash with an outdated cost factor: replaced while the password is known
+    if new_hash:
+        user.hashed_password = new_hash
+    
     # Create tokens
     access_token = create_access_token(data={"sub": str(user.id)})
     refresh_token = create_refresh_token(data={"sub": str(user.id)})
@@ -268,6 +301,7 @@ async def login(
     # Store refresh token in database
     user.refresh_token = refresh_token
     await db.commit()
+    await user_cache.invalidate(user.id)
     
     logger.log_auth(
         'login_success',
@@ -295,7 +329,10 @@ async def get_me(
     current_user: Annotated[User, Depends(get_current_user)]
 ):
     """Get current user profile."""
-    return current_user
+    # Compteur du jour tenu dans Redis (recopié en base en différé)
+    return UserResponse.model_validate(current_user).model_copy(
+        update={"daily_analyses_used": await analysis_quota_service.used(current_user)}
+    )
 
 
 @router.post("/refresh", response_model=Token)
@@ -375,7 +412,7 @@ async def refresh_token(
 @router.put("/me", response_model=UserResponse)
 async def update_profile(
     data: UserUpdate,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_for_update)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Update user profile information."""
@@ -390,21 +427,24 @@ async def update_profile(
         
     await db.commit()
     await db.refresh(current_user)
+    await user_cache.invalidate(current_user.id)
     return current_user
 
 
 @router.put("/me/password")
 async def change_password(
     data: PasswordChange,
-    current_user: Annotated[User, Depends(get_current_user)],
+    current_user: Annotated[User, Depends(get_current_user_for_update)],
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Change user password."""
-    if not verify_password(data.current_password, current_user.hashed_password):
+    password_valid, _ = await verify_and_update_password(data.current_password, current_user.hashed_password)
+    if not password_valid:
         raise HTTPException(status_code=400, detail="Incorrect current password")
         
-    current_user.hashed_password = get_password_hash(data.new_password)
+    current_user.hashed_password = await hash_password(data.new_password)
     await db.commit()
+    await user_cache.invalidate(current_user.id)
     return {"message": "Password updated successfully"}
 
 
@@ -444,11 +484,12 @@ async def reset_password_with_otp(
     if user.otp_code != data.otp_code or user.otp_expires_at < datetime.utcnow():
         raise HTTPException(status_code=400, detail="Invalid or expired OTP code")
         
-    user.hashed_password = get_password_hash(data.new_password)
+    user.hashed_password = await hash_password(data.new_password)
     user.otp_code = None
     user.otp_expires_at = None
     user.is_verified = True # Resetting password with OTP also verifies user
     await db.commit()
+    await user_cache.invalidate(user.id)
     
     return {"message": "Password has been reset successfully."}
 
@@ -456,46 +497,7 @@ async def reset_password_with_otp(
 @router.get("/me/stats")
 async def get_user_stats(
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)]
+    db: Annotated[AsyncSession, Depends(get_read_db)]
 ):
-    """Get statistics for the current user's dashboard."""
-    # Count analyses
-    analyses_count_result = await db.execute(
-        select(MatchAnalysis).where(MatchAnalysis.user_id == current_user.id)
-    )
-    analyses = analyses_count_result.scalars().all()
-    total_analyses = len(analyses)
-    
-    # Calculate success rate
-    correct_analyses = sum(1 for a in analyses if a.was_correct is True)
-    success_rate = (correct_analyses / total_analyses * 100) if total_analyses > 0 else 0
-    
-    # Count coupons
-    coupons_result = await db.execute(
-        select(Coupon).where(Coupon.user_id == current_user.id)
-    )
-    coupons = coupons_result.scalars().all()
-    total_coupons = len(coupons)
-    validated_coupons = sum(1 for c in coupons if c.status == "won")
-    
-    # Get recent analyses
-    recent_analyses = sorted(analyses, key=lambda x: x.created_at, reverse=True)[:5]
-    
-    return {
-        "total_analyses": total_analyses,
-        "success_rate": round(success_rate, 1),
-        "total_coupons": total_coupons,
-        "validated_coupons": validated_coupons,
-        "recent_analyses": [
-            {
-                "id": str(a.id),
-                "home_team": a.home_team,
-                "away_team": a.away_team,
-                "league_name": a.league_name,
-                "predicted_outcome": a.predicted_outcome,
-                "confidence_score": a.confidence_score,
-                "created_at": a.created_at.isoformat()
-            }
-            for a in recent_analyses
-        ]
-    }
+    """Get statistics for the current user's dashboard (counters, accuracy rollup, cached)."""
+    return await user_stats_service.get_stats(db, current_user.id)
@@ -2,12 +2,13 @@ from datetime import datetime
 from typing import Annotated
 import uuid
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy import select
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response, status
+from sqlalchemy import select, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
-from app.db.session import get_db
+from app.db.session import get_db, get_read_db
+from app.db.pagination import NEXT_CURSOR_HEADER, next_cursor, paginate
 from app.api.v1.auth import get_current_user
 from app.models.user import User
 from app.models.coupon import Coupon, CouponSelection, CouponType, CouponStatus, RiskLevel
@@ -20,6 +21,9 @@ from app.schemas.coupon import (
 from app.providers import get_ai_provider
 from app.providers.base import BaseAIProvider
 from app.core.logger import get_logger
+from app.services.analysis.coupon_analyzer import coupon_analyzer
+from app.services.analysis.daily_coupons import daily_coupon_generator
+from app.services.user_stats import user_stats_service
 
 logger = get_logger("api.coupons")
 router = APIRouter(prefix="/coupons", tags=["Coupons"])
@@ -43,7 +47,8 @@ async def create_coupon(
     coupon_data: CouponCreate,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
-    ai_service: AIProvider
+    ai_service: AIProvider,
+    background_tasks: BackgroundTasks
 ):
     """Create and analyze a new coupon."""
     # Calculate total odds
@@ -64,76 +69,30 @@ async def create_coupon(
             detail="Invalid total odds calculation"
         )
     
-    # Calculate probabilities for each selection
-    selections = []
-    combined_probability = 1.0
-    weak_points = []
+    # Probabilités des sélections (analyses existantes, modèle, marché) et simulation jointe,
+    # sans attendre le LLM : le récit vient du cache ou est généré en arrière-plan
+    selections_data = [sel.model_dump() for sel in coupon_data.selections]
+    evaluation = await coupon_analyzer.evaluate(db, selections_data)
+    ai_coupon_analysis = evaluation["analysis"]
+    combined_probability = evaluation["simulation"]["success_probability"]
     
-    for i, sel in enumerate(coupon_data.selections):
-        implied_prob = 1 / sel.odds
-        
-        # AI probability estimation (simplified - could use full analysis)
-        ai_prob = implied_prob * 1.1  # Slight adjustment
-        ai_prob = min(ai_prob, 0.95)  # Cap at 95%
-        
-        edge = ai_prob - implied_prob
-        combined_probability *= ai_prob
-        
-        # Identify weak points (low probability selections)
-        if ai_prob < 0.45:
-            weak_points.append(f"{sel.home_team} vs {sel.away_team}: {sel.selection_type}")
-        
-        # Create CouponSelection for each match
-        selection = CouponSelection(
+    selections = [
+        CouponSelection(
             fixture_id=sel.fixture_id,
             home_team=sel.home_team,
             away_team=sel.away_team,
             match_date=sel.match_date,
             selection_type=sel.selection_type,
             odds=sel.odds,
-            implied_probability=implied_prob,
-            ai_probability=ai_prob,
-            edge=edge
+            implied_probability=leg["implied_probability"],
+            ai_probability=leg["ai_probability"],
+            edge=leg["edge"]
         )
-        selections.append(selection)
-    
-    # Store weak points after loop completes
-    coupon_base_weak_points = weak_points
-    
-
-    # Determine risk level from AI if possible, otherwise use fallback logic
-    # AI PROBABILITY ENRICHMENT
-    matches_for_ai = [
-        {
-            "home_team": s.home_team,
-            "away_team": s.away_team,
-            "selection_type": s.selection_type,
-            "odds": s.odds
-        }
-        for s in coupon_data.selections
+        for sel, leg in zip(coupon_data.selections, evaluation["legs"])
     ]
     
-    ai_coupon_analysis = await ai_service.analyze_coupon(matches_for_ai)
-    
-    # Update combined probability if AI provides it
-    if "overall_probability" in ai_coupon_analysis:
-        combined_probability = ai_coupon_analysis["overall_probability"]
-    
     # Determine risk level
     risk_level = calculate_risk_level(combined_probability, len(selections))
-    if "risk_score" in ai_coupon_analysis:
-        # Map AI risk score (0-1) to our risk levels
-        if ai_coupon_analysis["risk_score"] < 0.3:
-            risk_level = RiskLevel.LOW.value
-        elif ai_coupon_analysis["risk_score"] < 0.6:
-            risk_level = RiskLevel.MEDIUM.value
-        elif ai_coupon_analysis["risk_score"] < 0.85:
-            risk_level = RiskLevel.HIGH.value
-        else:
-            risk_level = RiskLevel.EXTREME.value
-
-    # Generate AI recommendation
-    rec = ai_coupon_analysis.get("recommendation", "Coupon analysé par IA.")
     
     # Create coupon
     coupon = Coupon(
@@ -142,9 +101,10 @@ async def create_coupon(
         total_odds=round(total_odds, 2),
         success_probability=round(combined_probability, 4),
         risk_level=risk_level,
-        ai_recommendation=rec,
-        weak_points=coupon_base_weak_points[:3],  # Core weak points
+        ai_recommendation=ai_coupon_analysis["recommendation"],
+        weak_points=evaluation["weak_points"][:3],  # Core weak points
         ai_analysis=ai_coupon_analysis,
+        selections_count=len(selections),
         created_at=datetime.utcnow()
     )
     
@@ -154,11 +114,16 @@ async def create_coupon(
     coupon.selections = selections
     
     db.add(coupon)
+    await user_stats_service.increment(db, current_user.id, coupons_count=1)
     await db.commit()
+    await user_stats_service.invalidate(current_user.id)
     
     # Refresh with eager loading of selections to avoid lazy loading issues
     await db.refresh(coupon, attribute_names=["selections"])
     
+    if ai_coupon_analysis["narrative_pending"]:
+        background_tasks.add_task(coupon_analyzer.generate_narrative, ai_service, selections_data, coupon.id)
+    
     return CouponResponse(
         id=coupon.id,
         user_id=coupon.user_id,
@@ -201,11 +166,14 @@ async def get_daily_coupons(
     db: Annotated[AsyncSession, Depends(get_db)]
 ):
     """Get daily AI-generated coupons (Safe, Balanced, Ambitious)."""
-    # In a real app, these would be pre-generated by a background task
-    # For now, we'll return a mock or fetch existing ones of type DAILY_*
+    # Pré-générés chaque matin par la tâche `generate_daily_coupons`
+    cached = await daily_coupon_generator.get_cached()
+    if cached:
+        return [CouponListResponse(**c) for c in cached]
+    
     result = await db.execute(
         select(Coupon)
-        .where(Coupon.coupon_type.like("daily_%"))
+        .where(Coupon.coupon_type.like("daily_%"), Coupon.user_id.is_(None))
         .options(selectinload(Coupon.selections))
         .order_by(Coupon.created_at.desc())
         .limit(3)
@@ -229,20 +197,37 @@ async def get_daily_coupons(
 @router.get("/", response_model=list[CouponListResponse])
 async def list_coupons(
     current_user: Annotated[User, Depends(get_current_user)],
-    db: Annotated[AsyncSession, Depends(get_db)],
-    limit: int = 20,
-    offset: int = 0
+    db: Annotated[AsyncSession, Depends(get_read_db)],
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    offset: int = Query(0, ge=0, deprecated=True)
 ):
-    """List user's coupons."""
+    """List user's coupons (next page cursor in the X-Next-Cursor header)."""
     result = await db.execute(
-        select(Coupon)
-        .where(Coupon.user_id == current_user.id)
-        .options(selectinload(Coupon.selections))
-        .order_by(Coupon.created_at.desc())
-        .limit(limit)
-        .offset(offset)
+        paginate(
+            select(
+                Coupon.id,
+                Coupon.coupon_type,
+                Coupon.total_odds,
+                Coupon.success_probability,
+                Coupon.risk_level,
+                Coupon.status,
+                Coupon.selections_count,
+                Coupon.created_at
+            ).where(Coupon.user_id == current_user.id),
+            Coupon.created_at,
+            Coupon.id,
+            limit,
+            cursor=cursor,
+            offset=offset
+        )
     )
-    coupons = result.scalars().all()
+    coupons = result.all()
+    
+    cursor = next_cursor(coupons, limit)
+    if cursor:
+        response.headers[NEXT_CURSOR_HEADER] = cursor
     
     return [
         CouponListResponse(
@@ -252,10 +237,10 @@ async def list_coupons(
             success_probability=c.success_probability,
             risk_level=c.risk_level,
             status=c.status,
-            selections_count=len(c.selections),
+            selections_count=c.selections_count,
             created_at=c.created_at
         )
-        for c in coupons
+        for c in coupons[:limit]
     ]
 
 
@@ -284,7 +269,8 @@ async def get_coupon(
         select(Coupon)
         .where(
             Coupon.id == str(coupon_id),
-            Coupon.user_id == current_user.id
+            # Coupons du jour (sans propriétaire) visibles par tous
+            or_(Coupon.user_id == current_user.id, Coupon.user_id.is_(None))
         )
         .options(selectinload(Coupon.selections))
     )
@@ -339,7 +325,8 @@ async def reanalyze_coupon(
     coupon_id: uuid.UUID,
     current_user: Annotated[User, Depends(get_current_user)],
     db: Annotated[AsyncSession, Depends(get_db)],
-    ai_service: AIProvider
+    ai_service: AIProvider,
+    background_tasks: BackgroundTasks
 ):
     """Relancer l'analyse IA d'un coupon existant."""
     logger.info(f"🔄 Relaunching AI analysis for coupon {coupon_id}")
@@ -362,9 +349,9 @@ async def reanalyze_coupon(
             detail="Coupon not found"
         )
     
-    # Préparer les données pour l'IA
-    matches_for_ai = [
+    selections_data = [
         {
+            "fixture_id": s.fixture_id,
             "home_team": s.home_team,
             "away_team": s.away_team,
             "selection_type": s.selection_type,
@@ -374,37 +361,29 @@ async def reanalyze_coupon(
     ]
     
     try:
-        # Relancer l'analyse IA
-        ai_coupon_analysis = await ai_service.analyze_coupon(matches_for_ai)
+        # Probabilités à jour (nouvelles analyses, modèle, cotes) et simulation jointe
+        evaluation = await coupon_analyzer.evaluate(db, selections_data)
+        ai_coupon_analysis = evaluation["analysis"]
+        combined_probability = evaluation["simulation"]["success_probability"]
         
-        # Recalculer les probabilités et le risque
-        combined_probability = ai_coupon_analysis.get("overall_probability", coupon.success_probability)
-        
-        # Mettre à jour le niveau de risque
-        risk_level = calculate_risk_level(combined_probability, len(coupon.selections))
-        if "risk_score" in ai_coupon_analysis:
-            if ai_coupon_analysis["risk_score"] < 0.3:
-                risk_level = RiskLevel.LOW.value
-            elif ai_coupon_analysis["risk_score"] < 0.6:
-                risk_level = RiskLevel.MEDIUM.value
-            elif ai_coupon_analysis["risk_score"] < 0.85:
-                risk_level = RiskLevel.HIGH.value
-            else:
-                risk_level = RiskLevel.EXTREME.value
+        for s, leg in zip(coupon.selections, evaluation["legs"]):
+            s.implied_probability = leg["implied_probability"]
+            s.ai_probability = leg["ai_probability"]
+            s.edge = leg["edge"]
         
         # Mettre à jour le coupon
         coupon.success_probability = round(combined_probability, 4)
-        coupon.risk_level = risk_level
-        coupon.ai_recommendation = ai_coupon_analysis.get("recommendation", coupon.ai_recommendation)
+        coupon.risk_level = calculate_risk_level(combined_probability, len(coupon.selections))
+        coupon.ai_recommendation = ai_coupon_analysis["recommendation"]
         coupon.ai_analysis = ai_coupon_analysis
-        
-        # Mettre à jour les weak points si disponibles
-        if "weakest_link" in ai_coupon_analysis and ai_coupon_analysis["weakest_link"] != "N/A":
-            coupon.weak_points = [ai_coupon_analysis["weakest_link"]]
+        coupon.weak_points = evaluation["weak_points"][:3]
         
         await db.commit()
         await db.refresh(coupon, attribute_names=["selections"])
         
+        if ai_coupon_analysis["narrative_pending"]:
+            background_tasks.add_task(coupon_analyzer.generate_narrative, ai_service, selections_data, coupon.id)
+        
         logger.info(f"✅ Coupon {coupon_id} reanalyzed successfully")
         
         return CouponResponse(
@@ -471,5 +450,12 @@ async def delete_coupon(
             detail="Coupon not found"
         )
     
+    await user_stats_service.increment(
+        db,
+        current_user.id,
+        coupons_count=-1,
+        coupons_won=-1 if coupon.status == CouponStatus.WON.value else 0
+    )
     await db.delete(coupon)
     await db.commit()
+    await user_stats_service.invalidate(current_user.id)
@@ -11,6 +11,7 @@ from app.services import cache_service, CACHE_TTL
 from app.providers import get_football_provider
 from app.providers.base import BaseFootballProvider
 from app.schemas.football import TeamSearchResult, LeagueSearchResult, FixtureResult
+from app.services.stats.value_scanner import get_value_bets
 
 settings = get_settings()
 
@@ -162,3 +163,25 @@ async def get_fixture_odds(
     await cache_service.set(cache_key, odds, CACHE_TTL["odds"])
     
     return {"odds": odds}
+
+
+@router.get("/value-bets", response_model=dict)
+async def get_value_bets_today(
+    current_user: Annotated[User, Depends(get_current_user)],
+    market: str | None = Query(None, description="Market filter (1X2, O/U 2.5, BTTS...)"),
+    min_value: float = Query(0.0, ge=0, description="Minimum value percentage"),
+    limit: int = Query(20, ge=1, le=100)
+):
+    """Ranked value bets of the upcoming fixtures (precomputed by the scanner)."""
+    scan = await get_value_bets()
+    if scan is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Value bets are being computed, please retry in a few minutes."
+        )
+    
+    value_bets = [
+        bet for bet in scan["value_bets"]
+        if (market is None or bet["market"] == market) and bet["value_percentage"] >= min_value
+    ]
+    return {"generated_at": scan["generated_at"], "value_bets": value_bets[:limit]}
@@ -1,13 +1,12 @@
 import json
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, Request, Header
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
 from typing import Any
 
 from app.db.session import get_db
-from app.api.v1.auth import get_current_user
+from app.api.v1.auth import get_current_user, get_current_user_for_update
 from app.models.user import User, SubscriptionType
 from app.schemas.subscription import (
     CheckoutSessionRequest, 
@@ -18,6 +17,9 @@ from app.schemas.subscription import (
 from app.services.stripe_service import stripe_service
 from app.services.moneroo_service import moneroo_service
 from app.services.pricing_service import pricing_service
+from app.services.user_cache import user_cache
+from app.services.webhook_inbox import webhook_inbox
+from app.tasks.webhooks import process_webhook_events
 
 router = APIRouter(prefix="/subscription", tags=["Subscription"])
 logger = logging.getLogger(__name__)
@@ -109,13 +111,23 @@ async def create_checkout_session(
         
     return {"checkout_url": checkout_url}
 
+def _schedule_webhook_processing() -> None:
+    """Wake the inbox worker; the beat schedule picks the event up otherwise."""
+    try:
+        process_webhook_events.delay()
+    except Exception as e:
+        logger.warning(f"Could not enqueue webhook processing: {e}")
+
 @router.post("/webhook")
 async def stripe_webhook(
     request: Request,
     stripe_signature: str = Header(None),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
-    """Handle Stripe webhooks."""
+    """
+    Handle Stripe webhooks: the verified event is stored in the webhook
+    inbox and applied asynchronously (see webhook_inbox).
+    """
     if not stripe_signature:
         raise HTTPException(status_code=400, detail="Missing stripe-signature header")
         
@@ -127,80 +139,8 @@ async def stripe_webhook(
     
     logger.info(f"Received Stripe webhook: {event.type}")
     
-    # Handle checkout.session.completed
-    if event.type == "checkout.session.completed":
-        session = event.data.object
-        user_id = session.metadata.get("user_id")
-        plan_type = session.metadata.get("plan_type")
-        
-        if user_id and plan_type:
-            result = await db.execute(select(User).where(User.id == user_id))
-            user = result.scalar_one_or_none()
-            
-            if user:
-                user.subscription = plan_type.lower()
-                user.stripe_customer_id = session.customer
-                user.stripe_subscription_id = session.subscription
-                user.payment_method = 'stripe'  # Stripe = renouvellement automatique
-                
-                # Set expiration for lifetime plan (100 years) or subscription
-                if plan_type.lower() == "lifetime":
-                    user.subscription_expires_at = datetime.utcnow() + timedelta(days=36500)
-                else:
-                    # For subscriptions, expiration is managed by Stripe
-                    user.subscription_expires_at = None
-                
-                await db.commit()
-                logger.info(f"User {user_id} upgraded to {plan_type}")
-    
-    # Handle subscription updated (renewal, change)
-    elif event.type == "customer.subscription.updated":
-        subscription = event.data.object
-        customer_id = subscription.customer
-        
-        result = await db.execute(select(User).where(User.stripe_customer_id == customer_id))
-        user = result.scalar_one_or_none()
-        
-        if user:
-            # Update subscription status
-            if subscription.status == "active":
-                user.subscription_expires_at = datetime.fromtimestamp(subscription.current_period_end)
-            elif subscription.status in ["canceled", "unpaid", "past_due"]:
-                # Downgrade to free if subscription fails
-                if subscription.cancel_at_period_end:
-                    user.subscription_expires_at = datetime.fromtimestamp(subscription.current_period_end)
-            
-            await db.commit()
-            logger.info(f"Subscription updated for customer {customer_id}: {subscription.status}")
-    
-    # Handle subscription deleted (cancellation)
-    elif event.type == "customer.subscription.deleted":
-        subscription = event.data.object
-        customer_id = subscription.customer
-        
-        result = await db.execute(select(User).where(User.stripe_customer_id == customer_id))
-        user = result.scalar_one_or_none()
-        
-        if user:
-            # Downgrade to free
-            user.subscription = SubscriptionType.FREE.value
-            user.subscription_expires_at = None
-            user.stripe_subscription_id = None
-            
-            await db.commit()
-            logger.info(f"Subscription canceled for customer {customer_id}")
-    
-    # Handle payment failed
-    elif event.type == "invoice.payment_failed":
-        invoice = event.data.object
-        customer_id = invoice.customer
-        
-        result = await db.execute(select(User).where(User.stripe_customer_id == customer_id))
-        user = result.scalar_one_or_none()
-        
-        if user:
-            logger.warning(f"Payment failed for user {user.id} ({user.email})")
-            # Optionally send email notification
+    if await webhook_inbox.store(db, "stripe", json.loads(payload), payload):
+        _schedule_webhook_processing()
                 
     return {"status": "success"}
 
@@ -210,7 +150,10 @@ async def moneroo_webhook(
     x_moneroo_signature: str = Header(None),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
-    """Handle Moneroo webhooks."""
+    """
+    Handle Moneroo webhooks: the verified event is stored in the webhook
+    inbox and applied asynchronously (see webhook_inbox).
+    """
     payload_bytes = await request.body()
     
     if not moneroo_service.verify_signature(payload_bytes, x_moneroo_signature):
@@ -218,33 +161,11 @@ async def moneroo_webhook(
         raise HTTPException(status_code=400, detail="Invalid signature")
         
     payload = json.loads(payload_bytes)
-    event = payload.get("event")
-    data = payload.get("data", {})
     
-    logger.info(f"Received Moneroo webhook: {event}")
+    logger.info(f"Received Moneroo webhook: {payload.get('event')}")
     
-    if event == "payment.success":
-        metadata = data.get("metadata", {})
-        user_id = metadata.get("user_id")
-        plan_type = metadata.get("plan_type")
-        
-        if user_id and plan_type:
-            result = await db.execute(select(User).where(User.id == user_id))
-            user = result.scalar_one_or_none()
-            
-            if user:
-                user.subscription = plan_type.lower()
-                user.payment_method = 'moneroo'  # Moneroo = renouvellement MANUEL
-                
-                # Set expiration for lifetime plan (100 years) or 30 days for others
-                if plan_type.lower() == "lifetime":
-                    user.subscription_expires_at = datetime.utcnow() + timedelta(days=36500)
-                else:
-                    # Moneroo: paiement mensuel MANUEL, expiration dans 30 jours
-                    user.subscription_expires_at = datetime.utcnow() + timedelta(days=30)
-                
-                await db.commit()
-                logger.info(f"User {user_id} upgraded to {plan_type} via Moneroo")
+    if await webhook_inbox.store(db, "moneroo", payload, payload_bytes):
+        _schedule_webhook_processing()
                 
     return {"status": "success"}
 
@@ -299,7 +220,7 @@ async def create_portal_session(
 
 @router.post("/cancel")
 async def cancel_subscription(
-    current_user: User = Depends(get_current_user),
+    current_user: User = Depends(get_current_user_for_update),
     db: AsyncSession = Depends(get_db)
 ) -> Any:
     """Cancel the current user's subscription."""
@@ -323,5 +244,6 @@ async def cancel_subscription(
     current_user.stripe_subscription_id = None
     
     await db.commit()
+    await user_cache.invalidate(current_user.id)
     
     return {"status": "success", "message": "Subscription canceled successfully"}
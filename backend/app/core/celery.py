@@ -1,4 +1,5 @@
 from celery import Celery
+from celery.schedules import crontab
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -7,7 +8,7 @@ celery_app = Celery(
     "footintel",
     broker=settings.celery_broker_url,
     backend=settings.celery_result_backend,
-    include=["app.tasks.email"]
+    include=["app.tasks.email", "app.tasks.results", "app.tasks.value_bets", "app.tasks.odds", "app.tasks.coupons", "app.tasks.quota", "app.tasks.webhooks"]
 )
 
 # Optional configuration
@@ -20,3 +21,36 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
 )
+
+# Periodic tasks (run by `celery beat`)
+celery_app.conf.beat_schedule = {
+    "sync-match-results": {
+        "task": "sync_match_results",
+        "schedule": crontab(hour=4, minute=0),
+    },
+    "settle-results": {
+        "task": "settle_results",
+        "schedule": settings.settlement_interval_minutes * 60,
+    },
+    "scan-value-bets": {
+        "task": "scan_value_bets",
+        "schedule": settings.value_scan_interval_minutes * 60,
+    },
+    "poll-odds": {
+        "task": "poll_odds",
+        "schedule": settings.odds_poll_tick_minutes * 60,
+    },
+    "generate-daily-coupons": {
+        "task": "generate_daily_coupons",
+        # Nouvelle tentative tant qu'aucun coupon n'a été généré (journée marquée faite ensuite)
+        "schedule": crontab(hour="6-12", minute="0,30"),
+    },
+    "flush-analysis-quotas": {
+        "task": "flush_analysis_quotas",
+        "schedule": settings.analysis_quota_flush_seconds,
+    },
+    "process-webhook-events": {
+        "task": "process_webhook_events",
+        "schedule": settings.webhook_process_interval_seconds,
+    },
+}
@@ -1,6 +1,6 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
-from typing import List
+from typing import List, Tuple
 
 
 class Settings(BaseSettings):
@@ -13,6 +13,14 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str
+    database_replica_urls: List[str] = []  # Read replicas for the read-only endpoints (empty = primary only)
+    db_pool_size: int = 10  # Connections kept open per engine and process
+    db_max_overflow: int = 20  # Extra connections opened under load, closed when returned
+    db_pool_timeout: float = 10.0  # Seconds waiting for a free connection before failing
+    db_pool_recycle_seconds: int = 1800  # Reconnect before MySQL wait_timeout closes idle connections
+    db_pool_pre_ping: bool = True  # Check connections on checkout (failover, restarts)
+    db_replica_max_lag_seconds: int = 5  # Replicas lagging more than this are skipped
+    db_replica_lag_check_seconds: int = 10  # Interval between replication lag checks
     
     # Redis
     redis_url: str = "redis://localhost:6379"
@@ -23,6 +31,10 @@ class Settings(BaseSettings):
     jwt_expire_minutes: int = 60  # 1 hour for access token
     jwt_refresh_expire_days: int = 30  # 30 days for refresh token
     
+    # Password hashing (bcrypt, run on a dedicated thread pool)
+    bcrypt_rounds: int = 12  # Cost factor; existing hashes are upgraded at login
+    password_hash_workers: int = 4  # Concurrent bcrypt computations per process
+    
     # API Keys
     football_api_key: str = ""  # Legacy API-Football (RapidAPI) - deprecated
     football_data_api_key: str = ""  # Football-Data.org API key (free tier)
@@ -34,8 +46,80 @@ class Settings(BaseSettings):
     stripe_price_lifetime: str = "price_1Sk0WsGdRbLVz7FdyWyfWO2r"  # Stripe Price ID for Lifetime (one-time)
     moneroo_api_key: str = ""
     moneroo_webhook_secret: str = ""
+    payment_timeout_seconds: float = 10.0  # Per request to Stripe / Moneroo
+    payment_max_retries: int = 1  # Stripe network retries (idempotency keys are added by the SDK)
+    # Webhook inbox (events stored on receipt, applied by a worker)
+    webhook_process_interval_seconds: int = 30  # Beat safety net, webhooks also trigger a run
+    webhook_batch_size: int = 200
+    webhook_max_attempts: int = 5  # Then the event is marked failed and skipped
+    webhook_lock_seconds: int = 300
     news_api_key: str = ""
     
+    # AI Providers
+    ai_provider: str = "ollama"  # "ollama" or "gemini"
+    ollama_url: str = "http://ollama:11434"
+    ollama_model: str = "mistral"  # "large" tier: full match analyses
+    ollama_fast_model: str = "llama3.2:3b"  # "fast" tier: chat, coupon summaries, step-down under load
+    ollama_tiny_model: str = ""  # Optional "tiny" tier (e.g. "llama3.2:1b"), last resort under heavy load
+    ollama_tier_max_in_flight: int = 2  # Requests in flight before stepping down a tier
+    ollama_tier_p95_seconds: float = 30.0  # p95 latency per task before stepping down a tier
+    ollama_keep_alive: str = "24h"  # How long Ollama keeps the model in memory after a call
+    ollama_preload: bool = True  # Load the model and prime the system prompt at startup
+    
+    # AI routing: several backends, e.g. ["ollama:http://ollama:11434", "ollama:http://gpu-2:11434", "gemini"]
+    # Empty = single provider selected by `ai_provider`
+    ai_backends: List[str] = []
+    ai_router_window: int = 50  # Calls kept per backend for latency/error stats
+    ai_router_error_threshold: float = 0.5  # Error rate that marks a backend unhealthy
+    ai_router_cooldown_seconds: int = 60  # Time an unhealthy backend is skipped
+    ai_hedge_enabled: bool = False  # Fire a second backend when the first is slow
+    ai_hedge_percentile: float = 95.0  # Latency percentile after which the hedge fires
+    
+    # Semantic answer cache for the analysis chat (question embeddings via Ollama)
+    chat_cache_enabled: bool = True
+    ollama_embed_model: str = "nomic-embed-text"
+    chat_cache_similarity: float = 0.92  # Cosine similarity to reuse an answer of the same analysis
+    chat_cache_fixture_similarity: float = 0.95  # Stricter threshold across analyses of the same fixture
+    chat_cache_max_entries: int = 64  # Answers kept per analysis / fixture (LRU eviction)
+    chat_cache_max_scopes: int = 2000  # Analyses + fixtures kept in memory (LRU eviction)
+    chat_cache_ttl_seconds: int = 21600  # Answers expire with the data they were based on (6h)
+    
+    # Statistical goals model (Dixon-Coles) fitted on stored match results
+    goals_model_half_life_days: int = 180  # Weight of a result halves every N days
+    goals_model_history_days: int = 730  # Results older than this are ignored
+    goals_model_min_matches: int = 50  # Below this, no model is fitted
+    results_sync_days_back: int = 3  # Days of finished fixtures fetched by the nightly sync
+    settlement_days_back: int = 2  # Days of fixtures settled by each settlement run
+    settlement_interval_minutes: int = 30
+    
+    # Elo ratings updated from stored match results
+    elo_initial_rating: float = 1500.0
+    elo_k_factor: float = 20.0
+    elo_home_advantage: float = 65.0  # Rating points added to the home team
+    elo_history_matches: int = 40  # Dated ratings kept per team (past-date lookups)
+    
+    # Odds normalisation: "proportional", "shin" or "power" margin removal
+    odds_margin_method: str = "shin"
+    # Odds polling: (hours to kickoff, minutes between polls), closest horizon first
+    odds_poll_schedule: List[Tuple[int, int]] = [(1, 5), (6, 15), (24, 60), (72, 180), (336, 720)]
+    odds_poll_tick_minutes: int = 5  # Beat frequency of the poller
+    
+    # Value-bet scanner (precomputed over all upcoming fixtures)
+    value_bet_min_edge: float = 0.05  # Minimum expected value to flag a value bet
+    value_scan_interval_minutes: int = 30
+    value_scan_max_fixtures: int = 100
+    
+    # Daily analysis quota (atomic Redis counters, written back to users.daily_analyses_used)
+    analysis_quota_flush_seconds: int = 60
+    
+    # Daily coupons (Safe / Balanced / Ambitious)
+    daily_coupons_horizon_hours: int = 36  # Fixtures kicking off within this horizon
+    daily_coupons_lock_seconds: int = 900  # Generation lock, released early when done
+
+    # Monte Carlo coupon simulation
+    coupon_sim_draws: int = 200000  # Joint outcomes sampled per coupon
+    coupon_sim_void_probability: float = 0.005  # Chance a fixture is voided (postponed, abandoned)
+    
     # SMTP Settings (FastAPI-Mail / Celery)
     smtp_host: str = "smtp.gmail.com"
     smtp_port: int = 587
@@ -0,0 +1,113 @@
+"""
+Lightweight in-process metrics registry.
+
+Counters and rolling latency windows kept per worker process. Values are
+exposed through the ``/metrics`` endpoint and can be scraped or logged.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Optional, Tuple
+
+# Number of samples kept per rolling window
+DEFAULT_WINDOW_SIZE = 500
+
+MetricKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> MetricKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_key(key: MetricKey) -> str:
+    name, labels = key
+    if not labels:
+        return name
+    return name + "{" + ",".join(f"{k}={v}" for k, v in labels) + "}"
+
+
+class MetricsRegistry:
+    """Thread-safe counters, gauges and rolling observation windows."""
+
+    def __init__(self, window_size: int = DEFAULT_WINDOW_SIZE):
+        self.window_size = window_size
+        self._lock = threading.Lock()
+        self._counters: Dict[MetricKey, float] = defaultdict(float)
+        self._gauges: Dict[MetricKey, float] = {}
+        self._windows: Dict[MetricKey, Deque[float]] = {}
+
+    def incr(self, name: str, value: float = 1, **labels: Any) -> None:
+        """Increment a counter."""
+        with self._lock:
+            self._counters[_key(name, labels)] += value
+
+    def set_gauge(self, name: str, value: float, **labels: Any) -> None:
+        """Set a gauge to an absolute value."""
+        with self._lock:
+            self._gauges[_key(name, labels)] = value
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record an observation (e.g. a latency in ms) in a rolling window."""
+        key = _key(name, labels)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                window = deque(maxlen=self.window_size)
+                self._windows[key] = window
+            window.append(value)
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Observe the duration of a block in ms (also when it raises)."""
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, (time.perf_counter() - start_time) * 1000, **labels)
+
+    def counter(self, name: str, **labels: Any) -> float:
+        """Current value of a counter."""
+        with self._lock:
+            return self._counters.get(_key(name, labels), 0)
+
+    def percentile(self, name: str, q: float, **labels: Any) -> Optional[float]:
+        """Percentile ``q`` (0-100) of a rolling window, None if empty."""
+        with self._lock:
+            window = self._windows.get(_key(name, labels))
+            values = sorted(window) if window else []
+        if not values:
+            return None
+        index = min(len(values) - 1, max(0, int(round(q / 100 * (len(values) - 1)))))
+        return values[index]
+
+    def ratio(self, hits: str, total: str, **labels: Any) -> Optional[float]:
+        """Ratio of two counters sharing the same labels."""
+        denominator = self.counter(total, **labels)
+        if not denominator:
+            return None
+        return self.counter(hits, **labels) / denominator
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Serializable view of all metrics."""
+        with self._lock:
+            counters = {_format_key(k): v for k, v in self._counters.items()}
+            gauges = {_format_key(k): v for k, v in self._gauges.items()}
+            windows = {k: sorted(v) for k, v in self._windows.items() if v}
+
+        summaries = {}
+        for key, values in windows.items():
+            n = len(values)
+            summaries[_format_key(key)] = {
+                "count": n,
+                "mean": round(sum(values) / n, 3),
+                "p50": values[int(0.50 * (n - 1))],
+                "p95": values[int(0.95 * (n - 1))],
+                "p99": values[int(0.99 * (n - 1))],
+                "max": values[-1],
+            }
+        return {"counters": counters, "gauges": gauges, "observations": summaries}
+
+
+# Singleton instance
+metrics = MetricsRegistry()
@@ -1,15 +1,36 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any
+from typing import Any, Callable, Optional, Tuple, TypeVar
 
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
 
 settings = get_settings()
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+T = TypeVar("T")
+
+# Password hashing: hashes with another cost factor are upgraded at login (verify_and_update)
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.bcrypt_rounds,
+    bcrypt__min_rounds=settings.bcrypt_rounds,
+    bcrypt__max_rounds=settings.bcrypt_rounds
+)
+
+# bcrypt libère le GIL : un pool de threads borné suffit à sortir le calcul de la boucle
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.password_hash_workers,
+    thread_name_prefix="password-hash"
+)
+_hash_pending = 0
+_hash_pending_lock = threading.Lock()
 
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
@@ -22,6 +43,52 @@ def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
 
+def _track_pending(delta: int) -> None:
+    global _hash_pending
+    with _hash_pending_lock:
+        _hash_pending += delta
+        metrics.set_gauge("security.password_hash.pending", _hash_pending)
+
+
+async def _run_password_hashing(operation: str, fn: Callable[..., T], *args: Any) -> T:
+    """Run a bcrypt call on the password hashing pool, recording queue wait and run times."""
+    submitted_at = time.perf_counter()
+
+    def run() -> T:
+        started_at = time.perf_counter()
+        metrics.observe("security.password_hash.wait_ms", (started_at - submitted_at) * 1000, operation=operation)
+        try:
+            return fn(*args)
+        finally:
+            metrics.observe("security.password_hash.run_ms", (time.perf_counter() - started_at) * 1000, operation=operation)
+
+    _track_pending(1)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, run)
+    finally:
+        _track_pending(-1)
+
+
+async def hash_password(password: str) -> str:
+    """Hash a password off the event loop."""
+    return await _run_password_hashing("hash", pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """
+    Verify a password off the event loop.
+
+    Returns whether it matches and, when the stored hash uses another cost
+    factor than `bcrypt_rounds`, the new hash to store in its place.
+    """
+    valid, new_hash = await _run_password_hashing(
+        "verify", pwd_context.verify_and_update, plain_password, hashed_password
+    )
+    if new_hash:
+        metrics.incr("security.password_rehash")
+    return valid, new_hash
+
+
 def create_access_token(data: dict[str, Any], expires_delta: timedelta | None = None) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
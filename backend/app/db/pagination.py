@@ -0,0 +1,71 @@
+"""
+Keyset (cursor) pagination, newest first.
+
+Lists are ordered by (created_at, id) and a page continues strictly after
+the last row of the previous one, whose position is handed to the client
+as an opaque cursor (X-Next-Cursor header). With a (user_id, created_at,
+id) index, every page is a range scan of `limit` rows whatever its depth.
+"""
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Optional, Sequence, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, and_, or_
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque cursor of a row position."""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Row position of a cursor; 400 if it was not produced by `encode_cursor`."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|", 1)
+        return datetime.fromisoformat(created_at), row_id
+    except (ValueError, UnicodeDecodeError, binascii.Error):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+
+def paginate(
+    stmt: Select,
+    created_at: Any,
+    row_id: Any,
+    limit: int,
+    cursor: Optional[str] = None,
+    offset: int = 0
+) -> Select:
+    """
+    Order `stmt` newest first and restrict it to the page after `cursor`.
+
+    One extra row is fetched to know whether a next page exists (see
+    `next_cursor`). `offset` is only kept for the clients that have not
+    moved to cursors yet.
+    """
+    if cursor:
+        last_created_at, last_id = decode_cursor(cursor)
+        # Forme développée du (created_at, id) < (...) : utilisable en range scan par MySQL
+        stmt = stmt.where(or_(
+            created_at < last_created_at,
+            and_(created_at == last_created_at, row_id < last_id)
+        ))
+    elif offset:
+        stmt = stmt.offset(offset)
+    return stmt.order_by(created_at.desc(), row_id.desc()).limit(limit + 1)
+
+
+def next_cursor(rows: Sequence[Any], limit: int) -> Optional[str]:
+    """Cursor of the next page (None on the last page) of rows fetched by `paginate`."""
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last.created_at, last.id)
@@ -1,16 +1,56 @@
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
+import asyncio
+import time
+from typing import List, Optional
+
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 
 from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
 
 settings = get_settings()
+logger = get_logger('db.session')
+
+# Délai max d'une mesure de retard de réplication
+LAG_CHECK_TIMEOUT_SECONDS = 2.0
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool recording how long checkouts wait for a connection."""
+
+    def _do_get(self):
+        start_time = time.perf_counter()
+        pool = self.logging_name or "primary"
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.incr("db.pool.timeouts", pool=pool)
+            raise
+        finally:
+            metrics.observe("db.pool.checkout_wait_ms", (time.perf_counter() - start_time) * 1000, pool=pool)
+            metrics.set_gauge("db.pool.checked_out", self.checkedout(), pool=pool)
+
+
+def _create_engine(url: str, name: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        echo=settings.debug,
+        future=True,
+        poolclass=InstrumentedQueuePool,
+        pool_logging_name=name,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+        pool_recycle=settings.db_pool_recycle_seconds,
+        pool_pre_ping=settings.db_pool_pre_ping
+    )
+
 
 # Create async engine
-engine = create_async_engine(
-    settings.database_url,
-    echo=settings.debug,
-    future=True
-)
+engine = _create_engine(settings.database_url, "primary")
 
 # Session factory
 async_session_maker = async_sessionmaker(
@@ -23,6 +63,82 @@ async_session_maker = async_sessionmaker(
 Base = declarative_base()
 
 
+class ReplicaRouter:
+    """
+    Chooses where the read-only endpoints read: round robin over the
+    replicas whose replication lag is under `db_replica_max_lag_seconds`,
+    the primary when none is (or none is configured).
+    """
+
+    def __init__(self, urls: List[str]):
+        self._names = [f"replica-{i}" for i in range(len(urls))]
+        self._engines = [_create_engine(url, name) for url, name in zip(urls, self._names)]
+        self._session_makers = [
+            async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False, info={"replica": name})
+            for engine, name in zip(self._engines, self._names)
+        ]
+        self._healthy: List[int] = []
+        self._checked_at = float("-inf")
+        self._lock = asyncio.Lock()
+        self._next = 0
+
+    async def _lag(self, engine: AsyncEngine) -> Optional[float]:
+        """Replication lag in seconds, None when replication is stopped."""
+        async with engine.connect() as conn:
+            status = (await conn.execute(text("SHOW REPLICA STATUS"))).mappings().first()
+        if status is None:
+            # Pas un réplica MySQL (proxy de lecture...) : considéré à jour
+            return 0.0
+        lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+        return None if lag is None else float(lag)
+
+    async def refresh(self) -> None:
+        """Re-measure the replicas lag, at most every `db_replica_lag_check_seconds`."""
+        if time.monotonic() - self._checked_at < settings.db_replica_lag_check_seconds:
+            return
+        # Une seule mesure à la fois : les autres requêtes gardent l'état courant
+        if self._lock.locked():
+            return
+        async with self._lock:
+            healthy = []
+            for i, (name, engine) in enumerate(zip(self._names, self._engines)):
+                try:
+                    lag = await asyncio.wait_for(self._lag(engine), LAG_CHECK_TIMEOUT_SECONDS)
+                except Exception as e:
+                    logger.warning(f"⚠️ Replica {name} lag check failed: {str(e)}")
+                    lag = None
+                metrics.set_gauge("db.replica.lag_seconds", -1 if lag is None else lag, replica=name)
+                if lag is not None and lag <= settings.db_replica_max_lag_seconds:
+                    healthy.append(i)
+
+            if len(healthy) != len(self._healthy):
+                logger.info(
+                    f"🔀 Read replicas in sync: {len(healthy)}/{len(self._engines)}",
+                    extra={'extra_data': {'healthy': [self._names[i] for i in healthy]}}
+                )
+            self._healthy = healthy
+            self._checked_at = time.monotonic()
+
+    async def session_maker(self) -> async_sessionmaker:
+        if not self._engines:
+            return async_session_maker
+        await self.refresh()
+        if not self._healthy:
+            metrics.incr("db.reads", target="primary")
+            return async_session_maker
+        self._next = (self._next + 1) % len(self._healthy)
+        i = self._healthy[self._next]
+        metrics.incr("db.reads", target=self._names[i])
+        return self._session_makers[i]
+
+    async def dispose(self) -> None:
+        for engine in self._engines:
+            await engine.dispose()
+
+
+replica_router = ReplicaRouter(settings.database_replica_urls)
+
+
 async def get_db() -> AsyncSession:
     """Dependency for getting database session."""
     async with async_session_maker() as session:
@@ -32,6 +148,31 @@ async def get_db() -> AsyncSession:
             await session.close()
 
 
+async def get_read_db() -> AsyncSession:
+    """Dependency for read-only endpoints: session on an up-to-date replica, else on the primary."""
+    session_maker = await replica_router.session_maker()
+    async with session_maker() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
+
+
+def is_replica(session: AsyncSession) -> bool:
+    """Whether a session reads from a replica (rows written just before may be missing)."""
+    return "replica" in session.info
+
+
+async def dispose_engines() -> None:
+    """
+    Close the pooled connections of every engine. Celery tasks call it at the
+    end of their `asyncio.run`: the connections are bound to that event loop
+    and would fail once reused from the next run's loop.
+    """
+    await engine.dispose()
+    await replica_router.dispose()
+
+
 async def init_db():
     """Initialize database tables."""
     async with engine.begin() as conn:
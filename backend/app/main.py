@@ -1,4 +1,5 @@
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import uuid
 
@@ -8,7 +9,9 @@ from fastapi.responses import JSONResponse
 
 from app.core.config import get_settings
 from app.core.logger import setup_logging, logger, set_request_context, clear_request_context
+from app.core.metrics import metrics
 from app.db.session import init_db
+from app.providers import get_ai_provider
 from app.api import (
     auth_router,
     analyze_router,
@@ -26,8 +29,12 @@ async def lifespan(app: FastAPI):
     setup_logging()
     logger.info(f"🚀 Starting {settings.app_name}...")
     await init_db()
+    # Preload the AI model in the background so startup is not delayed
+    warmup_task = asyncio.create_task(get_ai_provider().warmup())
     yield
     # Shutdown
+    if not warmup_task.done():
+        warmup_task.cancel()
     logger.info(f"👋 Shutting down {settings.app_name}...")
 
 
@@ -47,6 +54,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
@@ -122,6 +130,12 @@ async def health_check():
     return {"status": "healthy", "service": settings.app_name}
 
 
+@app.get("/metrics", tags=["Health"])
+async def get_metrics():
+    """In-process metrics of this worker (AI timings, cache hit rates...)."""
+    return metrics.snapshot()
+
+
 # API v1 routers
 app.include_router(auth_router, prefix=settings.api_v1_str)
 app.include_router(analyze_router, prefix=settings.api_v1_str)
@@ -1,4 +1,4 @@
-from app.models.user import User, ProfileType, SubscriptionType
+from app.models.user import User, UserCounters, ProfileType, SubscriptionType
 from app.models.match_analysis import MatchAnalysis
 from app.models.coupon import (
     Coupon,
@@ -8,10 +8,14 @@ from app.models.coupon import (
     RiskLevel,
     SelectionResult
 )
-from app.models.chat import ChatMessage
+from app.models.chat import ChatMessage, ChatMemory
+from app.models.match_result import MatchResult
+from app.models.prediction_stats import PredictionStats, PredictionCalibration
+from app.models.webhook_event import WebhookEvent, WebhookEventStatus
 
 __all__ = [
     "User",
+    "UserCounters",
     "ProfileType",
     "SubscriptionType",
     "MatchAnalysis",
@@ -22,4 +26,10 @@ __all__ = [
     "RiskLevel",
     "SelectionResult",
     "ChatMessage",
+    "ChatMemory",
+    "MatchResult",
+    "PredictionStats",
+    "PredictionCalibration",
+    "WebhookEvent",
+    "WebhookEventStatus",
 ]
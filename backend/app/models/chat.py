@@ -1,6 +1,6 @@
 from datetime import datetime
 from uuid import UUID, uuid4
-from sqlalchemy import String, DateTime, ForeignKey, Text
+from sqlalchemy import String, DateTime, ForeignKey, Integer, Text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -18,9 +18,32 @@ class ChatMessage(Base):
     
     role: Mapped[str] = mapped_column(String(20))  # 'user' or 'assistant'
     content: Mapped[str] = mapped_column(Text)
+    token_count: Mapped[int] = mapped_column(Integer, default=0)  # Estimated tokens of the content
     
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
 
     # Relationships
     analysis: Mapped["MatchAnalysis"] = relationship("MatchAnalysis", back_populates="chat_messages")
     user: Mapped["User"] = relationship("User")
+
+
+class ChatMemory(Base):
+    """
+    Conversation memory of an analysis chat.
+    
+    The oldest messages are folded into a rolling summary; only the messages
+    after `summarized_count` are replayed verbatim, so chat prompts keep a
+    bounded size however long the conversation gets.
+    """
+    __tablename__ = "chat_memories"
+
+    id: Mapped[str] = mapped_column(String(36), primary_key=True, default=lambda: str(uuid4()))
+    analysis_id: Mapped[str] = mapped_column(
+        String(36), ForeignKey("match_analyses.id", ondelete="CASCADE"), unique=True, index=True
+    )
+    
+    summary: Mapped[str] = mapped_column(Text, default="")
+    summary_tokens: Mapped[int] = mapped_column(Integer, default=0)
+    summarized_count: Mapped[int] = mapped_column(Integer, default=0)  # Messages folded into the summary
+    
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
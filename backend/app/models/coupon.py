@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import String, Float, DateTime, Integer, ForeignKey, JSON, Text
+from sqlalchemy import String, Float, DateTime, Integer, ForeignKey, JSON, Text, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -41,16 +41,22 @@ class Coupon(Base):
     """Coupon (bet slip) model."""
     
     __tablename__ = "coupons"
+    __table_args__ = (
+        # Pagination par curseur de l'historique d'un utilisateur
+        Index("ix_coupons_user_created", "user_id", "created_at", "id"),
+    )
     
     id: Mapped[str] = mapped_column(
         String(36),
         primary_key=True,
         default=lambda: str(uuid.uuid4())
     )
-    user_id: Mapped[str] = mapped_column(
+    # NULL pour les coupons du jour générés automatiquement
+    user_id: Mapped[str | None] = mapped_column(
         String(36),
         ForeignKey("users.id"),
-        index=True
+        index=True,
+        nullable=True
     )
     
     # Type
@@ -78,6 +84,7 @@ class Coupon(Base):
     )
     matches_won: Mapped[int] = mapped_column(Integer, default=0)
     matches_lost: Mapped[int] = mapped_column(Integer, default=0)
+    selections_count: Mapped[int] = mapped_column(Integer, default=0)
     
     # Metadata
     created_at: Mapped[datetime] = mapped_column(
@@ -110,7 +117,7 @@ class CouponSelection(Base):
     )
     
     # Match info
-    fixture_id: Mapped[int] = mapped_column(Integer)
+    fixture_id: Mapped[int] = mapped_column(Integer, index=True)
     home_team: Mapped[str] = mapped_column(String(255))
     away_team: Mapped[str] = mapped_column(String(255))
     match_date: Mapped[datetime] = mapped_column(DateTime)
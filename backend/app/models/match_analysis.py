@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import String, Float, DateTime, Integer, Text, ForeignKey, JSON
+from sqlalchemy import String, Float, DateTime, Integer, Text, ForeignKey, JSON, Index, and_
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -11,6 +11,10 @@ class MatchAnalysis(Base):
     """Match analysis generated by AI."""
     
     __tablename__ = "match_analyses"
+    __table_args__ = (
+        # Pagination par curseur de l'historique d'un utilisateur
+        Index("ix_match_analyses_user_created", "user_id", "created_at", "id"),
+    )
     
     id: Mapped[str] = mapped_column(
         String(36),
@@ -39,6 +43,7 @@ class MatchAnalysis(Base):
     prediction_away: Mapped[float] = mapped_column(Float)
     predicted_outcome: Mapped[str] = mapped_column(String(5))  # "1", "X", "2"
     confidence_score: Mapped[float] = mapped_column(Float)
+    model_name: Mapped[str] = mapped_column(String(100), default="")  # "ollama:mistral", "goals_model:dixon-coles"...
     
     # Generated content
     summary: Mapped[str] = mapped_column(Text)
@@ -67,3 +72,11 @@ class MatchAnalysis(Base):
         back_populates="analysis",
         cascade="all, delete-orphan"
     )
+
+    @classmethod
+    def from_ai_model(cls):
+        """
+        SQL condition keeping the analyses predicted by an AI model, not the
+        canned fallback (40/30/30) nor the goals model standing in for it.
+        """
+        return and_(cls.model_name != "fallback", cls.model_name.notlike("goals_model:%"))
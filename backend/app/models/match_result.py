@@ -0,0 +1,36 @@
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, DateTime, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class MatchResult(Base):
+    """Final score of a finished fixture (training data of the statistical models)."""
+
+    __tablename__ = "match_results"
+    __table_args__ = (
+        Index("ix_match_results_league_date", "league_id", "match_date"),
+    )
+
+    fixture_id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    league_id: Mapped[int] = mapped_column(Integer)
+    league_name: Mapped[str] = mapped_column(String(255), default="")
+    match_date: Mapped[datetime] = mapped_column(DateTime, index=True)
+
+    home_team_id: Mapped[int] = mapped_column(Integer, index=True)
+    home_team: Mapped[str] = mapped_column(String(255))
+    away_team_id: Mapped[int] = mapped_column(Integer, index=True)
+    away_team: Mapped[str] = mapped_column(String(255))
+
+    home_goals: Mapped[int] = mapped_column(Integer)
+    away_goals: Mapped[int] = mapped_column(Integer)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
+    # Dernière correction du score (None = jamais corrigé), voir EloService
+    updated_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, index=True)
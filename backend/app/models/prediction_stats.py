@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, Integer, Float
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.db import Base
+
+
+class PredictionStats(Base):
+    """
+    Accuracy counters of settled 1X2 predictions for one scope
+    ("global", "user", "league" or "model"), updated incrementally at
+    settlement. Rates are derived from the sums when read.
+    """
+
+    __tablename__ = "prediction_stats"
+
+    scope: Mapped[str] = mapped_column(String(10), primary_key=True)
+    scope_key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    label: Mapped[str] = mapped_column(String(255), default="")  # Nom de la ligue / du modèle
+
+    predictions: Mapped[int] = mapped_column(Integer, default=0)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
+    brier_sum: Mapped[float] = mapped_column(Float, default=0.0)  # Brier multi-classe (0-2)
+    log_loss_sum: Mapped[float] = mapped_column(Float, default=0.0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
+
+
+class PredictionCalibration(Base):
+    """
+    Reliability bin of a scope: every predicted 1X2 probability falls in
+    a bin of width 0.1, with the sum of the probabilities and the number
+    of outcomes that happened.
+    """
+
+    __tablename__ = "prediction_calibration"
+
+    scope: Mapped[str] = mapped_column(String(10), primary_key=True)
+    scope_key: Mapped[str] = mapped_column(String(100), primary_key=True)
+    bin: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+
+    count: Mapped[int] = mapped_column(Integer, default=0)
+    probability_sum: Mapped[float] = mapped_column(Float, default=0.0)
+    hits: Mapped[int] = mapped_column(Integer, default=0)
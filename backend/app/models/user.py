@@ -2,7 +2,7 @@ import uuid
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import String, Boolean, DateTime, Integer, JSON
+from sqlalchemy import String, Boolean, DateTime, Integer, JSON, ForeignKey
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -96,3 +96,26 @@ class User(Base):
             SubscriptionType.LIFETIME.value: -1,
         }
         return limits.get(self.subscription, 1)
+
+
+class UserCounters(Base):
+    """
+    Denormalised dashboard counters of a user, incremented in the same
+    transaction as the rows they count (see services.user_stats).
+    """
+
+    __tablename__ = "user_counters"
+
+    user_id: Mapped[str] = mapped_column(
+        String(36),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        primary_key=True
+    )
+    analyses_count: Mapped[int] = mapped_column(Integer, default=0)
+    coupons_count: Mapped[int] = mapped_column(Integer, default=0)
+    coupons_won: Mapped[int] = mapped_column(Integer, default=0)
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow
+    )
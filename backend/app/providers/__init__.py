@@ -5,6 +5,7 @@ from .football.api_football import ApiFootballProvider
 from .football.hybrid_provider import HybridFootballProvider
 from .ai.gemini import GeminiAIProvider
 from .ai.ollama import OllamaAIProvider
+from .ai.router import RoutingAIProvider, build_backends
 from app.core.config import get_settings
 
 settings = get_settings()
@@ -25,8 +26,14 @@ def get_football_provider() -> BaseFootballProvider:
 @lru_cache()
 def get_ai_provider() -> BaseAIProvider:
     """Returns the configured AI analysis provider."""
+    # Several backends configured: route between them (failover + hedging)
+    if settings.ai_backends:
+        backends = build_backends(settings.ai_backends)
+        if backends:
+            return RoutingAIProvider(backends)
+    
     # Choose provider based on AI_PROVIDER setting
-    ai_provider = getattr(settings, 'ai_provider', 'ollama').lower()
+    ai_provider = settings.ai_provider.lower()
     
     if ai_provider == 'ollama':
         return OllamaAIProvider()
@@ -1,7 +1,10 @@
-import json
 import google.generativeai as genai
-from typing import Any, Dict, List, Optional
-from ..base import BaseAIProvider
+from typing import Any, Dict
+from ..base import CHAT_SUMMARY_MAX_CHARS, BaseAIProvider
+from .json_repair import parse_json_response
+from .ollama import CHAT_SUMMARY_PROMPT_TEMPLATE
+from .prompt_builder import build_match_data, log_prompt_tokens, token_budget
+from .schemas import COUPON_ANALYSIS_SCHEMA, MATCH_ANALYSIS_SCHEMA, to_gemini_schema
 from app.core.config import get_settings
 from app.core.logger import logger
 
@@ -17,6 +20,9 @@ Tu dois analyser un match et fournir des prédictions précises.
 
 ## Données disponibles
 
+### Modèle statistique (référence, à ajuster avec le contexte)
+{model_prior}
+
 ### Statistiques des équipes
 {team_stats}
 
@@ -110,7 +116,10 @@ Tu dois analyser un coupon composé de plusieurs sélections (combiné) et éval
 class GeminiAIProvider(BaseAIProvider):
     """Concrete implementation of AI Provider using Google Gemini."""
     
-    def __init__(self):
+    name = "gemini"
+    
+    def __init__(self, raise_errors: bool = False):
+        self.raise_errors = raise_errors
         if settings.gemini_api_key:
             genai.configure(api_key=settings.gemini_api_key)
             self.model = genai.GenerativeModel(
@@ -124,65 +133,44 @@ class GeminiAIProvider(BaseAIProvider):
             self.model = None
             logger.warning("Gemini AI Provider initialized WITHOUT API KEY. Fallback will be used.")
             
-    def _format_stats(self, stats: Dict[str, Any]) -> str:
-        if not stats: return "Statistiques non disponibles"
-        return json.dumps(stats, indent=2, ensure_ascii=False)[:2000]
-    
-    def _format_h2h(self, h2h: List[Dict[str, Any]]) -> str:
-        if not h2h: return "Pas d'historique disponible"
-        results = []
-        for match in h2h[:5]:
-            home = match.get("teams", {}).get("home", {}).get("name", "?")
-            away = match.get("teams", {}).get("away", {}).get("name", "?")
-            score = match.get("score", {}).get("fulltime", {})
-            results.append(f"- {home} {score.get('home', '?')}-{score.get('away', '?')} {away}")
-        return "\n".join(results)
-    
-    def _format_injuries(self, injuries: List[Dict[str, Any]]) -> str:
-        if not injuries: return "Aucune blessure signalée"
-        return "\n".join([f"- {i.get('player', {}).get('name')} ({i.get('team', {}).get('name')}): {i.get('player', {}).get('reason', 'Blessure')}" for i in injuries[:10]])
-    
-    def _format_odds(self, odds: List[Dict[str, Any]]) -> str:
-        if not odds: return "Cotes non disponibles"
-        try:
-            bets = odds[0].get("bookmakers", [{}])[0].get("bets", [])
-            for bet in bets:
-                if bet.get("name") == "Match Winner":
-                    return " | ".join([f"{v.get('value')}: {v.get('odd')}" for v in bet.get("values", [])])
-        except (IndexError, KeyError): pass
-        return "Cotes non disponibles"
-
-    async def analyze_match(self, home_team, away_team, league_name, match_date, team_stats, h2h_data, injuries_data, odds_data, news_context=[]):
-        if not self.model: return self._get_fallback_analysis(home_team, away_team)
+    async def analyze_match(self, home_team, away_team, league_name, match_date, team_stats, h2h_data, injuries_data, odds_data, news_context=[], model_prior=None):
+        if not self.model: return self._fallback(self._get_fallback_analysis(home_team, away_team), "not configured")
         
+        match_data = build_match_data(team_stats, h2h_data, injuries_data, odds_data, news_context, budget=token_budget(self.name), model_prior=model_prior)
         prompt = ANALYSIS_PROMPT_TEMPLATE.format(
-            home_team=home_team, away_team=away_team, league_name=league_name, match_date=match_date,
-            team_stats=self._format_stats(team_stats), h2h_data=self._format_h2h(h2h_data),
-            injuries_data=self._format_injuries(injuries_data), odds_data=self._format_odds(odds_data),
-            news_data="\n".join([f"- {n}" for n in news_context]) if news_context else "Aucune actualité trouvée."
+            home_team=home_team, away_team=away_team, league_name=league_name, match_date=match_date, **match_data
         )
+        log_prompt_tokens(prompt, self.name, "match_analysis")
         
         try:
-            response = await self.model.generate_content_async(prompt, generation_config=genai.GenerationConfig(temperature=0.3, max_output_tokens=1500, response_mime_type="application/json"))
-            return self._validate_result(json.loads(response.text.strip()))
+            response = await self.model.generate_content_async(prompt, generation_config=genai.GenerationConfig(temperature=0.3, max_output_tokens=1500, response_mime_type="application/json", response_schema=to_gemini_schema(MATCH_ANALYSIS_SCHEMA)))
+            result, _ = parse_json_response(response.text, MATCH_ANALYSIS_SCHEMA, provider=self.name, task="match_analysis")
+            if not isinstance(result, dict):
+                return self._fallback(self._get_fallback_analysis(home_team, away_team), "match analysis failed: invalid JSON")
+            return self._validate_result(result)
         except Exception as e:
             logger.error(f"Gemini API error: {str(e)}")
-            return self._get_fallback_analysis(home_team, away_team)
+            return self._fallback(self._get_fallback_analysis(home_team, away_team), f"match analysis failed: {e}")
 
     async def analyze_coupon(self, matches):
-        if not self.model: return self._get_fallback_coupon_analysis(matches)
+        if not self.model: return self._fallback(self._get_fallback_coupon_analysis(matches), "not configured")
         matches_info = "\n".join([f"{i+1}. {m.get('home_team')} vs {m.get('away_team')} - {m.get('selection_type')} ({m.get('odds')})" for i, m in enumerate(matches)])
         prompt = COUPON_ANALYSIS_PROMPT_TEMPLATE.format(matches_info=matches_info)
+        log_prompt_tokens(prompt, self.name, "coupon_analysis")
         try:
-            response = await self.model.generate_content_async(prompt, generation_config=genai.GenerationConfig(temperature=0.2, response_mime_type="application/json"))
-            return json.loads(response.text.strip())
+            response = await self.model.generate_content_async(prompt, generation_config=genai.GenerationConfig(temperature=0.2, response_mime_type="application/json", response_schema=to_gemini_schema(COUPON_ANALYSIS_SCHEMA)))
+            result, _ = parse_json_response(response.text, COUPON_ANALYSIS_SCHEMA, provider=self.name, task="coupon_analysis")
+            if not isinstance(result, dict):
+                return self._fallback(self._get_fallback_coupon_analysis(matches), "coupon analysis failed: invalid JSON")
+            return result
         except Exception as e:
             logger.error(f"Gemini coupon analysis error: {str(e)}")
-            return self._get_fallback_coupon_analysis(matches)
+            return self._fallback(self._get_fallback_coupon_analysis(matches), f"coupon analysis failed: {e}")
 
-    async def chat_analysis(self, analysis_summary, history, user_question):
-        if not self.model: return "Désolé, l'assistant IA est indisponible."
-        messages = [{"role": "user", "parts": [f"Résumé d'analyse: {analysis_summary}"]}, {"role": "model", "parts": ["Entendu."]}]
+    async def chat_analysis(self, analysis_summary, history, user_question, memory_summary=""):
+        if not self.model: return self._fallback("Désolé, l'assistant IA est indisponible.", "not configured")
+        context = f"Résumé d'analyse: {analysis_summary}" + (f"\n\nRésumé de la conversation précédente:\n{memory_summary}" if memory_summary else "")
+        messages = [{"role": "user", "parts": [context]}, {"role": "model", "parts": ["Entendu."]}]
         for msg in history: messages.append({"role": "user" if msg.role == "user" else "model", "parts": [msg.content]})
         messages.append({"role": "user", "parts": [user_question]})
         try:
@@ -191,7 +179,19 @@ class GeminiAIProvider(BaseAIProvider):
             return response.text
         except Exception as e:
             logger.error(f"Gemini Chat error: {str(e)}")
-            return "Une erreur est survenue."
+            return self._fallback("Une erreur est survenue.", f"chat failed: {e}")
+
+    async def summarize_conversation(self, previous_summary, messages):
+        extractive = await super().summarize_conversation(previous_summary, messages)
+        if not self.model: return self._fallback(extractive, "not configured")
+        transcript = "\n".join(f"{'Parieur' if m.role == 'user' else 'Analyste'}: {m.content}" for m in messages)
+        prompt = CHAT_SUMMARY_PROMPT_TEMPLATE.format(previous_summary=previous_summary or "(aucun)", transcript=transcript)
+        try:
+            response = await self.model.generate_content_async(prompt, generation_config=genai.GenerationConfig(temperature=0.2, max_output_tokens=300, response_mime_type="text/plain"))
+            return response.text.strip()[:CHAT_SUMMARY_MAX_CHARS]
+        except Exception as e:
+            logger.error(f"Gemini chat summary error: {str(e)}")
+            return self._fallback(extractive, f"chat summary failed: {e}")
 
     def _validate_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and normalize AI result."""
@@ -223,7 +223,7 @@ class GeminiAIProvider(BaseAIProvider):
         }
 
     def _get_fallback_analysis(self, home_team, away_team):
-        return {"probabilities": {"home": 0.40, "draw": 0.30, "away": 0.30}, "predicted_outcome": "1", "confidence": 0.40, "key_factors": ["Données limitées"], "scenarios": [{"name": "Équilibré", "probability": 1.0, "description": "Force similaire."}], "summary": "Analyse limitée."}
+        return {"probabilities": {"home": 0.40, "draw": 0.30, "away": 0.30}, "predicted_outcome": "1", "confidence": 0.40, "key_factors": ["Données limitées"], "scenarios": [{"name": "Équilibré", "probability": 1.0, "description": "Force similaire."}], "summary": "Analyse limitée.", "is_fallback": True}
 
     def _get_fallback_coupon_analysis(self, matches):
-        return {"overall_probability": 0.1, "risk_score": 0.9, "weakest_link": "N/A", "coherence_score": 0.5, "recommendation": "Calcul impossible.", "detailed_analysis": "IA indisponible.", "selection_insights": []}
+        return {"overall_probability": 0.1, "risk_score": 0.9, "weakest_link": "N/A", "coherence_score": 0.5, "recommendation": "Calcul impossible.", "detailed_analysis": "IA indisponible.", "selection_insights": [], "is_fallback": True}
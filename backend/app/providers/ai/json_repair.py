@@ -0,0 +1,197 @@
+"""
+Local repair of malformed JSON returned by AI models.
+
+Cheap fixes applied before asking the model for a second generation:
+markdown fences and surrounding text are stripped, trailing commas removed,
+truncated strings/arrays/objects closed, and values coerced to the types of
+the expected schema ("65%" -> 0.65, "0,4" -> 0.4, 1 -> "1"). A parsed value
+missing keys the schema requires (answer truncated before them) is
+rejected, so the caller retries instead of filling in defaults.
+"""
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger("providers.json_repair")
+
+_FENCE_RE = re.compile(r"```(?:json)?\s*(.*?)(?:```|$)", re.DOTALL | re.IGNORECASE)
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+_DANGLING_KEY_RE = re.compile(r'(,|(?<=\{))\s*"[^"]*"\s*$')
+
+_decoder = json.JSONDecoder()
+
+
+def _strip_fences(text: str) -> str:
+    match = _FENCE_RE.search(text)
+    return match.group(1) if match else text
+
+
+def _close_truncated(text: str) -> str:
+    """Close an unterminated string and the brackets left open by a truncated answer."""
+    closers = []
+    in_string = escape = False
+    for char in text:
+        if in_string:
+            if escape:
+                escape = False
+            elif char == "\\":
+                escape = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            closers.append("}" if char == "{" else "]")
+        elif char in "}]" and closers:
+            closers.pop()
+
+    if in_string:
+        text += '"'
+    text = text.rstrip()
+    # Membre incomplet en fin de texte : `"cle":`, `"cle"`, `0.` ou virgule pendante
+    text = re.sub(r"[,:]\s*$", "", text)
+    if closers and closers[-1] == "}":
+        text = _DANGLING_KEY_RE.sub("", text)
+    text = re.sub(r"(\d)\.$", r"\1", text)
+    return text + "".join(reversed(closers))
+
+
+def repair_json(text: str) -> Optional[Any]:
+    """Best-effort parse of a malformed JSON answer, None when it cannot be fixed."""
+    candidate = _strip_fences(text).strip()
+    start = min((i for i in (candidate.find("{"), candidate.find("[")) if i >= 0), default=-1)
+    if start < 0:
+        return None
+    candidate = candidate[start:]
+
+    # Objet complet suivi de texte parasite
+    try:
+        value, _ = _decoder.raw_decode(candidate)
+        return value
+    except json.JSONDecodeError:
+        pass
+
+    candidate = _TRAILING_COMMA_RE.sub(r"\1", _close_truncated(candidate))
+    try:
+        return json.loads(candidate)
+    except json.JSONDecodeError:
+        return None
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        cleaned = value.strip().replace(",", ".")
+        percent = cleaned.endswith("%")
+        try:
+            number = float(cleaned.rstrip("%").strip())
+        except ValueError:
+            return None
+        return number / 100 if percent else number
+    return None
+
+
+def coerce_to_schema(value: Any, schema: Dict[str, Any]) -> Any:
+    """Coerce values to the types declared in a JSON schema (in place for containers)."""
+    expected = schema.get("type")
+
+    if expected == "object" and isinstance(value, dict):
+        for key, prop in schema.get("properties", {}).items():
+            if key in value:
+                value[key] = coerce_to_schema(value[key], prop)
+        return value
+
+    if expected == "array" and isinstance(value, list):
+        items = schema.get("items", {})
+        return [coerce_to_schema(item, items) for item in value]
+
+    if expected == "number":
+        number = _to_number(value)
+        if number is None:
+            return value
+        maximum = schema.get("maximum")
+        # Probabilité exprimée en pourcentage (65 au lieu de 0.65)
+        if maximum == 1 and 1 < number <= 100:
+            number /= 100
+        return number
+
+    if expected == "string":
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            value = str(int(value)) if float(value).is_integer() else str(value)
+        if isinstance(value, str) and "enum" in schema and value not in schema["enum"]:
+            upper = value.strip().upper()
+            if upper in schema["enum"]:
+                return upper
+        return value
+
+    return value
+
+
+def missing_required(value: Any, schema: Dict[str, Any], path: str = "") -> List[str]:
+    """Paths of the keys required by `schema` that `value` lacks (nested objects and array items included)."""
+    expected = schema.get("type")
+    if expected == "object":
+        if not isinstance(value, dict):
+            return [path or "."]
+        missing = [f"{path}{key}" for key in schema.get("required", []) if key not in value]
+        for key, prop in schema.get("properties", {}).items():
+            if key in value:
+                missing += missing_required(value[key], prop, f"{path}{key}.")
+        return missing
+    if expected == "array" and isinstance(value, list):
+        items = schema.get("items", {})
+        return [m for i, item in enumerate(value) for m in missing_required(item, items, f"{path}{i}.")]
+    return []
+
+
+def parse_json_response(
+    text: Optional[str],
+    schema: Optional[Dict[str, Any]] = None,
+    provider: str = "ai",
+    task: str = "unknown"
+) -> Tuple[Optional[Any], str]:
+    """
+    Parse a model answer, repairing it locally when needed.
+
+    Returns the parsed value (coerced to `schema` when given) and the outcome:
+    "direct", "repaired" or "failed" (None when unparseable or missing
+    required keys). Outcomes are counted in the `ai.json.parsed` metric;
+    callers count second generations as "retry".
+    """
+    if not text:
+        metrics.incr("ai.json.parsed", provider=provider, task=task, outcome="failed")
+        return None, "failed"
+
+    try:
+        value, outcome = json.loads(text), "direct"
+    except json.JSONDecodeError:
+        value = repair_json(text)
+        outcome = "repaired" if value is not None else "failed"
+
+    missing: List[str] = []
+    if value is not None and schema:
+        value = coerce_to_schema(value, schema)
+        missing = missing_required(value, schema)
+        if missing:
+            logger.warning(
+                f"⚠️ JSON incomplet ({provider}, {task}), clés manquantes: {', '.join(missing[:5])}",
+                extra={'extra_data': {'missing': missing, 'response_preview': text[:200]}}
+            )
+            value, outcome = None, "failed"
+
+    if outcome == "repaired":
+        logger.info(f"🔧 JSON réparé localement ({provider}, {task}), nouvelle génération évitée")
+    elif outcome == "failed" and not missing:
+        logger.warning(
+            f"⚠️ JSON irréparable ({provider}, {task})",
+            extra={'extra_data': {'response_preview': text[:200]}}
+        )
+
+    metrics.incr("ai.json.parsed", provider=provider, task=task, outcome=outcome)
+    return value, outcome
@@ -1,10 +1,14 @@
-import json
+import time
 import httpx
-import asyncio
 from typing import Any, Dict, List, Optional
-from ..base import BaseAIProvider
+from ..base import CHAT_SUMMARY_MAX_CHARS, BaseAIProvider
+from .json_repair import parse_json_response
+from .prompt_builder import build_match_data, log_prompt_tokens, token_budget
+from .schemas import COUPON_ANALYSIS_SCHEMA, MATCH_ANALYSIS_SCHEMA
+from .tiering import ModelTierPolicy
 from app.core.config import get_settings
 from app.core.logger import get_logger
+from app.core.metrics import metrics
 
 settings = get_settings()
 logger = get_logger("providers.ollama")
@@ -45,19 +49,16 @@ SYSTEM_PROMPT = """Tu es un analyste sportif professionnel avec 15 ans d'expéri
 - Sortir du format JSON demandé
 - Donner des probabilités incohérentes (total ≠ 100%)"""
 
-ANALYSIS_PROMPT_TEMPLATE = """Analyse ce match de football pour un pari sportif.
-
-## MATCH
-**{home_team}** 🆚 **{away_team}**
-📍 Compétition: {league_name}
-📅 Date: {match_date}
+# Les templates placent les consignes (identiques d'un appel à l'autre) AVANT les
+# données variables du match : Ollama réutilise ainsi le cache KV du préfixe commun.
+ANALYSIS_PROMPT_TEMPLATE = """Analyse le match de football décrit en fin de message pour un pari sportif.
 
 ## CONSIGNES D'ANALYSE
 
 1. **Probabilités 1X2** (⚠️ CRITIQUE: home + draw + away = 1.0 EXACTEMENT)
-   - Victoire {home_team} (1): X%
+   - Victoire équipe à domicile (1): X%
    - Match nul (X): Y%
-   - Victoire {away_team} (2): Z%
+   - Victoire équipe à l'extérieur (2): Z%
 
 2. **Prédiction finale** ("1", "X" ou "2") avec **confiance** (0.0 à 1.0)
 
@@ -151,21 +152,28 @@ Réponds UNIQUEMENT avec ce JSON (SANS texte avant/après):
 }}
 ```
 
-⚠️ RÉPONDS UNIQUEMENT AVEC LE JSON - PAS DE TEXTE AVANT OU APRÈS"""
-
-COUPON_ANALYSIS_PROMPT_TEMPLATE = """Analyse ce combiné de paris sportifs (coupon).
-
-## Matchs sélectionnés
-{matches_info}
+⚠️ RÉPONDS UNIQUEMENT AVEC LE JSON - PAS DE TEXTE AVANT OU APRÈS
 
-## Ta mission
+## MATCH
+**{home_team}** 🆚 **{away_team}**
+📍 Compétition: {league_name}
+📅 Date: {match_date}
 
-Évalue ce coupon et fournis:
-- Probabilité globale de réussite (0.0 à 1.0)
-- Score de risque (0.0=faible, 1.0=extrême)
-- Point faible (match le plus risqué)
-## MATCHS DU COMBINÉ
-{matches_info}
+## DONNÉES
+### Modèle statistique (référence, à ajuster avec le contexte)
+{model_prior}
+### Cotes
+{odds_data}
+### Statistiques
+{team_stats}
+### Blessures/Suspensions
+{injuries_data}
+### Confrontations directes (H2H)
+{h2h_data}
+### Actualités
+{news_data}"""
+
+COUPON_ANALYSIS_PROMPT_TEMPLATE = """Analyse le combiné de paris sportifs (coupon) décrit en fin de message.
 
 ## CONSIGNES
 
@@ -203,7 +211,36 @@ COUPON_ANALYSIS_PROMPT_TEMPLATE = """Analyse ce combiné de paris sportifs (coup
 }}
 ```
 
-⚠️ RÉPONDS UNIQUEMENT AVEC LE JSON - PAS DE TEXTE AVANT OU APRÈS"""
+⚠️ RÉPONDS UNIQUEMENT AVEC LE JSON - PAS DE TEXTE AVANT OU APRÈS
+
+## MATCHS DU COMBINÉ
+{matches_info}"""
+
+CHAT_SYSTEM_PROMPT = """Tu es un analyste sportif professionnel qui répond aux questions d'un parieur sur une analyse de match déjà réalisée.
+
+**Tes principes:**
+1. T'appuyer sur le contexte de l'analyse fourni et sur la conversation
+2. Répondre en français, de façon claire, concise et actionnable (5 phrases maximum)
+3. Ne jamais inventer de statistiques ni garantir un résultat
+4. Signaler honnêtement quand une information n'est pas disponible"""
+
+# Ajouté au prompt quand la réponse n'a pas pu être réparée localement
+JSON_RETRY_INSTRUCTION = "\n\n⚠️ IMPORTANT: Réponds UNIQUEMENT avec le JSON, sans texte avant ni après."
+
+CHAT_SUMMARY_PROMPT_TEMPLATE = """Mets à jour le résumé d'une conversation entre un parieur et un analyste sportif.
+
+Consignes:
+- 5 phrases maximum, en français
+- Conserver les questions posées, les réponses clés (chiffres, paris évoqués) et les préférences du parieur
+- Ne rien inventer
+
+## RÉSUMÉ ACTUEL
+{previous_summary}
+
+## NOUVEAUX ÉCHANGES
+{transcript}
+
+Réponds uniquement avec le nouveau résumé."""
 
 class OllamaAIProvider(BaseAIProvider):
     """
@@ -211,13 +248,30 @@ class OllamaAIProvider(BaseAIProvider):
     
     Utilise mistral:7b par défaut (meilleur équilibre performance/vitesse).
     Alternatives: llama3:8b (plus précis), llama3.2:3b (plus rapide).
+    
+    Le modèle et les options de génération sont choisis par tâche via
+    `ModelTierPolicy` (modèle léger pour le chat et les coupons, plus gros pour
+    l'analyse de match, repli vers un tier plus rapide sous charge).
+    
+    Les appels passent par `/api/chat` avec un message système stable et le
+    paramètre `keep_alive`, pour que le modèle reste chargé et que le préfixe
+    commun des prompts soit servi depuis le cache KV d'Ollama.
     """
     
-    def __init__(self):
-        self.base_url = getattr(settings, 'ollama_url', 'http://ollama:11434')
-        self.model = getattr(settings, 'ollama_model', 'mistral')  # mistral par défaut
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        raise_errors: bool = False
+    ):
+        self.base_url = base_url or settings.ollama_url
+        self.model = model or settings.ollama_model  # mistral par défaut
+        self.name = f"ollama@{self.base_url}"
+        self.raise_errors = raise_errors
+        self.keep_alive = settings.ollama_keep_alive
         self.available = False
         self.client = None
+        self.tiering = ModelTierPolicy(self.name, self.model)
         
         # Paramètres optimisés pour analyse de paris (équilibre qualité/vitesse)
         self.model_options = {
@@ -225,7 +279,7 @@ class OllamaAIProvider(BaseAIProvider):
             "top_p": 0.9,  # Légèrement augmenté pour diversité contrôlée
             "top_k": 50,  # Plus de choix pour nuances
             "repeat_penalty": 1.15,  # Réduit pour fluidité texte
-            "num_predict": 1500,  # Réduit pour éviter timeouts (1500 tokens ≈ 10-15s)
+            "num_predict": 1500,  # Plafond par défaut, ajusté par tâche (voir tiering.TASK_POLICIES)
         }
         
         # La vérification de disponibilité sera faite au premier appel (pas dans __init__)
@@ -249,71 +303,155 @@ class OllamaAIProvider(BaseAIProvider):
         except Exception as e:
             logger.warning(f"⚠️ Ollama service not available: {str(e)}")
     
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client (keeps connections to Ollama alive)."""
+        if not self.client:
+            # Timeout 90s pour analyses rapides (num_predict=1500)
+            self.client = httpx.AsyncClient(timeout=90.0)
+        return self.client
+    
+    async def warmup(self) -> None:
+        """
+        Preload the tier models and prime the KV cache with the system prompt.
+        
+        An empty `/api/chat` call loads each model into memory for `keep_alive`;
+        a one-token call with SYSTEM_PROMPT then evaluates the shared prefix of
+        the match analysis model so the first real request only pays for its
+        own tokens.
+        """
+        if not settings.ollama_preload:
+            return
+        
+        await self._check_availability()
+        if not self.available:
+            logger.warning("⚠️ Ollama preload skipped: service not available")
+            return
+        
+        client = self._get_client()
+        for model in [self.model] + [m for m in self.tiering.models() if m != self.model]:
+            try:
+                start_time = time.perf_counter()
+                response = await client.post(
+                    f"{self.base_url}/api/chat",
+                    json={"model": model, "messages": [], "keep_alive": self.keep_alive},
+                    timeout=300.0  # Le premier chargement d'un modèle 7B peut être long
+                )
+                response.raise_for_status()
+                
+                if model == self.model:
+                    await self._chat(
+                        [{"role": "system", "content": SYSTEM_PROMPT}],
+                        json_format=False,
+                        options={"num_predict": 1}
+                    )
+                
+                logger.info(
+                    f"🔥 Ollama model {model} preloaded ({time.perf_counter() - start_time:.2f}s, keep_alive={self.keep_alive})"
+                )
+            except Exception as e:
+                logger.warning(f"⚠️ Ollama preload failed for {model}: {str(e)}")
     
-    async def _generate(self, prompt: str, system_prompt: Optional[str] = None) -> str:
+    def _record_timings(self, result: Dict[str, Any], wall_duration: float, model: str) -> Dict[str, Any]:
         """
-        Generate response from Ollama with optimized parameters.
+        Extract Ollama timings (reported in nanoseconds) and record them as metrics.
+        
+        `prompt_eval` is the time spent processing prompt tokens not served from
+        the cache, `eval` the time spent generating; their split shows whether
+        latency comes from the prompt or from the answer length.
+        """
+        ns_to_ms = 1e-6
+        timings = {
+            "load_ms": result.get("load_duration", 0) * ns_to_ms,
+            "prompt_eval_ms": result.get("prompt_eval_duration", 0) * ns_to_ms,
+            "eval_ms": result.get("eval_duration", 0) * ns_to_ms,
+            "total_ms": result.get("total_duration", 0) * ns_to_ms,
+            "wall_ms": wall_duration * 1000,
+            "prompt_eval_count": result.get("prompt_eval_count", 0),
+            "eval_count": result.get("eval_count", 0),
+        }
+        # Approximation du time-to-first-token : chargement + évaluation du prompt
+        timings["ttft_ms"] = timings["load_ms"] + timings["prompt_eval_ms"]
+        
+        for name in ("load_ms", "prompt_eval_ms", "eval_ms", "ttft_ms", "wall_ms"):
+            metrics.observe(f"ollama.{name}", timings[name], model=model)
+        metrics.incr("ollama.prompt_tokens", timings["prompt_eval_count"], model=model)
+        metrics.incr("ollama.completion_tokens", timings["eval_count"], model=model)
+        
+        return timings
+    
+    async def _chat(
+        self,
+        messages: List[Dict[str, str]],
+        json_format: bool = True,
+        options: Optional[Dict[str, Any]] = None,
+        model: Optional[str] = None,
+        schema: Optional[Dict[str, Any]] = None
+    ) -> Optional[str]:
+        """
+        Generate a response from Ollama's chat endpoint.
         
         Args:
-            prompt: User prompt
-            system_prompt: System context (optional, uses SYSTEM_PROMPT by default)
+            messages: Chat messages, starting with a stable system message
+            json_format: Force JSON output (analyses) or free text (chat)
+            options: Overrides merged into the default model options
+            model: Model to use (defaults to the provider's main model)
+            schema: JSON schema constraining the output (structured outputs)
             
         Returns:
-            Generated response text
+            Generated response text, or None on error
         """
+        model = model or self.model
+        self.tiering.in_flight += 1
+        metrics.set_gauge("ollama.in_flight", self.tiering.in_flight, provider=self.name)
         try:
-            if not self.client:
-                # Timeout 90s pour analyses rapides (num_predict=1500)
-                self.client = httpx.AsyncClient(timeout=90.0)
+            client = self._get_client()
             
-            # Combine system + user prompt
-            full_prompt = prompt
-            if system_prompt:
-                full_prompt = f"{system_prompt}\n\n{prompt}"
-            else:
-                full_prompt = f"{SYSTEM_PROMPT}\n\n{prompt}"
+            payload = {
+                "model": model,
+                "messages": messages,
+                "stream": False,
+                "keep_alive": self.keep_alive,
+                "options": {**self.model_options, **(options or {})},  # Paramètres optimisés
+            }
+            if json_format:
+                payload["format"] = schema or "json"  # Force JSON output (schéma complet si fourni)
             
+            prompt_length = sum(len(m.get("content", "")) for m in messages)
             logger.debug(
-                f"🤖 Ollama generation starting - Model: {self.model}, Prompt: {len(full_prompt)} chars"
+                f"🤖 Ollama generation starting - Model: {model}, Prompt: {prompt_length} chars"
             )
             
-            start_time = asyncio.get_event_loop().time()
-            
-            response = await self.client.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": full_prompt,
-                    "stream": False,
-                    "options": self.model_options,  # Paramètres optimisés
-                    "format": "json"  # Force JSON output
-                }
-            )
-            
-            duration = asyncio.get_event_loop().time() - start_time
+            start_time = time.perf_counter()
+            response = await client.post(f"{self.base_url}/api/chat", json=payload)
+            duration = time.perf_counter() - start_time
             
             if response.status_code != 200:
                 logger.error(
                     f"❌ Ollama API error: {response.status_code} - {response.text}",
                     extra={'extra_data': {
                         'provider': 'ollama',
-                        'model': self.model,
+                        'model': model,
                         'status_code': response.status_code
                     }}
                 )
                 return None
             
             result = response.json()
-            generated_text = result.get("response", "")
+            generated_text = result.get("message", {}).get("content", "")
+            timings = self._record_timings(result, duration, model)
             
             logger.info(
-                f"✅ Ollama generation successful - Duration: {duration:.2f}s, Response: {len(generated_text)} chars",
+                f"✅ Ollama generation successful - Duration: {duration:.2f}s "
+                f"(prompt eval: {timings['prompt_eval_ms']:.0f}ms / {timings['prompt_eval_count']} tokens, "
+                f"eval: {timings['eval_ms']:.0f}ms / {timings['eval_count']} tokens), "
+                f"Response: {len(generated_text)} chars",
                 extra={'extra_data': {
                     'provider': 'ollama',
-                    'model': self.model,
+                    'model': model,
                     'duration': duration,
-                    'prompt_length': len(full_prompt),
-                    'response_length': len(generated_text)
+                    'prompt_length': prompt_length,
+                    'response_length': len(generated_text),
+                    **timings
                 }}
             )
             
@@ -321,10 +459,10 @@ class OllamaAIProvider(BaseAIProvider):
                 
         except httpx.ReadTimeout:
             logger.error(
-                f"⏱️ Ollama timeout (>90s) - Modèle trop lent, fallback vers Gemini",
+                f"⏱️ Ollama timeout (>90s) - Modèle trop lent ({self.base_url})",
                 extra={'extra_data': {
                     'provider': 'ollama',
-                    'model': self.model,
+                    'model': model,
                     'error': 'ReadTimeout',
                     'timeout': 90
                 }}
@@ -336,80 +474,132 @@ class OllamaAIProvider(BaseAIProvider):
                 exc_info=True,
                 extra={'extra_data': {
                     'provider': 'ollama',
-                    'model': self.model,
+                    'model': model,
                     'error': str(e)
                 }}
             )
             return None
+        finally:
+            self.tiering.in_flight -= 1
+            metrics.set_gauge("ollama.in_flight", self.tiering.in_flight, provider=self.name)
+    
+    async def _generate(
+        self,
+        prompt: str,
+        tier: Dict[str, Any],
+        schema: Optional[Dict[str, Any]] = None,
+        system_prompt: Optional[str] = None
+    ) -> Optional[str]:
+        """
+        Generate a JSON response for a single-turn task.
+        
+        Args:
+            prompt: User prompt (static instructions first, variable data last)
+            tier: Tier selected by `ModelTierPolicy.select` (model + options)
+            schema: JSON schema of the expected output (optional)
+            system_prompt: System context (optional, uses SYSTEM_PROMPT by default)
+            
+        Returns:
+            Generated response text
+        """
+        return await self._chat(
+            [
+                {"role": "system", "content": system_prompt or SYSTEM_PROMPT},
+                {"role": "user", "content": prompt},
+            ],
+            options=tier["options"],
+            model=tier["model"],
+            schema=schema
+        )
+    
+    async def _generate_json(
+        self,
+        prompt: str,
+        tier: Dict[str, Any],
+        schema: Dict[str, Any],
+        task: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Generate a schema-constrained JSON object.
+        
+        Malformed answers are first repaired locally; a second generation is
+        only requested when the repair fails (counted as outcome "retry").
+        """
+        for attempt in range(2):
+            response_text = await self._generate(prompt, tier, schema=schema)
+            result, _ = parse_json_response(response_text, schema, provider=self.name, task=task)
+            if isinstance(result, dict):
+                return result
+            
+            if attempt == 0:
+                metrics.incr("ai.json.parsed", provider=self.name, task=task, outcome="retry")
+                logger.warning(f"⚠️ Réponse inexploitable pour {task}, nouvelle génération...")
+                prompt += JSON_RETRY_INSTRUCTION
+        return None
+    
+    def _served_by(self, task: str, tier: Dict[str, Any], start_time: float) -> Dict[str, str]:
+        """Record the tier that served a task and describe it for the response."""
+        self.tiering.record(task, tier, (time.perf_counter() - start_time) * 1000)
+        return {"provider": self.name, "model": tier["model"], "tier": tier["tier"]}
+
+    def _record_failure(self, task: str, tier: Dict[str, Any], start_time: float) -> None:
+        """Record a failed or timed-out task with its elapsed time (feeds the tier p95)."""
+        self.tiering.record(task, tier, (time.perf_counter() - start_time) * 1000, failed=True)
 
-    async def analyze_match(self, home_team, away_team, league_name, match_date, team_stats=None, h2h_data=None, injuries_data=None, odds_data=None, news_context=None):
-        """Analyze a match using Ollama with retry logic."""
+    async def analyze_match(self, home_team, away_team, league_name, match_date, team_stats=None, h2h_data=None, injuries_data=None, odds_data=None, news_context=None, model_prior=None):
+        """Analyze a match using Ollama (structured output, local repair, one retry)."""
         if not self.available:
             await self._check_availability()
             if not self.available:
                 logger.warning("Ollama not available, using fallback")
-                return self._get_fallback_analysis(home_team, away_team)
+                return self._fallback(self._get_fallback_analysis(home_team, away_team), "service unavailable")
+        
+        tier = self.tiering.select("match_analysis")
+        start_time = time.perf_counter()
         
+        # Données compactes, dans le budget de tokens du tier sélectionné
+        match_data = build_match_data(
+            team_stats or {},
+            h2h_data or [],
+            injuries_data or [],
+            odds_data or [],
+            news_context or [],
+            budget=token_budget(tier["tier"]),
+            model_prior=model_prior
+        )
         prompt = ANALYSIS_PROMPT_TEMPLATE.format(
             home_team=home_team,
             away_team=away_team,
             league_name=league_name,
-            match_date=match_date
+            match_date=match_date,
+            **match_data
         )
+        log_prompt_tokens(prompt, self.name, "match_analysis")
         
-        # Tentative avec retry (2 tentatives max)
-        for attempt in range(2):
-            try:
-                response_text = await self._generate(prompt)
-                if not response_text:
-                    if attempt == 0:
-                        logger.warning("⚠️ Réponse vide, retry...")
-                        continue
-                    return self._get_fallback_analysis(home_team, away_team)
-                
-                # Nettoyer réponse (enlever markdown si présent)
-                cleaned_response = response_text.strip()
-                if cleaned_response.startswith("```"):
-                    # Extraire JSON du bloc markdown
-                    lines = cleaned_response.split("\n")
-                    cleaned_response = "\n".join(lines[1:-1]) if len(lines) > 2 else cleaned_response
-                
-                # Parse JSON response
-                result = json.loads(cleaned_response)
-                validated = self._validate_result(result)
-                
-                logger.info(f"✅ Analyse match réussie - {home_team} vs {away_team}")
-                return validated
-                
-            except json.JSONDecodeError as e:
-                logger.error(
-                    f"❌ JSON invalide (attempt {attempt+1}/2): {str(e)}",
-                    extra={'extra_data': {
-                        'response_preview': response_text[:200] if response_text else None,
-                        'error': str(e)
-                    }}
-                )
-                if attempt == 0:
-                    # Retry avec prompt simplifié
-                    prompt += "\n\n⚠️ IMPORTANT: Réponds UNIQUEMENT avec le JSON, sans texte avant ni après."
-                    continue
-                return self._get_fallback_analysis(home_team, away_team)
-                
-            except Exception as e:
-                logger.error(f"❌ Erreur analyse (attempt {attempt+1}/2): {str(e)}", exc_info=True)
-                if attempt == 0:
-                    continue
-                return self._get_fallback_analysis(home_team, away_team)
-        
-        return self._get_fallback_analysis(home_team, away_team)
+        try:
+            result = await self._generate_json(prompt, tier, MATCH_ANALYSIS_SCHEMA, "match_analysis")
+            if result is None:
+                self._record_failure("match_analysis", tier, start_time)
+                return self._fallback(self._get_fallback_analysis(home_team, away_team), "match analysis failed")
+            
+            validated = self._validate_result(result)
+            validated["served_by"] = self._served_by("match_analysis", tier, start_time)
+            
+            logger.info(f"✅ Analyse match réussie - {home_team} vs {away_team} ({tier['tier']}: {tier['model']})")
+            return validated
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur analyse: {str(e)}", exc_info=True)
+            self._record_failure("match_analysis", tier, start_time)
+            return self._fallback(self._get_fallback_analysis(home_team, away_team), "match analysis failed")
 
     async def analyze_coupon(self, matches):
-        """Analyze a coupon using Ollama."""
+        """Analyze a coupon using Ollama (structured output, local repair, one retry)."""
         if not self.available:
             await self._check_availability()
             if not self.available:
                 logger.warning("Ollama not available, using fallback")
-                return self._get_fallback_coupon_analysis(matches)
+                return self._fallback(self._get_fallback_coupon_analysis(matches), "service unavailable")
         
         matches_info = "\n".join([
             f"{i+1}. {m.get('home_team')} vs {m.get('away_team')} - {m.get('selection_type')} ({m.get('odds')})"
@@ -417,38 +607,96 @@ class OllamaAIProvider(BaseAIProvider):
         ])
         
         prompt = COUPON_ANALYSIS_PROMPT_TEMPLATE.format(matches_info=matches_info)
+        log_prompt_tokens(prompt, self.name, "coupon_analysis")
+        tier = self.tiering.select("coupon_analysis")
+        start_time = time.perf_counter()
         
         try:
-            response_text = await self._generate(prompt)
-            if not response_text:
-                return self._get_fallback_coupon_analysis(matches)
+            result = await self._generate_json(prompt, tier, COUPON_ANALYSIS_SCHEMA, "coupon_analysis")
+            if result is None:
+                self._record_failure("coupon_analysis", tier, start_time)
+                return self._fallback(self._get_fallback_coupon_analysis(matches), "coupon analysis failed")
             
-            return json.loads(response_text)
+            result["served_by"] = self._served_by("coupon_analysis", tier, start_time)
+            return result
             
         except Exception as e:
             logger.error(f"Ollama coupon analysis error: {str(e)}", exc_info=True)
-            return self._get_fallback_coupon_analysis(matches)
+            self._record_failure("coupon_analysis", tier, start_time)
+            return self._fallback(self._get_fallback_coupon_analysis(matches), "coupon analysis failed")
 
-    async def chat_analysis(self, analysis_summary, history, user_question):
+    async def chat_analysis(self, analysis_summary, history, user_question, memory_summary=""):
         """Chat about an analysis using Ollama."""
         if not self.available:
             await self._check_availability()
             if not self.available:
-                return "Désolé, l'assistant IA est indisponible."
+                return self._fallback("Désolé, l'assistant IA est indisponible.", "service unavailable")
         
-        # Build conversation context
-        context = f"Contexte: {analysis_summary}\n\n"
-        for msg in history[-5:]:  # Last 5 messages
-            role = "Utilisateur" if msg.role == "user" else "Assistant"
-            context += f"{role}: {msg.content}\n"
-        
-        context += f"\nUtilisateur: {user_question}\nAssistant:"
+        # Système + contexte (analyse + résumé de la conversation) ne changent qu'au
+        # repli de l'historique dans le résumé ; entre-temps l'historique ne fait
+        # qu'être prolongé et le préfixe est réutilisé par le cache KV.
+        context = f"Contexte de l'analyse: {analysis_summary}"
+        if memory_summary:
+            context += f"\n\nRésumé de la conversation précédente:\n{memory_summary}"
+        messages = [
+            {"role": "system", "content": CHAT_SYSTEM_PROMPT},
+            {"role": "user", "content": context},
+            {"role": "assistant", "content": "Entendu. Je suis prêt à répondre à vos questions sur ce match."},
+        ]
+        for msg in history:
+            messages.append({
+                "role": "user" if msg.role == "user" else "assistant",
+                "content": msg.content
+            })
+        messages.append({"role": "user", "content": user_question})
         
+        tier = self.tiering.select("chat")
+        start_time = time.perf_counter()
         try:
-            return await self._generate(context) or "Une erreur est survenue."
+            response_text = await self._chat(
+                messages, json_format=False, options=tier["options"], model=tier["model"]
+            )
         except Exception as e:
             logger.error(f"Ollama chat error: {str(e)}", exc_info=True)
-            return "Une erreur est survenue."
+            response_text = None
+        if response_text:
+            self._served_by("chat", tier, start_time)
+        else:
+            self._record_failure("chat", tier, start_time)
+        return response_text or self._fallback("Une erreur est survenue.", "chat generation failed")
+
+    async def summarize_conversation(self, previous_summary, messages):
+        """Fold chat messages into the rolling summary with the fast model tier."""
+        if not self.available:
+            await self._check_availability()
+            if not self.available:
+                return self._fallback(
+                    await super().summarize_conversation(previous_summary, messages), "service unavailable"
+                )
+        
+        transcript = "\n".join(
+            f"{'Parieur' if msg.role == 'user' else 'Analyste'}: {msg.content}" for msg in messages
+        )
+        prompt = CHAT_SUMMARY_PROMPT_TEMPLATE.format(
+            previous_summary=previous_summary or "(aucun)",
+            transcript=transcript
+        )
+        
+        tier = self.tiering.select("chat_summary")
+        start_time = time.perf_counter()
+        response_text = await self._chat(
+            [{"role": "user", "content": prompt}],
+            json_format=False,
+            options=tier["options"],
+            model=tier["model"]
+        )
+        if not response_text:
+            self._record_failure("chat_summary", tier, start_time)
+            return self._fallback(
+                await super().summarize_conversation(previous_summary, messages), "chat summary failed"
+            )
+        self._served_by("chat_summary", tier, start_time)
+        return response_text.strip()[:CHAT_SUMMARY_MAX_CHARS]
 
     def _validate_result(self, result: Dict[str, Any]) -> Dict[str, Any]:
         """Validate and normalize AI result with strict checks."""
@@ -523,7 +771,8 @@ class OllamaAIProvider(BaseAIProvider):
             "confidence": 0.40,
             "key_factors": ["Données limitées"],
             "scenarios": [{"name": "Équilibré", "probability": 1.0, "description": "Force similaire."}],
-            "summary": "Analyse limitée - Service IA indisponible."
+            "summary": "Analyse limitée - Service IA indisponible.",
+            "is_fallback": True
         }
 
     def _get_fallback_coupon_analysis(self, matches):
@@ -535,5 +784,6 @@ class OllamaAIProvider(BaseAIProvider):
             "coherence_score": 0.5,
             "recommendation": "Service IA indisponible.",
             "detailed_analysis": "IA indisponible.",
-            "selection_insights": []
+            "selection_insights": [],
+            "is_fallback": True
         }
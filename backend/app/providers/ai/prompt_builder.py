@@ -0,0 +1,307 @@
+"""
+Compact, token-budgeted assembly of the match data sent to AI models.
+
+Each data source (odds, team stats, injuries, H2H, news) is encoded as short
+tabular lines instead of raw JSON. Sections are then filled by priority
+within a per-model token budget: every section first gets its most useful
+line, then the remaining budget extends sections in priority order.
+"""
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+
+logger = get_logger("providers.prompt_builder")
+
+# Approximation courante pour les modèles multilingues (~4 caractères par token)
+CHARS_PER_TOKEN = 4
+
+# Budget de tokens pour les données variables du match, par modèle / tier.
+# Les tiers Ollama restent sous la fenêtre de contexte par défaut (2048-4096)
+# une fois les consignes et la réponse comptées.
+TOKEN_BUDGETS = {
+    "gemini": 2500,
+    "large": 900,
+    "fast": 600,
+    "tiny": 400,
+}
+DEFAULT_TOKEN_BUDGET = 800
+
+# Sections par ordre de priorité (clé = placeholder des templates)
+SECTION_PRIORITY = ["model_prior", "odds_data", "team_stats", "injuries_data", "h2h_data", "news_data"]
+
+EMPTY_SECTIONS = {
+    "model_prior": "Modèle statistique non disponible",
+    "team_stats": "Statistiques non disponibles",
+    "h2h_data": "Pas d'historique disponible",
+    "injuries_data": "Aucune blessure signalée",
+    "odds_data": "Cotes non disponibles",
+    "news_data": "Aucune actualité récente trouvée.",
+}
+
+MAX_NEWS_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text (no tokenizer dependency)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+def token_budget(model_key: str) -> int:
+    """Token budget for the match data of a model ("gemini", or an Ollama tier)."""
+    return TOKEN_BUDGETS.get(model_key, DEFAULT_TOKEN_BUDGET)
+
+
+def _num(value: Any) -> Optional[str]:
+    """Format a number compactly ("1.50" -> "1.5"), None when missing."""
+    if value in (None, "", "N/A"):
+        return None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return str(value)
+    return f"{number:g}"
+
+
+def encode_stats(stats: Dict[str, Any]) -> List[str]:
+    """Team statistics (API-Football shape) as `clé valeur` pairs, most useful first."""
+    if not stats:
+        return []
+
+    fixtures = stats.get("fixtures", {})
+    goals = stats.get("goals", {})
+    team = stats.get("team", {}).get("name", "Équipe")
+
+    def total(block: Dict[str, Any], key: str) -> Optional[str]:
+        value = block.get(key, {})
+        return _num(value.get("total") if isinstance(value, dict) else value)
+
+    goals_for = goals.get("for", {})
+    goals_against = goals.get("against", {})
+    averages = [
+        _num(goals_for.get("average", {}).get("total")) if isinstance(goals_for.get("average"), dict) else None,
+        _num(goals_against.get("average", {}).get("total")) if isinstance(goals_against.get("average"), dict) else None,
+    ]
+    goals_for_total = goals_for.get("total")
+    goals_against_total = goals_against.get("total")
+    if isinstance(goals_for_total, dict):
+        goals_for_total = goals_for_total.get("total")
+    if isinstance(goals_against_total, dict):
+        goals_against_total = goals_against_total.get("total")
+
+    main = [team]
+    form = stats.get("form")
+    if form and form != "N/A":
+        main.append(f"forme {form[-10:]}")
+    played = total(fixtures, "played")
+    if played and played != "0":
+        main.append(
+            f"J{played} V{total(fixtures, 'wins') or 0} N{total(fixtures, 'draws') or 0} D{total(fixtures, 'loses') or 0}"
+        )
+    if goals_for_total is not None or goals_against_total is not None:
+        main.append(f"buts {_num(goals_for_total) or '?'}-{_num(goals_against_total) or '?'}")
+    if any(averages):
+        main.append(f"moy {averages[0] or '?'}/{averages[1] or '?'}")
+
+    lines = [" | ".join(main)]
+
+    extra = []
+    clean_sheets = total(stats, "clean_sheet")
+    if clean_sheets:
+        extra.append(f"clean sheets {clean_sheets}")
+    failed = total(stats, "failed_to_score")
+    if failed:
+        extra.append(f"sans marquer {failed}")
+    for key, value in (stats.get("statistics") or {}).items():
+        if _num(value) not in (None, "0"):
+            extra.append(f"{key} {_num(value)}")
+    if extra:
+        lines.append(" | ".join(extra))
+
+    # Détail domicile / extérieur
+    home_away = []
+    for side, label in (("home", "dom"), ("away", "ext")):
+        wins = fixtures.get("wins", {})
+        if isinstance(wins, dict) and wins.get(side) is not None and isinstance(fixtures.get("played"), dict):
+            home_away.append(
+                f"{label} J{_num(fixtures['played'].get(side))} V{_num(wins.get(side))} "
+                f"N{_num(fixtures.get('draws', {}).get(side))} D{_num(fixtures.get('loses', {}).get(side))}"
+            )
+    if home_away:
+        lines.append(" | ".join(home_away))
+
+    return lines
+
+
+def encode_h2h(h2h: List[Dict[str, Any]], limit: int = 5) -> List[str]:
+    """Most recent head-to-head results, one per line: `AAAA-MM-JJ Dom 2-1 Ext`."""
+    lines = []
+    for match in (h2h or [])[:limit]:
+        teams = match.get("teams", {})
+        score = match.get("score", {}).get("fulltime", {}) or match.get("goals", {})
+        date = str(match.get("fixture", {}).get("date", ""))[:10]
+        line = (
+            f"{teams.get('home', {}).get('name', '?')} {score.get('home', '?')}-{score.get('away', '?')} "
+            f"{teams.get('away', {}).get('name', '?')}"
+        )
+        lines.append(f"{date} {line}" if date else line)
+    return lines
+
+
+def encode_odds(odds: List[Dict[str, Any]]) -> List[str]:
+    """Main markets of the first bookmaker: 1X2 first, then O/U 2.5 and BTTS."""
+    if not odds:
+        return []
+
+    entry = odds[0]
+    bookmakers = entry.get("bookmakers")
+    bookmaker = bookmakers[0] if bookmakers else entry
+    bets = {bet.get("name"): bet.get("values", []) for bet in bookmaker.get("bets", [])}
+
+    lines = []
+    winner = {str(v.get("value")): _num(v.get("odd")) for v in bets.get("Match Winner", [])}
+    if any(winner.values()):
+        lines.append(f"1X2 {winner.get('Home') or '?'}/{winner.get('Draw') or '?'}/{winner.get('Away') or '?'}")
+
+    goals = {str(v.get("value")): _num(v.get("odd")) for v in bets.get("Goals Over/Under", [])}
+    if goals.get("Over 2.5") or goals.get("Under 2.5"):
+        lines.append(f"+2.5/-2.5 {goals.get('Over 2.5') or '?'}/{goals.get('Under 2.5') or '?'}")
+
+    btts = {str(v.get("value")): _num(v.get("odd")) for v in bets.get("Both Teams Score", [])}
+    if btts.get("Yes") or btts.get("No"):
+        lines.append(f"BTTS oui/non {btts.get('Yes') or '?'}/{btts.get('No') or '?'}")
+
+    return lines
+
+
+def encode_injuries(injuries: List[Dict[str, Any]], limit: int = 10) -> List[str]:
+    """Absences grouped by team: `Équipe: Joueur (raison), ...`."""
+    by_team: Dict[str, List[str]] = {}
+    for injury in (injuries or [])[:limit]:
+        player = injury.get("player", {})
+        team = injury.get("team", {}).get("name", "?")
+        by_team.setdefault(team, []).append(f"{player.get('name', '?')} ({player.get('reason') or 'Blessure'})")
+    return [f"{team}: {', '.join(players)}" for team, players in by_team.items()]
+
+
+def encode_news(news: List[str]) -> List[str]:
+    """News headlines, each shortened to MAX_NEWS_CHARS."""
+    lines = []
+    for item in news or []:
+        text = " ".join(str(item).split())
+        if len(text) > MAX_NEWS_CHARS:
+            text = text[:MAX_NEWS_CHARS - 1].rstrip() + "…"
+        lines.append(text)
+    return lines
+
+
+def encode_prior(prediction: Optional[Dict[str, Any]]) -> List[str]:
+    """Goals model prediction and Elo ratings (see services.stats) as compact lines."""
+    if not prediction:
+        return []
+    lines = []
+    elo = prediction.get("elo")
+    if elo:
+        lines.append(f"Elo {elo['home']} vs {elo['away']} | attente domicile {elo['home_expectancy']:.0%}")
+    market = prediction.get("market") or {}
+    if all(market.get(o, {}).get("fair_probability") for o in ("1", "X", "2")):
+        fair = "/".join(f"{market[o]['fair_probability']:.0%}" for o in ("1", "X", "2"))
+        best = "/".join(f"{market[o]['best_odds']:.2f}" for o in ("1", "X", "2"))
+        lines.append(f"Marché sans marge 1X2 {fair} | meilleures cotes {best}")
+    moves = [
+        f"{outcome} {move['opening']:.2f}→{move['current']:.2f} ({move['change']:+.0%}{', steam' if move['steam'] else ''})"
+        for outcome, move in (prediction.get("movement") or {}).items()
+        if move["change"] and move["market"] in ("1X2", "O/U 2.5")
+    ]
+    if moves:
+        lines.append(f"Mouvement des cotes: {' | '.join(moves)}")
+    if "probabilities" not in prediction:
+        return lines
+    probs = prediction["probabilities"]
+    xg = prediction["expected_goals"]
+    scores = ", ".join(f"{s['score']} {s['probability']:.0%}" for s in prediction.get("correct_scores", []))
+    return lines + [
+        f"1X2 {probs['home']:.0%}/{probs['draw']:.0%}/{probs['away']:.0%} | xG {xg['home']:.2f}-{xg['away']:.2f}",
+        f"+2.5 {prediction['over_under']['2.5']['over']:.0%} | BTTS {prediction['btts']['yes']:.0%} | scores {scores}",
+    ]
+
+
+def _fill_budget(sections: Dict[str, List[str]], budget: int) -> Tuple[Dict[str, List[str]], int]:
+    """Pick section lines by priority until the token budget is spent."""
+    selected: Dict[str, List[str]] = {name: [] for name in sections}
+    used = 0
+
+    def take(name: str, line: str) -> bool:
+        nonlocal used
+        cost = estimate_tokens(line) + 1  # + saut de ligne
+        if used + cost > budget:
+            return False
+        selected[name].append(line)
+        used += cost
+        return True
+
+    # 1er passage : la ligne la plus utile de chaque section
+    for name in SECTION_PRIORITY:
+        if sections.get(name):
+            take(name, sections[name][0])
+
+    # 2e passage : compléter les sections par priorité
+    for name in SECTION_PRIORITY:
+        for line in sections.get(name, [])[len(selected[name]):]:
+            if not take(name, line):
+                break
+
+    return selected, used
+
+
+def build_match_data(
+    team_stats: Dict[str, Any],
+    h2h_data: List[Dict[str, Any]],
+    injuries_data: List[Dict[str, Any]],
+    odds_data: List[Dict[str, Any]],
+    news_context: Optional[List[str]] = None,
+    budget: int = DEFAULT_TOKEN_BUDGET,
+    model_prior: Optional[Dict[str, Any]] = None
+) -> Dict[str, str]:
+    """
+    Encode the match data sections within a token budget.
+
+    Returns the text of each section keyed by the template placeholders
+    (`model_prior`, `team_stats`, `h2h_data`, `injuries_data`, `odds_data`,
+    `news_data`).
+    """
+    sections = {
+        "model_prior": encode_prior(model_prior),
+        "team_stats": encode_stats(team_stats if isinstance(team_stats, dict) else {}),
+        "h2h_data": encode_h2h(h2h_data),
+        "injuries_data": encode_injuries(injuries_data),
+        "odds_data": encode_odds(odds_data),
+        "news_data": encode_news(news_context),
+    }
+    selected, used = _fill_budget(sections, budget)
+
+    dropped = sum(len(lines) for lines in sections.values()) - sum(len(lines) for lines in selected.values())
+    if dropped:
+        logger.debug(f"✂️ Prompt data trimmed to budget ({used}/{budget} tokens, {dropped} lines dropped)")
+
+    return {
+        name: "\n".join(f"- {line}" for line in lines) if lines else EMPTY_SECTIONS[name]
+        for name, lines in selected.items()
+    }
+
+
+def log_prompt_tokens(prompt: str, provider: str, task: str) -> int:
+    """Estimate the tokens of a final prompt, record them and log the request size."""
+    tokens = estimate_tokens(prompt)
+    metrics.observe("ai.prompt_tokens", tokens, provider=provider, task=task)
+    logger.info(
+        f"📏 Prompt {task} ({provider}): ~{tokens} tokens",
+        extra={'extra_data': {
+            'provider': provider,
+            'task': task,
+            'prompt_tokens': tokens,
+            'prompt_chars': len(prompt)
+        }}
+    )
+    return tokens
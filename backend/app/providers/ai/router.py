@@ -0,0 +1,281 @@
+"""
+Routing AI provider - spreads calls over several AI backends.
+
+Tracks rolling latency and error rates per backend and task, sends each call
+to the fastest healthy backend, fails over on errors and can hedge slow calls
+by firing the same request on a second backend (the loser is cancelled).
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional
+
+from ..base import AIProviderError, BaseAIProvider
+from .gemini import GeminiAIProvider
+from .ollama import OllamaAIProvider
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = get_logger("providers.ai_router")
+
+# Minimum number of successful calls before a percentile is trusted for hedging
+MIN_HEDGE_SAMPLES = 10
+# Minimum number of calls before the error rate can mark a backend unhealthy
+MIN_ERROR_SAMPLES = 3
+
+
+class BackendState:
+    """Rolling latency/error statistics for one backend."""
+
+    def __init__(self, provider: BaseAIProvider, window: int):
+        self.provider = provider
+        self.name = provider.name
+        self.window = window
+        self.latencies: Dict[str, Deque[float]] = {}
+        self.outcomes: Deque[bool] = deque(maxlen=window)
+        self.unhealthy_until = 0.0
+
+    def is_healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def expected_latency(self, task: str) -> float:
+        """Median latency for a task; 0 when unknown so new backends get tried."""
+        values = sorted(self.latencies.get(task, ()))
+        return values[len(values) // 2] if values else 0.0
+
+    def hedge_delay(self, task: str, percentile: float) -> Optional[float]:
+        """Latency percentile (seconds) after which a hedged request is fired."""
+        values = sorted(self.latencies.get(task, ()))
+        if len(values) < MIN_HEDGE_SAMPLES:
+            return None
+        index = min(len(values) - 1, int(percentile / 100 * (len(values) - 1)))
+        return values[index]
+
+    def record_success(self, task: str, latency: float) -> None:
+        self.latencies.setdefault(task, deque(maxlen=self.window)).append(latency)
+        self.outcomes.append(True)
+
+    def record_cancelled(self, task: str, elapsed: float) -> None:
+        """
+        Lower bound of the latency of a call cancelled by a winning hedge: a
+        backend that keeps losing hedges gets slower in the ordering.
+        """
+        self.latencies.setdefault(task, deque(maxlen=self.window)).append(elapsed)
+
+    def record_failure(self) -> None:
+        self.outcomes.append(False)
+        if (
+            len(self.outcomes) >= MIN_ERROR_SAMPLES
+            and self.error_rate() >= settings.ai_router_error_threshold
+        ):
+            self.unhealthy_until = time.monotonic() + settings.ai_router_cooldown_seconds
+            # Repartir sur une fenêtre propre après la période d'exclusion
+            self.outcomes.clear()
+            metrics.incr("ai.router.backend_ejected", backend=self.name)
+            logger.warning(
+                f"⚠️ AI backend {self.name} marked unhealthy for {settings.ai_router_cooldown_seconds}s"
+            )
+
+
+class RoutingAIProvider(BaseAIProvider):
+    """AI provider that routes each call to the best of several backends."""
+
+    name = "router"
+
+    def __init__(
+        self,
+        backends: List[BaseAIProvider],
+        hedge_enabled: Optional[bool] = None,
+        hedge_percentile: Optional[float] = None
+    ):
+        if not backends:
+            raise ValueError("RoutingAIProvider needs at least one backend")
+        self.backends = [BackendState(b, settings.ai_router_window) for b in backends]
+        self.hedge_enabled = settings.ai_hedge_enabled if hedge_enabled is None else hedge_enabled
+        self.hedge_percentile = hedge_percentile or settings.ai_hedge_percentile
+        logger.info(
+            f"AI router initialized with backends: {', '.join(b.name for b in self.backends)} "
+            f"(hedging: {'p' + str(self.hedge_percentile) if self.hedge_enabled else 'off'})"
+        )
+
+    def _ordered_backends(self, task: str) -> List[BackendState]:
+        """Healthy backends by expected latency, then unhealthy ones as last resort."""
+        indexed = list(enumerate(self.backends))
+        healthy = [(i, b) for i, b in indexed if b.is_healthy()]
+        unhealthy = [(i, b) for i, b in indexed if not b.is_healthy()]
+        healthy.sort(key=lambda item: (item[1].expected_latency(task), item[0]))
+        return [b for _, b in healthy] + [b for _, b in unhealthy]
+
+    async def _timed_call(
+        self,
+        task: str,
+        backend: BackendState,
+        call: Callable[[BaseAIProvider], Awaitable[Any]]
+    ) -> Any:
+        """Run a call on one backend and record its latency or failure."""
+        start_time = time.perf_counter()
+        try:
+            result = await call(backend.provider)
+        except asyncio.CancelledError:
+            # Perdant d'une requête couverte : ni succès ni échec, durée écoulée comme borne basse
+            backend.record_cancelled(task, time.perf_counter() - start_time)
+            metrics.incr("ai.router.cancelled", backend=backend.name, task=task)
+            raise
+        except Exception as e:
+            backend.record_failure()
+            metrics.incr("ai.router.errors", backend=backend.name, task=task)
+            logger.warning(f"⚠️ AI backend {backend.name} failed on {task}: {e}")
+            raise AIProviderError(str(e)) from e
+
+        latency = time.perf_counter() - start_time
+        backend.record_success(task, latency)
+        metrics.observe("ai.router.latency_ms", latency * 1000, backend=backend.name, task=task)
+        metrics.incr("ai.router.served", backend=backend.name, task=task)
+        return result
+
+    async def _hedged_call(
+        self,
+        task: str,
+        primary: BackendState,
+        remaining: List[BackendState],
+        delay: float,
+        call: Callable[[BaseAIProvider], Awaitable[Any]]
+    ) -> Any:
+        """
+        Start the call on `primary`; if it has not answered after `delay`
+        seconds, start it on the next backend of `remaining` too and keep the
+        first success. The hedging backend is taken out of `remaining` only
+        once the hedge fires, so a primary failing early still fails over to it.
+        """
+        primary_task = asyncio.create_task(self._timed_call(task, primary, call))
+        pending = {primary_task}
+
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                return primary_task.result()
+
+            secondary = remaining.pop(0)
+            metrics.incr("ai.router.hedges", backend=secondary.name, task=task)
+            logger.info(
+                f"⏩ {primary.name} slower than p{self.hedge_percentile:g} on {task}, hedging on {secondary.name}"
+            )
+            pending.add(asyncio.create_task(self._timed_call(task, secondary, call)))
+
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for finished in done:
+                    if finished.exception() is None:
+                        if finished is not primary_task:
+                            metrics.incr("ai.router.hedge_wins", backend=secondary.name, task=task)
+                        return finished.result()
+            raise AIProviderError(f"{primary.name} and {secondary.name} both failed")
+        finally:
+            # Annule la requête perdante (ou toutes si l'appelant est annulé)
+            for loser in pending:
+                loser.cancel()
+
+    async def _route(
+        self,
+        task: str,
+        call: Callable[[BaseAIProvider], Awaitable[Any]],
+        fallback: Callable[[], Any]
+    ) -> Any:
+        """Try backends in order (with optional hedging) until one succeeds."""
+        remaining = self._ordered_backends(task)
+
+        while remaining:
+            primary = remaining.pop(0)
+            delay = primary.hedge_delay(task, self.hedge_percentile) if self.hedge_enabled else None
+
+            try:
+                if remaining and delay is not None:
+                    return await self._hedged_call(task, primary, remaining, delay, call)
+                return await self._timed_call(task, primary, call)
+            except AIProviderError:
+                continue
+
+        metrics.incr("ai.router.exhausted", task=task)
+        logger.error(f"❌ All AI backends failed for {task}, using fallback")
+        return fallback()
+
+    async def warmup(self) -> None:
+        """Warm up every backend concurrently."""
+        await asyncio.gather(*(b.provider.warmup() for b in self.backends), return_exceptions=True)
+
+    async def analyze_match(
+        self,
+        home_team: str,
+        away_team: str,
+        league_name: str,
+        match_date: str,
+        team_stats: Dict[str, Any],
+        h2h_data: List[Dict[str, Any]],
+        injuries_data: List[Dict[str, Any]],
+        odds_data: List[Dict[str, Any]],
+        news_context: List[str] = [],
+        model_prior: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        return await self._route(
+            "match_analysis",
+            lambda provider: provider.analyze_match(
+                home_team, away_team, league_name, match_date,
+                team_stats, h2h_data, injuries_data, odds_data, news_context,
+                model_prior=model_prior
+            ),
+            lambda: self.backends[0].provider._get_fallback_analysis(home_team, away_team)
+        )
+
+    async def analyze_coupon(self, matches: List[Dict[str, Any]]) -> Dict[str, Any]:
+        return await self._route(
+            "coupon_analysis",
+            lambda provider: provider.analyze_coupon(matches),
+            lambda: self.backends[0].provider._get_fallback_coupon_analysis(matches)
+        )
+
+    async def chat_analysis(
+        self,
+        analysis_summary: str,
+        history: List[Any],
+        user_question: str,
+        memory_summary: str = ""
+    ) -> str:
+        return await self._route(
+            "chat",
+            lambda provider: provider.chat_analysis(analysis_summary, history, user_question, memory_summary),
+            lambda: "Désolé, l'assistant IA est indisponible."
+        )
+
+    async def summarize_conversation(self, previous_summary: str, messages: List[Any]) -> str:
+        extractive = await super().summarize_conversation(previous_summary, messages)
+        return await self._route(
+            "chat_summary",
+            lambda provider: provider.summarize_conversation(previous_summary, messages),
+            lambda: extractive
+        )
+
+
+def build_backends(specs: List[str]) -> List[BaseAIProvider]:
+    """
+    Build router backends from `ai_backends` entries.
+
+    Accepted forms: "gemini", "ollama" (default URL) or "ollama:<url>".
+    """
+    backends: List[BaseAIProvider] = []
+    for spec in specs:
+        kind, _, target = spec.strip().partition(":")
+        kind = kind.lower()
+        if kind == "ollama":
+            backends.append(OllamaAIProvider(base_url=target or None, raise_errors=True))
+        elif kind == "gemini":
+            backends.append(GeminiAIProvider(raise_errors=True))
+        else:
+            logger.warning(f"⚠️ Unknown AI backend '{spec}' ignored")
+    return backends
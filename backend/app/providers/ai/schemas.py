@@ -0,0 +1,104 @@
+"""
+JSON schemas of the structured AI outputs.
+
+Passed to the providers so generation is constrained to the expected shape
+(Ollama structured outputs, Gemini response schema) and used locally to
+coerce values of repaired responses.
+"""
+from typing import Any, Dict
+
+PROBABILITY = {"type": "number", "minimum": 0, "maximum": 1}
+
+MATCH_ANALYSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "probabilities": {
+            "type": "object",
+            "properties": {
+                "home": PROBABILITY,
+                "draw": PROBABILITY,
+                "away": PROBABILITY,
+            },
+            "required": ["home", "draw", "away"],
+        },
+        "predicted_outcome": {"type": "string", "enum": ["1", "X", "2"]},
+        "confidence": PROBABILITY,
+        "key_factors": {
+            "type": "array",
+            "items": {"type": "string"},
+            "minItems": 1,
+            "maxItems": 5,
+        },
+        "scenarios": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "name": {"type": "string"},
+                    "probability": PROBABILITY,
+                    "description": {"type": "string"},
+                },
+                "required": ["name", "probability", "description"],
+            },
+            "minItems": 1,
+            "maxItems": 3,
+        },
+        "summary": {"type": "string"},
+    },
+    "required": ["probabilities", "predicted_outcome", "confidence", "key_factors", "scenarios", "summary"],
+}
+
+COUPON_ANALYSIS_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "overall_probability": PROBABILITY,
+        "risk_score": PROBABILITY,
+        "weakest_link": {"type": "string"},
+        "coherence_score": PROBABILITY,
+        "recommendation": {"type": "string"},
+        "detailed_analysis": {"type": "string"},
+        "selection_insights": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "match": {"type": "string"},
+                    "insight": {"type": "string"},
+                },
+                "required": ["match", "insight"],
+            },
+        },
+    },
+    "required": [
+        "overall_probability", "risk_score", "weakest_link", "coherence_score",
+        "recommendation", "detailed_analysis", "selection_insights",
+    ],
+}
+
+# Sous-ensemble OpenAPI accepté par `response_schema` de Gemini
+_GEMINI_KEYS = {
+    "type": "type",
+    "format": "format",
+    "description": "description",
+    "nullable": "nullable",
+    "enum": "enum",
+    "items": "items",
+    "properties": "properties",
+    "required": "required",
+    "minItems": "min_items",
+    "maxItems": "max_items",
+}
+
+
+def to_gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Strip the keywords Gemini's response schema does not support (minimum, maximum...)."""
+    converted: Dict[str, Any] = {}
+    for key, value in schema.items():
+        if key not in _GEMINI_KEYS:
+            continue
+        if key == "properties":
+            value = {name: to_gemini_schema(prop) for name, prop in value.items()}
+        elif key == "items":
+            value = to_gemini_schema(value)
+        converted[_GEMINI_KEYS[key]] = value
+    return converted
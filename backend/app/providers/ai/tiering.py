@@ -0,0 +1,114 @@
+"""
+Load-adaptive model tiering for local AI tasks.
+
+Each task (match analysis, coupon analysis, chat, chat summary) has an
+ordered list of model tiers and right-sized generation options. Under load (too many requests in
+flight or p95 latency above threshold) the policy steps down to faster tiers,
+and steps back up once the load clears.
+"""
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+
+settings = get_settings()
+logger = get_logger("providers.tiering")
+
+# Tiers are listed from preferred (best quality) to fastest
+TASK_POLICIES: Dict[str, Dict[str, Any]] = {
+    "match_analysis": {
+        "tiers": ["large", "fast"],
+        "options": {"num_predict": 1000},  # JSON complet: facteurs + scénarios + résumé
+    },
+    "coupon_analysis": {
+        "tiers": ["fast", "tiny"],
+        "options": {"num_predict": 600},  # Résumé court + insights par sélection
+    },
+    "chat": {
+        "tiers": ["fast", "tiny"],
+        "options": {"num_predict": 350, "temperature": 0.4},  # Réponses de 5 phrases max
+    },
+    "chat_summary": {
+        "tiers": ["fast", "tiny"],
+        "options": {"num_predict": 250, "temperature": 0.2},  # Résumé glissant de 5 phrases max
+    },
+}
+
+# Recent generations per task used for the p95 check (short so the policy
+# steps back up quickly once faster tiers have brought latency down)
+LATENCY_WINDOW = 30
+
+
+class ModelTierPolicy:
+    """
+    Chooses the model and options serving a task given the current load.
+
+    The "large" tier is the model of the provider owning the policy; the
+    faster tiers come from settings.
+    """
+
+    def __init__(self, provider_name: str, model: Optional[str] = None):
+        self.provider_name = provider_name
+        # Tier name -> model
+        self.model_tiers = {
+            "large": model or settings.ollama_model,
+            "fast": settings.ollama_fast_model,
+            "tiny": settings.ollama_tiny_model,
+        }
+        self.in_flight = 0
+        self._latencies: Dict[str, Deque[float]] = {
+            task: deque(maxlen=LATENCY_WINDOW) for task in TASK_POLICIES
+        }
+
+    def models(self) -> List[str]:
+        """Distinct models used by the policy (for preloading)."""
+        names = {tier for policy in TASK_POLICIES.values() for tier in policy["tiers"]}
+        return sorted({self.model_tiers[name] for name in names if self.model_tiers.get(name)})
+
+    def _p95(self, task: str) -> float:
+        values = sorted(self._latencies[task])
+        return values[int(0.95 * (len(values) - 1))] if values else 0.0
+
+    def _load_level(self, task: str) -> int:
+        """0 = normal, 1 = loaded, 2 = overloaded."""
+        max_in_flight = settings.ollama_tier_max_in_flight
+        p95_threshold_ms = settings.ollama_tier_p95_seconds * 1000
+        p95 = self._p95(task)
+
+        if self.in_flight >= 2 * max_in_flight or p95 > 2 * p95_threshold_ms:
+            return 2
+        if self.in_flight >= max_in_flight or p95 > p95_threshold_ms:
+            return 1
+        return 0
+
+    def select(self, task: str) -> Dict[str, Any]:
+        """
+        Return the tier serving `task`: {"tier", "model", "options"}.
+
+        Tiers without a configured model are skipped.
+        """
+        policy = TASK_POLICIES[task]
+        tiers = [name for name in policy["tiers"] if self.model_tiers.get(name)] or ["large"]
+        level = self._load_level(task)
+        tier = tiers[min(level, len(tiers) - 1)]
+
+        if level and tier != tiers[0]:
+            logger.info(
+                f"⬇️ {task}: load level {level} (in flight: {self.in_flight}), stepping down to tier '{tier}'"
+            )
+        return {"tier": tier, "model": self.model_tiers[tier], "options": dict(policy["options"])}
+
+    def record(self, task: str, tier: Dict[str, Any], duration_ms: float, failed: bool = False) -> None:
+        """
+        Record the latency of a generation and which tier served it. Failed
+        generations (timeouts, empty answers) count with their elapsed time:
+        an overloaded model that times out must step the policy down too.
+        """
+        self._latencies[task].append(duration_ms)
+        metrics.observe("ai.task_latency_ms", duration_ms, provider=self.provider_name, task=task, tier=tier["tier"])
+        if failed:
+            metrics.incr("ai.tier_failed", provider=self.provider_name, task=task, tier=tier["tier"])
+        else:
+            metrics.incr("ai.tier_served", provider=self.provider_name, task=task, tier=tier["tier"])
@@ -1,6 +1,22 @@
 from abc import ABC, abstractmethod
 from typing import Any, Dict, List, Optional
 
+
+class AIProviderError(Exception):
+    """Raised by an AI provider in `raise_errors` mode instead of returning a fallback."""
+
+
+# Réponses de repli renvoyées par `chat_analysis` quand l'IA est indisponible
+CHAT_FALLBACK_MESSAGES = frozenset({
+    "Désolé, l'assistant IA est indisponible.",
+    "Désolé, l'assistant IA est actuellement indisponible.",
+    "Une erreur est survenue.",
+    "Une erreur est survenue lors du traitement de votre question.",
+})
+
+# Taille maximale du résumé glissant d'une conversation de chat
+CHAT_SUMMARY_MAX_CHARS = 1200
+
 class BaseFootballProvider(ABC):
     """Abstract base class for football data providers."""
     
@@ -10,7 +26,9 @@ class BaseFootballProvider(ABC):
         date: Optional[str] = None,
         league: Optional[int] = None,
         team: Optional[int] = None,
-        next: Optional[int] = None
+        next: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         pass
     
@@ -48,6 +66,14 @@ class BaseFootballProvider(ABC):
     ) -> List[Dict[str, Any]]:
         pass
     
+    async def get_fixture_odds(self, fixture: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        Odds of a fixture already fetched by the caller (as returned by
+        `get_fixtures`); providers that need the team names to find the odds
+        use them instead of fetching the fixture again.
+        """
+        return await self.get_odds(fixture["fixture"]["id"])
+    
     @abstractmethod
     async def get_injuries(self, fixture_id: int) -> List[Dict[str, Any]]:
         pass
@@ -76,6 +102,12 @@ class BaseFootballProvider(ABC):
 class BaseAIProvider(ABC):
     """Abstract base class for AI analysis providers."""
     
+    # Name used in logs/metrics and by the routing provider
+    name: str = "ai"
+    # When True, failures raise AIProviderError instead of returning canned
+    # fallback output, so a router can fail over to another backend.
+    raise_errors: bool = False
+    
     @abstractmethod
     async def analyze_match(
         self,
@@ -87,8 +119,14 @@ class BaseAIProvider(ABC):
         h2h_data: List[Dict[str, Any]],
         injuries_data: List[Dict[str, Any]],
         odds_data: List[Dict[str, Any]],
-        news_context: List[str] = []
+        news_context: List[str] = [],
+        model_prior: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
+        """
+        `model_prior` is the goals model prediction of the fixture (see
+        services.stats), given to the model as reference probabilities.
+        Fallback results carry `"is_fallback": True`.
+        """
         pass
     
     @abstractmethod
@@ -100,6 +138,36 @@ class BaseAIProvider(ABC):
         self,
         analysis_summary: str,
         history: List[Any],
-        user_question: str
+        user_question: str,
+        memory_summary: str = ""
     ) -> str:
+        """
+        Answer a follow-up question about an analysis.
+        
+        `history` holds the recent turns not yet folded into `memory_summary`,
+        the rolling summary of the older part of the conversation.
+        """
         pass
+    
+    async def summarize_conversation(self, previous_summary: str, messages: List[Any]) -> str:
+        """
+        Fold chat messages into the rolling conversation summary.
+        
+        Default implementation is extractive (no model call): each message is
+        shortened and the summary keeps its most recent CHAT_SUMMARY_MAX_CHARS.
+        """
+        lines = [previous_summary] if previous_summary else []
+        for msg in messages:
+            text = " ".join(msg.content.split())
+            lines.append(f"{'Q' if msg.role == 'user' else 'R'}: {text[:160]}")
+        return "\n".join(lines)[-CHAT_SUMMARY_MAX_CHARS:]
+    
+    async def warmup(self) -> None:
+        """Optional startup hook (e.g. preload a local model). No-op by default."""
+        return None
+    
+    def _fallback(self, value: Any, reason: str) -> Any:
+        """Return the fallback value, or raise if the provider runs behind a router."""
+        if self.raise_errors:
+            raise AIProviderError(f"{self.name}: {reason}")
+        return value
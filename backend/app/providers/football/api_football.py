@@ -48,7 +48,9 @@ class ApiFootballProvider(BaseFootballProvider):
         date: Optional[str] = None,
         league: Optional[int] = None,
         team: Optional[int] = None,
-        next: Optional[int] = None
+        next: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         params = {}
         if date:
@@ -58,6 +60,14 @@ class ApiFootballProvider(BaseFootballProvider):
         if team:
             params["team"] = team
             
+        if date_from and date_to:
+            season = datetime.strptime(date_from, "%Y-%m-%d").year
+            if int(date_from[5:7]) < 7:
+                season -= 1
+            params["season"] = season
+            params["from"] = date_from
+            params["to"] = date_to
+            
         limit = None
         if next:
             limit = next
@@ -137,7 +137,9 @@ class FootballDataOrgProvider(BaseFootballProvider):
         date: Optional[str] = None,
         league: Optional[int] = None,
         team: Optional[int] = None,
-        next: Optional[int] = None
+        next: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Get fixtures from Football-Data.org.
@@ -150,6 +152,11 @@ class FootballDataOrgProvider(BaseFootballProvider):
             params["dateFrom"] = date
             params["dateTo"] = date
         
+        # Plage de dates en une requête (10 jours max. sur l'offre gratuite)
+        if date_from and date_to:
+            params["dateFrom"] = date_from
+            params["dateTo"] = date_to
+        
         if next:
             # Get upcoming matches (max 10 days for Football-Data.org free tier)
             today = datetime.utcnow().date()
@@ -235,9 +242,10 @@ class FootballDataOrgProvider(BaseFootballProvider):
                     "home": match.get("score", {}).get("halfTime", {}).get("home"),
                     "away": match.get("score", {}).get("halfTime", {}).get("away")
                 },
+                # Score à 90 minutes comme API-Football : fullTime inclut la prolongation (regularTime alors fourni)
                 "fulltime": {
-                    "home": match.get("score", {}).get("fullTime", {}).get("home"),
-                    "away": match.get("score", {}).get("fullTime", {}).get("away")
+                    "home": (match.get("score", {}).get("regularTime") or match.get("score", {}).get("fullTime", {})).get("home"),
+                    "away": (match.get("score", {}).get("regularTime") or match.get("score", {}).get("fullTime", {})).get("away")
                 }
             }
         }
@@ -39,14 +39,18 @@ class HybridFootballProvider(BaseFootballProvider):
         date: Optional[str] = None,
         league: Optional[int] = None,
         team: Optional[int] = None,
-        next: Optional[int] = None
+        next: Optional[int] = None,
+        date_from: Optional[str] = None,
+        date_to: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """Get fixtures from Football-Data.org."""
         return await self.football_data.get_fixtures(
             date=date,
             league=league,
             team=team,
-            next=next
+            next=next,
+            date_from=date_from,
+            date_to=date_to
         )
     
     async def get_fixture_by_id(self, fixture_id: int) -> Optional[Dict[str, Any]]:
@@ -190,7 +194,15 @@ class HybridFootballProvider(BaseFootballProvider):
             fixture = await self.football_data.get_fixture_by_id(fixture_id)
             if not fixture:
                 return []
-            
+            return await self.get_fixture_odds(fixture)
+        except Exception as e:
+            logger.error(f"Error getting odds for fixture {fixture_id}: {e}")
+            return []
+    
+    async def get_fixture_odds(self, fixture: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Get betting odds from OddsChecker, using the team names of the given fixture."""
+        fixture_id = fixture["fixture"]["id"]
+        try:
             home_team = fixture["teams"]["home"]["name"]
             away_team = fixture["teams"]["away"]["name"]
             league_name = fixture["league"]["name"].lower().replace(" ", "-")
@@ -59,7 +59,7 @@ class CouponCreate(BaseModel):
 class CouponResponse(BaseModel):
     """Schema for coupon response."""
     id: str
-    user_id: str
+    user_id: str | None
     coupon_type: str
     
     # Metrics
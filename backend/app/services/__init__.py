@@ -1,4 +1,5 @@
 from app.services.cache_service import CacheService, cache_service, CACHE_TTL
+from app.services.chat_cache import ChatAnswerCache, chat_answer_cache
 from app.services.news_service import news_service
 from app.services.stripe_service import stripe_service
 from app.services.moneroo_service import moneroo_service
@@ -12,6 +13,8 @@ __all__ = [
     "CacheService",
     "cache_service",
     "CACHE_TTL",
+    "ChatAnswerCache",
+    "chat_answer_cache",
     "news_service",
     "stripe_service",
     "moneroo_service",
@@ -10,6 +10,9 @@ Tu dois analyser un match et fournir des prédictions précises.
 
 ## Données disponibles
 
+### Modèle statistique (référence, à ajuster avec le contexte)
+{model_prior}
+
 ### Statistiques des équipes
 {team_stats}
 
@@ -9,6 +9,7 @@ from app.services.ai.prompts import (
     MATCH_ANALYSIS_PROMPT_TEMPLATE,
     COUPON_ANALYSIS_PROMPT_TEMPLATE,
 )
+from app.providers.ai.prompt_builder import build_match_data, log_prompt_tokens, token_budget
 
 settings = get_settings()
 logger = get_logger('services.ai')
@@ -32,64 +33,6 @@ class GeminiAIService:
             self.model = None
             logger.warning("Gemini AI Service initialized WITHOUT API KEY. Fallback will be used.")
     
-    def _format_stats(self, stats: Dict[str, Any]) -> str:
-        """Format team statistics for prompt."""
-        if not stats:
-            return "Statistiques non disponibles"
-        
-        return json.dumps(stats, indent=2, ensure_ascii=False)[:2000]
-    
-    def _format_h2h(self, h2h: List[Dict[str, Any]]) -> str:
-        """Format H2H data for prompt."""
-        if not h2h:
-            return "Pas d'historique disponible"
-        
-        results = []
-        for match in h2h[:5]:
-            home = match.get("teams", {}).get("home", {}).get("name", "?")
-            away = match.get("teams", {}).get("away", {}).get("name", "?")
-            score = match.get("score", {}).get("fulltime", {})
-            home_goals = score.get("home", "?")
-            away_goals = score.get("away", "?")
-            results.append(f"- {home} {home_goals}-{away_goals} {away}")
-        
-        return "\n".join(results) if results else "Pas d'historique disponible"
-    
-    def _format_injuries(self, injuries: List[Dict[str, Any]]) -> str:
-        """Format injuries data for prompt."""
-        if not injuries:
-            return "Aucune blessure signalée"
-        
-        injury_list = []
-        for inj in injuries[:10]:
-            player = inj.get("player", {}).get("name", "?")
-            team = inj.get("team", {}).get("name", "?")
-            reason = inj.get("player", {}).get("reason", "Blessure")
-            injury_list.append(f"- {player} ({team}): {reason}")
-        
-        return "\n".join(injury_list) if injury_list else "Aucune blessure signalée"
-    
-    def _format_odds(self, odds: List[Dict[str, Any]]) -> str:
-        """Format odds data for prompt."""
-        if not odds:
-            return "Cotes non disponibles"
-        
-        try:
-            bookmaker = odds[0].get("bookmakers", [{}])[0]
-            bets = bookmaker.get("bets", [])
-            
-            for bet in bets:
-                if bet.get("name") == "Match Winner":
-                    values = bet.get("values", [])
-                    odds_str = []
-                    for v in values:
-                        odds_str.append(f"{v.get('value')}: {v.get('odd')}")
-                    return " | ".join(odds_str)
-        except (IndexError, KeyError):
-            pass
-        
-        return "Cotes non disponibles"
-    
     async def analyze_match(
         self,
         home_team: str,
@@ -100,7 +43,8 @@ class GeminiAIService:
         h2h_data: List[Dict[str, Any]],
         injuries_data: List[Dict[str, Any]],
         odds_data: List[Dict[str, Any]],
-        news_context: List[str] = []
+        news_context: List[str] = [],
+        model_prior: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
         """Analyze a match using Gemini AI."""
         start_time = time.time()
@@ -125,18 +69,24 @@ class GeminiAIService:
             )
             return self._get_fallback_analysis(home_team, away_team)
         
-        # Build prompt
+        # Build prompt (compact data sections within the Gemini token budget)
+        match_data = build_match_data(
+            team_stats,
+            h2h_data,
+            injuries_data,
+            odds_data,
+            news_context,
+            budget=token_budget("gemini"),
+            model_prior=model_prior
+        )
         prompt = MATCH_ANALYSIS_PROMPT_TEMPLATE.format(
             home_team=home_team,
             away_team=away_team,
             league_name=league_name,
             match_date=match_date,
-            team_stats=self._format_stats(team_stats),
-            h2h_data=self._format_h2h(h2h_data),
-            injuries_data=self._format_injuries(injuries_data),
-            odds_data=self._format_odds(odds_data),
-            news_data="\n".join([f"- {n}" for n in news_context]) if news_context else "Aucune actualité récente trouvée."
+            **match_data
         )
+        log_prompt_tokens(prompt, "gemini", "match_analysis")
         
         try:
             logger.debug(f"📝 Generating AI prompt for {home_team} vs {away_team}")
@@ -251,7 +201,8 @@ class GeminiAIService:
                     "description": f"{home_team} et {away_team} semblent de force similaire."
                 }
             ],
-            "summary": f"Match entre {home_team} et {away_team}. Analyse générée avec des données limitées. Veuillez configurer la clé API Gemini pour des analyses plus précises."
+            "summary": f"Match entre {home_team} et {away_team}. Analyse générée avec des données limitées. Veuillez configurer la clé API Gemini pour des analyses plus précises.",
+            "is_fallback": True
         }
 
 
@@ -301,6 +252,7 @@ class GeminiAIService:
             matches_info += f"{i+1}. {m.get('home_team')} vs {m.get('away_team')} - Sélection: {m.get('selection_type')} - Cotes: {m.get('odds')}\n"
 
         prompt = COUPON_ANALYSIS_PROMPT_TEMPLATE.format(matches_info=matches_info)
+        log_prompt_tokens(prompt, "gemini", "coupon_analysis")
 
         try:
             response = await self.model.generate_content_async(
@@ -324,7 +276,8 @@ class GeminiAIService:
             "coherence_score": 0.5,
             "recommendation": "Analyse indisponible pour le moment.",
             "detailed_analysis": "Le service d'IA n'a pas pu analyser ce coupon.",
-            "selection_insights": []
+            "selection_insights": [],
+            "is_fallback": True
         }
 
 
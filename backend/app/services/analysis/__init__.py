@@ -2,9 +2,12 @@
 """Services for match and coupon analysis orchestration."""
 
 from .match_analyzer import MatchAnalyzer, check_analysis_limit, calculate_value_bet
+from .coupon_analyzer import CouponAnalyzer, coupon_analyzer
 
 __all__ = [
     "MatchAnalyzer",
     "check_analysis_limit",
     "calculate_value_bet",
+    "CouponAnalyzer",
+    "coupon_analyzer",
 ]
@@ -1,12 +1,267 @@
 """
 Coupon analyzer service for orchestrating coupon analysis.
 
-This module will contain the business logic for analyzing betting coupons.
-Currently a placeholder for future extraction from coupons.py.
+Leg probabilities come from what is already known about each fixture: the
+latest match analysis of any user (1X2), the goals model predictions
+(all markets) and the margin-free market consensus, loaded for all legs
+in one query and one Redis round trip. The joint probability is simulated
+(services.stats.coupon_simulator). The LLM only writes the narrative,
+cached by the canonical set of selections; on a miss it is generated as
+a background task and attached to the coupon afterwards.
 """
+import asyncio
+import hashlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-# Placeholder for future implementation
-# The coupon analysis logic will be extracted from api/v1/coupons.py
-# in a future refactoring phase.
+import numpy as np
+from sqlalchemy import and_, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-__all__ = []
+from app.core.logger import logger
+from app.core.metrics import metrics
+from app.db.session import async_session_maker
+from app.models import Coupon, MatchAnalysis
+from app.providers.base import BaseAIProvider
+from app.services.cache_service import cache_service
+from app.services.stats.coupon_simulator import coupon_simulator
+from app.services.stats.goals_model import REDIS_UPCOMING_KEY
+from app.services.stats.odds import SELECTION_INDEX, fixture_consensus, selection_fair_probability
+from app.services.stats.value_scanner import model_probabilities
+
+NARRATIVE_KEY = "coupon_narrative:{key}"
+NARRATIVE_TTL = 6 * 3600
+# Champs de l'analyse IA repris dans le récit (les chiffres viennent des modèles)
+NARRATIVE_FIELDS = ("recommendation", "detailed_analysis", "selection_insights", "weakest_link", "coherence_score")
+WEAK_LEG_PROBABILITY = 0.45
+
+
+def selection_key(selections: Sequence[Dict[str, Any]]) -> str:
+    """Canonical key of a set of selections (order and case insensitive)."""
+    canonical = sorted(
+        f"{s['fixture_id']}:{str(s['selection_type']).strip().lower()}" for s in selections
+    )
+    return hashlib.sha1("|".join(canonical).encode()).hexdigest()
+
+
+class CouponAnalyzer:
+    """Evaluates coupons from cached fixture analyses, model probabilities and simulation."""
+
+    def __init__(self):
+        # Récits en cours de génération (une seule génération par clé et par process)
+        self._pending: Dict[str, "asyncio.Future[Optional[Dict[str, Any]]]"] = {}
+
+    async def _latest_analyses(self, db: AsyncSession, fixture_ids: List[int]) -> Dict[int, Dict[str, float]]:
+        """1X2 probabilities of the latest AI analysis of each fixture, all users (one query)."""
+        latest = (
+            select(MatchAnalysis.fixture_id, func.max(MatchAnalysis.created_at).label("created_at"))
+            .where(MatchAnalysis.fixture_id.in_(fixture_ids), MatchAnalysis.from_ai_model())
+            .group_by(MatchAnalysis.fixture_id)
+            .subquery()
+        )
+        result = await db.execute(
+            select(
+                MatchAnalysis.fixture_id,
+                MatchAnalysis.prediction_home,
+                MatchAnalysis.prediction_draw,
+                MatchAnalysis.prediction_away
+            ).join(
+                latest,
+                and_(
+                    MatchAnalysis.fixture_id == latest.c.fixture_id,
+                    MatchAnalysis.created_at == latest.c.created_at
+                )
+            ).where(MatchAnalysis.from_ai_model())
+        )
+        return {
+            fixture_id: {"home": home, "draw": draw, "away": away}
+            for fixture_id, home, draw, away in result.all()
+        }
+
+    async def leg_probabilities(
+        self,
+        db: AsyncSession,
+        selections: Sequence[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[int, Dict[str, float]]]:
+        """
+        Implied and estimated probability of every leg, with its source:
+        "ai" (shared match analysis), "model" (goals model) or "market"
+        (consensus fair probability, no edge assumed); the goals model
+        predictions that were loaded and the AI 1X2 of the analysed fixtures.
+        """
+        fixture_ids = list(dict.fromkeys(s["fixture_id"] for s in selections))
+        analyses = await self._latest_analyses(db, fixture_ids)
+        upcoming, *cached_odds = await cache_service.get_many(
+            [REDIS_UPCOMING_KEY] + [f"odds:{fixture_id}" for fixture_id in fixture_ids]
+        )
+        upcoming = upcoming or {}
+
+        predictions = [upcoming.get(str(fixture_id)) for fixture_id in fixture_ids]
+        probs = model_probabilities(predictions, [analyses.get(fixture_id) for fixture_id in fixture_ids])
+        consensus = [fixture_consensus(odds) if odds else {} for odds in cached_odds]
+        position = {fixture_id: f for f, fixture_id in enumerate(fixture_ids)}
+
+        legs = []
+        for s in selections:
+            f = position[s["fixture_id"]]
+            fair_prob = selection_fair_probability(s["selection_type"], consensus[f])
+            implied_prob = fair_prob or 1 / s["odds"]
+
+            o = SELECTION_INDEX.get(str(s["selection_type"]).strip().lower())
+            probability = probs[f, o] if o is not None else np.nan
+            if np.isnan(probability):
+                probability, source = implied_prob, "market"
+            else:
+                source = "ai" if fixture_ids[f] in analyses and o < 3 else "model"
+            probability = min(float(probability), 0.95)
+
+            legs.append({
+                "implied_probability": round(implied_prob, 4),
+                "ai_probability": round(probability, 4),
+                "edge": round(probability - implied_prob, 4),
+                "source": source,
+            })
+
+        sources = [leg["source"] for leg in legs]
+        for source in ("ai", "model", "market"):
+            metrics.incr(f"coupon_analyzer.legs.{source}", sources.count(source))
+        return legs, upcoming, analyses
+
+    def _statistical_analysis(
+        self,
+        selections: Sequence[Dict[str, Any]],
+        legs: Sequence[Dict[str, Any]],
+        simulation: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Coupon analysis built from the numbers only (no LLM)."""
+        probability = simulation["success_probability"]
+        weakest = max(range(len(selections)), key=lambda j: simulation["legs"][j]["marginal_risk"])
+        weak = selections[weakest]
+        return {
+            "overall_probability": probability,
+            "risk_score": round(1 - probability, 4),
+            "weakest_link": (
+                f"{weak['home_team']} vs {weak['away_team']} - {weak['selection_type']} "
+                f"({legs[weakest]['ai_probability']:.0%})"
+            ),
+            "recommendation": (
+                f"Probabilité estimée {probability:.1%}, espérance {simulation['expected_value']:+.1%} par unité misée."
+            ),
+            "selection_insights": [
+                {
+                    "match": f"{s['home_team']} vs {s['away_team']}",
+                    "insight": f"{s['selection_type']} : {leg['ai_probability']:.0%} (source {leg['source']})",
+                }
+                for s, leg in zip(selections, legs)
+            ],
+        }
+
+    async def evaluate(self, db: AsyncSession, selections: Sequence[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Evaluate a coupon without waiting on the LLM.
+
+        Returns `legs` (per selection probabilities), `simulation`,
+        `weak_points` and `analysis` (numbers + cached narrative, with
+        `narrative_pending` when the narrative still has to be generated).
+        """
+        legs, upcoming, analyses = await self.leg_probabilities(db, selections)
+        # Scores simulés conditionnés sur le 1X2 de l'IA : mêmes probabilités que les sélections "ai"
+        simulation = await coupon_simulator.simulate([
+            {
+                "fixture_id": s["fixture_id"],
+                "selection_type": s["selection_type"],
+                "odds": s["odds"],
+                "probability": leg["ai_probability"]
+            }
+            for s, leg in zip(selections, legs)
+        ], upcoming, {
+            fixture_id: (ai["home"], ai["draw"], ai["away"])
+            for fixture_id, ai in analyses.items()
+        })
+
+        analysis = self._statistical_analysis(selections, legs, simulation)
+        narrative = await self.cached_narrative(selections)
+        analysis.update(narrative or {})
+        analysis["simulation"] = simulation
+        analysis["narrative_pending"] = narrative is None
+
+        return {
+            "legs": legs,
+            "simulation": simulation,
+            "weak_points": [
+                f"{s['home_team']} vs {s['away_team']}: {s['selection_type']}"
+                for s, leg in zip(selections, legs)
+                if leg["ai_probability"] < WEAK_LEG_PROBABILITY
+            ],
+            "analysis": analysis,
+        }
+
+    async def cached_narrative(self, selections: Sequence[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        narrative = await cache_service.get(NARRATIVE_KEY.format(key=selection_key(selections)))
+        metrics.incr("coupon_analyzer.narrative_hits" if narrative else "coupon_analyzer.narrative_misses")
+        return narrative
+
+    async def generate_narrative(
+        self,
+        ai_service: BaseAIProvider,
+        selections: Sequence[Dict[str, Any]],
+        coupon_id: Optional[str] = None
+    ) -> None:
+        """Generate the narrative of a set of selections, cache it and attach it to the coupon."""
+        key = selection_key(selections)
+        pending = self._pending.get(key)
+        if pending is not None:
+            # Déjà en cours pour ces sélections : le récit généré est repris pour ce coupon
+            narrative = await asyncio.shield(pending)
+        else:
+            narrative = await self._generate(ai_service, key, selections)
+        if coupon_id:
+            await self._attach(coupon_id, narrative)
+
+    async def _generate(
+        self,
+        ai_service: BaseAIProvider,
+        key: str,
+        selections: Sequence[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Narrative of the selections (None on failure or fallback), shared with concurrent requests."""
+        future: "asyncio.Future[Optional[Dict[str, Any]]]" = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        narrative = None
+        try:
+            result = await ai_service.analyze_coupon([
+                {
+                    "home_team": s["home_team"],
+                    "away_team": s["away_team"],
+                    "selection_type": s["selection_type"],
+                    "odds": s["odds"]
+                }
+                for s in selections
+            ])
+            if not result.get("is_fallback"):
+                narrative = {field: result[field] for field in NARRATIVE_FIELDS if field in result}
+                await cache_service.set(NARRATIVE_KEY.format(key=key), narrative, NARRATIVE_TTL)
+        except Exception as e:
+            logger.error(f"❌ Coupon narrative generation failed: {str(e)}", exc_info=True)
+        finally:
+            del self._pending[key]
+            future.set_result(narrative)
+        return narrative
+
+    async def _attach(self, coupon_id: str, narrative: Optional[Dict[str, Any]]) -> None:
+        """Attach the narrative to the coupon; without one, the coupon stops waiting for it."""
+        try:
+            async with async_session_maker() as db:
+                coupon = await db.get(Coupon, coupon_id)
+                if coupon:
+                    coupon.ai_analysis = {**(coupon.ai_analysis or {}), **(narrative or {}), "narrative_pending": False}
+                    if narrative:
+                        coupon.ai_recommendation = narrative.get("recommendation", coupon.ai_recommendation)
+                    await db.commit()
+        except Exception as e:
+            logger.error(f"❌ Coupon narrative update failed: {str(e)}", exc_info=True)
+
+
+# Singleton instance
+coupon_analyzer = CouponAnalyzer()
+
+__all__ = ["CouponAnalyzer", "coupon_analyzer", "selection_key"]
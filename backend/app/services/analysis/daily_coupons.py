@@ -0,0 +1,187 @@
+"""
+Daily coupon generation (Safe / Balanced / Ambitious).
+
+Candidates are the priced outcomes of the upcoming fixtures, with the AI
+probability when the fixture was analysed and the goals model otherwise.
+Each profile is searched with services.stats.coupon_search; the coupons
+are stored once per day (no owner) and cached in Redis for the endpoint.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logger import logger
+from app.models import Coupon, CouponSelection, CouponType, RiskLevel
+from app.services.cache_service import cache_service
+from app.services.stats.coupon_search import CouponProfile, beam_search
+from app.services.stats.odds import OUTCOMES, build_odds_array, market_consensus
+from app.services.stats.value_scanner import model_probabilities
+
+settings = get_settings()
+
+DAILY_PROFILES = [
+    (CouponProfile(CouponType.DAILY_SAFE.value, 2, 3, 0.65, 1.5, 2.6, "probability"), RiskLevel.LOW, "Sûr"),
+    (CouponProfile(CouponType.DAILY_BALANCED.value, 3, 4, 0.50, 2.5, 6.0, "expected_value"), RiskLevel.MEDIUM, "Équilibré"),
+    (CouponProfile(CouponType.DAILY_AMBITIOUS.value, 4, 6, 0.35, 6.0, 30.0, "expected_value"), RiskLevel.HIGH, "Ambitieux"),
+]
+
+DAILY_CACHE_KEY = "daily_coupons:latest"
+DAILY_LOCK_KEY = "daily_coupons:lock:{day}"
+DAILY_DONE_KEY = "daily_coupons:done:{day}"
+
+
+def _selection_type(outcome: str) -> str:
+    """Coupon selection label of an outcome ("1", "Over 2.5", "BTTS Yes"...)."""
+    return f"BTTS {outcome}" if outcome in ("Yes", "No") else outcome
+
+
+class DailyCouponGenerator:
+    """Builds, stores and serves the daily coupons."""
+
+    def build(
+        self,
+        fixtures: Sequence[Dict[str, Any]],
+        odds_by_fixture: Sequence[List[Dict[str, Any]]],
+        predictions: Sequence[Optional[Dict[str, Any]]],
+        ai_probabilities: Sequence[Optional[Dict[str, float]]]
+    ) -> List[Dict[str, Any]]:
+        """Coupons of every profile (profiles without a feasible combination are skipped)."""
+        if not fixtures:
+            return []
+        prices = build_odds_array(odds_by_fixture)[0]
+        consensus = market_consensus(prices)
+        probs = model_probabilities(predictions, ai_probabilities)
+        best_price = consensus["best_price"]
+
+        # Candidats aplatis (match x issue) cotés et probabilisés
+        n_fixtures, n_outcomes = probs.shape
+        fixture_index = np.repeat(np.arange(n_fixtures), n_outcomes)
+        outcome_index = np.tile(np.arange(n_outcomes), n_fixtures)
+        flat_probs, flat_prices = probs.ravel(), best_price.ravel()
+        known = ~np.isnan(flat_probs) & ~np.isnan(flat_prices)
+        league_ids = np.array([f.get("league", {}).get("id") or 0 for f in fixtures])
+
+        coupons = []
+        for profile, risk_level, label in DAILY_PROFILES:
+            legs = beam_search(
+                np.where(known, flat_probs, 0.0),
+                np.where(known, flat_prices, 0.0),
+                fixture_index,
+                league_ids[fixture_index],
+                profile
+            )
+            if legs is None:
+                logger.warning(f"No feasible {profile.coupon_type} coupon among {n_fixtures} fixtures")
+                continue
+
+            selections = []
+            for i in legs:
+                f, o = fixture_index[i], outcome_index[i]
+                fixture = fixtures[f]
+                fair = consensus["fair_probability"][f, o]
+                implied = float(fair) if not np.isnan(fair) else 1 / float(flat_prices[i])
+                selections.append({
+                    "fixture_id": fixture["fixture"]["id"],
+                    "home_team": fixture["teams"]["home"]["name"],
+                    "away_team": fixture["teams"]["away"]["name"],
+                    "match_date": fixture["fixture"]["date"],
+                    "league": fixture.get("league", {}).get("name"),
+                    "selection_type": _selection_type(OUTCOMES[o][1]),
+                    "odds": float(flat_prices[i]),
+                    "implied_probability": round(implied, 4),
+                    "ai_probability": round(float(flat_probs[i]), 4),
+                    "edge": round(float(flat_probs[i]) - implied, 4),
+                })
+
+            total_odds = float(np.prod([s["odds"] for s in selections]))
+            probability = float(np.prod([s["ai_probability"] for s in selections]))
+            coupons.append({
+                "coupon_type": profile.coupon_type,
+                "risk_level": risk_level.value,
+                "total_odds": round(total_odds, 2),
+                "success_probability": round(probability, 4),
+                "expected_value": round(probability * total_odds - 1, 4),
+                "recommendation": (
+                    f"Coupon {label} : {len(selections)} sélections, cote {total_odds:.2f}, "
+                    f"probabilité estimée {probability:.0%}."
+                ),
+                "selections": selections,
+            })
+        return coupons
+
+    async def save(self, db: AsyncSession, coupons: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Store the daily coupons and cache their summaries for the endpoint."""
+        now = datetime.utcnow()
+        summaries = []
+        for data in coupons:
+            coupon = Coupon(
+                user_id=None,
+                coupon_type=data["coupon_type"],
+                total_odds=data["total_odds"],
+                success_probability=data["success_probability"],
+                risk_level=data["risk_level"],
+                ai_recommendation=data["recommendation"],
+                weak_points=[
+                    f"{s['home_team']} vs {s['away_team']}: {s['selection_type']}"
+                    for s in sorted(data["selections"], key=lambda s: s["ai_probability"])[:1]
+                ],
+                ai_analysis={"generator": "beam_search", "expected_value": data["expected_value"]},
+                selections_count=len(data["selections"]),
+                created_at=now
+            )
+            coupon.selections = [
+                CouponSelection(
+                    fixture_id=s["fixture_id"],
+                    home_team=s["home_team"],
+                    away_team=s["away_team"],
+                    match_date=datetime.fromisoformat(s["match_date"].replace("Z", "+00:00")).replace(tzinfo=None),
+                    selection_type=s["selection_type"],
+                    odds=s["odds"],
+                    implied_probability=s["implied_probability"],
+                    ai_probability=s["ai_probability"],
+                    edge=s["edge"]
+                )
+                for s in data["selections"]
+            ]
+            db.add(coupon)
+            summaries.append((coupon, data))
+        await db.commit()
+
+        cached = [
+            {
+                "id": coupon.id,
+                "coupon_type": coupon.coupon_type,
+                "total_odds": coupon.total_odds,
+                "success_probability": coupon.success_probability,
+                "risk_level": coupon.risk_level,
+                "status": coupon.status,
+                "selections_count": len(data["selections"]),
+                "created_at": now.isoformat(),
+            }
+            for coupon, data in summaries
+        ]
+        await cache_service.set(DAILY_CACHE_KEY, cached, 36 * 3600)
+        return cached
+
+    async def acquire(self, day: str) -> bool:
+        """Take the generation lock of a day; False if already generated or running elsewhere."""
+        r = await cache_service.get_redis()
+        if await r.exists(DAILY_DONE_KEY.format(day=day)):
+            return False
+        return bool(await r.set(DAILY_LOCK_KEY.format(day=day), "1", nx=True, ex=settings.daily_coupons_lock_seconds))
+
+    async def release(self, day: str, done: bool) -> None:
+        r = await cache_service.get_redis()
+        if done:
+            await r.set(DAILY_DONE_KEY.format(day=day), "1", ex=2 * 86400)
+        await r.delete(DAILY_LOCK_KEY.format(day=day))
+
+    async def get_cached(self) -> Optional[List[Dict[str, Any]]]:
+        return await cache_service.get(DAILY_CACHE_KEY)
+
+
+# Singleton instance
+daily_coupon_generator = DailyCouponGenerator()
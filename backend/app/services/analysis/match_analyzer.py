@@ -15,11 +15,20 @@ from app.core.logger import logger
 from app.models import User, MatchAnalysis
 from app.providers.base import BaseFootballProvider, BaseAIProvider
 from app.services import cache_service, CACHE_TTL
+from app.services.analysis_quota import analysis_quota_service
+from app.services.stats import elo_service, goals_model_service, odds_history_service
+from app.services.stats.odds import fixture_consensus
+from app.services.stats.value_scanner import fixture_value_bets
+from app.services.user_stats import user_stats_service
 
 
 async def check_analysis_limit(user: User, db: AsyncSession) -> None:
     """
-    Check if user has reached their daily analysis limit.
+    Check the user's daily analysis limit and consume one analysis.
+    
+    The quota is an atomic Redis counter (services.analysis_quota): the
+    users row is not locked nor updated here. Callers refund the analysis
+    if it fails.
     
     Args:
         user: The current user
@@ -28,37 +37,16 @@ async def check_analysis_limit(user: User, db: AsyncSession) -> None:
     Raises:
         HTTPException: If daily limit is reached
     """
-    limit = user.analyses_limit
-    
-    # Unlimited for Pro/Lifetime
-    if limit == -1:
-        return
-    
-    # Reset counter if new day
-    today = datetime.utcnow().date()
-    if user.daily_analyses_reset_at:
-        reset_date = user.daily_analyses_reset_at.date()
-        if reset_date < today:
-            user.daily_analyses_used = 0
-            user.daily_analyses_reset_at = datetime.utcnow()
-            await db.commit()
-    else:
-        user.daily_analyses_reset_at = datetime.utcnow()
-        await db.commit()
-    
-    if user.daily_analyses_used >= limit:
-        raise HTTPException(
-            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-            detail=f"Daily analysis limit reached ({limit} per day). Upgrade your plan for more analyses."
-        )
+    await analysis_quota_service.acquire(user)
 
 
 def calculate_value_bet(probs: Dict[str, float], odds_data: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
     """
     Calculate the best value bet based on AI probabilities and market odds.
     
-    A value bet is identified when the AI's probability estimate is higher
-    than the implied probability from the odds (with a 5% threshold).
+    All bookmakers are compared (best price per outcome, see
+    services.stats.value_scanner); a value bet is identified when the
+    expected value exceeds `value_bet_min_edge` (5% by default).
     
     Args:
         probs: AI probability predictions {"home": 0.x, "draw": 0.x, "away": 0.x}
@@ -71,57 +59,8 @@ def calculate_value_bet(probs: Dict[str, float], odds_data: List[Dict[str, Any]]
         return None
         
     try:
-        # Extract Match Winner odds
-        market_odds = {}
-        bookmakers = odds_data[0].get("bookmakers", [])
-        if not bookmakers: 
-            return None
-        
-        # Use first available bookmaker (usually the most popular/complete)
-        bets = bookmakers[0].get("bets", [])
-        for bet in bets:
-            if bet.get("name") == "Match Winner":
-                for val in bet.get("values", []):
-                    label = val.get("value")
-                    odd_str = val.get("odd")
-                    # Validate odd is a valid number > 1.0
-                    try:
-                        odd = float(odd_str)
-                        if odd <= 0 or odd != odd:  # Check for negative, zero, or NaN
-                            continue
-                    except (ValueError, TypeError):
-                        continue
-                    
-                    if label == "Home": market_odds["1"] = odd
-                    elif label == "Draw": market_odds["X"] = odd
-                    elif label == "Away": market_odds["2"] = odd
-        
-        if not market_odds: 
-            return None
-        
-        # Calculate EV for each outcome
-        # value = (Prob * Odd) - 1
-        values = []
-        mapping = {"1": "home", "X": "draw", "2": "away"}
-        
-        for outcome, odd in market_odds.items():
-            prob = probs.get(mapping[outcome], 0)
-            value = (prob * odd) - 1
-            values.append({
-                "outcome": outcome,
-                "ai_probability": prob,
-                "market_odds": odd,
-                "value_percentage": round(value * 100, 2),
-                "is_value": value > 0.05  # Threshold 5% for calling it a "Value"
-            })
-            
-        if not values:
-            return None
-
-        # Return the one with highest value
-        values.sort(key=lambda x: x["value_percentage"], reverse=True)
-        return values[0]
-        
+        values = fixture_value_bets(probs, odds_data)
+        return values[0] if values else None
     except Exception as e:
         logger.error(f"Error calculating value bet: {e}")
         return None
@@ -233,6 +172,41 @@ class MatchAnalyzer:
             get_news()
         )
     
+    async def _model_prior(self, home_team_id: int, away_team_id: int) -> Optional[Dict[str, Any]]:
+        """Goals model prediction and Elo ratings of the matchup (None when unavailable)."""
+        try:
+            prediction, elo = await asyncio.gather(
+                goals_model_service.predict(home_team_id, away_team_id),
+                elo_service.matchup(home_team_id, away_team_id)
+            )
+        except Exception as e:
+            logger.error(f"Error computing statistical prior: {e}")
+            return None
+        if elo:
+            prediction = {**(prediction or {}), "elo": elo}
+        return prediction
+    
+    def _apply_model_fallback(
+        self,
+        ai_result: Dict[str, Any],
+        model_prior: Optional[Dict[str, Any]],
+        home_team: str,
+        away_team: str
+    ) -> Dict[str, Any]:
+        """Replace the canned AI fallback by the statistical model analysis."""
+        if ai_result.get("is_fallback") and model_prior and "probabilities" in model_prior:
+            logger.warning(f"AI analysis unavailable, using goals model for {home_team} vs {away_team}")
+            return goals_model_service.fallback_analysis(model_prior, home_team, away_team)
+        return ai_result
+    
+    @staticmethod
+    def _model_name(ai_result: Dict[str, Any]) -> str:
+        """Backend that produced the prediction ("ollama:mistral", "goals_model:dixon-coles"...)."""
+        served_by = ai_result.get("served_by") or {}
+        if served_by.get("provider"):
+            return f"{served_by['provider']}:{served_by.get('model', '')}"[:100]
+        return "fallback" if ai_result.get("is_fallback") else "unknown"
+
     def _determine_predicted_outcome(self, probs: Dict[str, float]) -> str:
         """Determine the predicted outcome from probabilities."""
         if probs["home"] > probs["draw"] and probs["home"] > probs["away"]:
@@ -262,12 +236,27 @@ class MatchAnalyzer:
             Saved MatchAnalysis object
         """
         await check_analysis_limit(user, self.db)
-        
+        try:
+            return await self._analyze_custom(home_team, away_team, h2h_data, user)
+        except BaseException:
+            # Analyse non délivrée : quota rendu
+            await analysis_quota_service.refund(user)
+            raise
+
+    async def _analyze_custom(
+        self,
+        home_team: Dict[str, Any],
+        away_team: Dict[str, Any],
+        h2h_data: List[Dict[str, Any]],
+        user: User
+    ) -> MatchAnalysis:
         home_name = home_team["name"]
         away_name = away_team["name"]
         
         logger.info(f"Performing custom analysis for {home_name} vs {away_name} for user {user.email}")
         
+        model_prior = await self._model_prior(home_team["id"], away_team["id"])
+        
         # AI Analysis with available data
         ai_result = await self.ai_service.analyze_match(
             home_team=home_name,
@@ -278,8 +267,10 @@ class MatchAnalyzer:
             h2h_data=h2h_data,
             injuries_data=[],
             odds_data=[],
-            news_context=[]
+            news_context=[],
+            model_prior=model_prior
         )
+        ai_result = self._apply_model_fallback(ai_result, model_prior, home_name, away_name)
         
         # Extract predictions
         probs = ai_result["probabilities"]
@@ -302,6 +293,7 @@ class MatchAnalyzer:
             prediction_away=probs["away"],
             predicted_outcome=predicted_outcome,
             confidence_score=ai_result["confidence"],
+            model_name=self._model_name(ai_result),
             summary=ai_result["summary"],
             key_factors=ai_result["key_factors"],
             scenarios=ai_result["scenarios"],
@@ -311,10 +303,8 @@ class MatchAnalyzer:
         
         self.db.add(analysis)
         
-        # Increment usage
-        user.daily_analyses_used += 1
-        
         try:
+            await user_stats_service.increment(self.db, user.id, analyses_count=1)
             await self.db.commit()
             await self.db.refresh(analysis)
         except Exception as e:
@@ -324,6 +314,7 @@ class MatchAnalyzer:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Erreur lors de l'enregistrement de l'analyse personnalisée."
             )
+        await user_stats_service.invalidate(user.id)
             
         return analysis
 
@@ -343,7 +334,14 @@ class MatchAnalyzer:
             Saved MatchAnalysis object
         """
         await check_analysis_limit(user, self.db)
-        
+        try:
+            return await self._analyze(fixture, user)
+        except BaseException:
+            # Analyse non délivrée : quota rendu
+            await analysis_quota_service.refund(user)
+            raise
+
+    async def _analyze(self, fixture: Dict[str, Any], user: User) -> MatchAnalysis:
         # Extract fixture info
         fixture_id = fixture["fixture"]["id"]
         home_team = fixture["teams"]["home"]["name"]
@@ -363,10 +361,19 @@ class MatchAnalyzer:
         logger.info(f"Performing analysis for {home_team} vs {away_team} (fixture_id: {fixture_id})")
         
         # Fetch all required data
-        h2h_data, injuries_data, odds_data, team_stats, news_context = await self._fetch_fixture_data(
-            fixture_id, home_team_id, away_team_id, league_id, home_team, away_team
+        (h2h_data, injuries_data, odds_data, team_stats, news_context), model_prior, movement = await asyncio.gather(
+            self._fetch_fixture_data(
+                fixture_id, home_team_id, away_team_id, league_id, home_team, away_team
+            ),
+            self._model_prior(home_team_id, away_team_id),
+            odds_history_service.movement(fixture_id)
         )
         
+        # Consensus du marché (sans marge, toutes les bookmakers) et mouvement des cotes
+        market = fixture_consensus(odds_data) if odds_data else {}
+        if market or movement:
+            model_prior = {**(model_prior or {}), "market": market, "movement": movement}
+        
         # AI Analysis
         ai_result = await self.ai_service.analyze_match(
             home_team=home_team,
@@ -377,8 +384,10 @@ class MatchAnalyzer:
             h2h_data=h2h_data,
             injuries_data=injuries_data,
             odds_data=odds_data,
-            news_context=news_context
+            news_context=news_context,
+            model_prior=model_prior
         )
+        ai_result = self._apply_model_fallback(ai_result, model_prior, home_team, away_team)
         
         # Determine predicted outcome
         probs = ai_result["probabilities"]
@@ -403,6 +412,7 @@ class MatchAnalyzer:
             prediction_away=probs["away"],
             predicted_outcome=predicted_outcome,
             confidence_score=ai_result["confidence"],
+            model_name=self._model_name(ai_result),
             summary=ai_result["summary"],
             key_factors=ai_result["key_factors"],
             scenarios=ai_result["scenarios"],
@@ -413,10 +423,8 @@ class MatchAnalyzer:
         
         self.db.add(analysis)
         
-        # Increment usage
-        user.daily_analyses_used += 1
-        
         try:
+            await user_stats_service.increment(self.db, user.id, analyses_count=1)
             await self.db.commit()
             await self.db.refresh(analysis)
         except Exception as e:
@@ -426,6 +434,7 @@ class MatchAnalyzer:
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                 detail="Erreur lors de l'enregistrement de l'analyse."
             )
+        await user_stats_service.invalidate(user.id)
         
         logger.info(f"Analysis {analysis.id} saved for user {user.email}")
         
@@ -0,0 +1,176 @@
+"""
+Daily analysis quota enforced with atomic Redis counters.
+
+Each user has one counter per UTC day; a Lua script checks the limit and
+increments it in a single step, so concurrent analyses of the same user
+cannot overrun it, and an analysis that fails is refunded. The `users`
+row is no longer touched on the request path: changed counters are
+marked dirty and written back to `daily_analyses_used` in batches by a
+periodic task (`flush`). When a counter is missing (first analysis of the
+day, Redis flushed) it is seeded from the row.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, List, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import case, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.models import User
+from app.services.cache_service import cache_service
+
+logger = get_logger('services.analysis_quota')
+
+QUOTA_KEY = "analysis_quota:{user_id}:{day}"
+DIRTY_KEY = "analysis_quota:dirty"
+# Compteur conservé au-delà de sa journée, le temps d'être recopié en base
+QUOTA_TTL_SECONDS = 2 * 24 * 3600
+FLUSH_BATCH = 500
+
+# KEYS: compteur, ensemble des compteurs modifiés
+# ARGV: limite (-1 = illimité), TTL, valeur initiale, membre "user_id|jour"
+# Retourne la nouvelle valeur, -1 si la limite est atteinte
+ACQUIRE_SCRIPT = """
+redis.call('SET', KEYS[1], ARGV[3], 'EX', ARGV[2], 'NX')
+local limit = tonumber(ARGV[1])
+if limit >= 0 and tonumber(redis.call('GET', KEYS[1])) >= limit then
+    return -1
+end
+local used = redis.call('INCR', KEYS[1])
+redis.call('SADD', KEYS[2], ARGV[4])
+return used
+"""
+
+REFUND_SCRIPT = """
+if tonumber(redis.call('GET', KEYS[1]) or '0') > 0 then
+    redis.call('DECR', KEYS[1])
+    redis.call('SADD', KEYS[2], ARGV[1])
+end
+return 1
+"""
+
+
+def _today() -> date:
+    return datetime.utcnow().date()
+
+
+def _stored_used(user: User, day: date) -> int:
+    """Analyses of `day` recorded on the user row (0 if the row is from an older day)."""
+    if user.daily_analyses_reset_at and user.daily_analyses_reset_at.date() == day:
+        return user.daily_analyses_used or 0
+    return 0
+
+
+class AnalysisQuotaService:
+    """Check-and-increment of the daily analysis quota, write-behind to MySQL."""
+
+    async def acquire(self, user: User) -> int:
+        """
+        Consume one analysis of today's quota; 429 when the limit is reached.
+        Returns the number of analyses used today, this one included.
+        """
+        limit = user.analyses_limit
+        day = _today()
+        key = QUOTA_KEY.format(user_id=user.id, day=day.isoformat())
+        try:
+            r = await cache_service.get_redis()
+            used = await r.register_script(ACQUIRE_SCRIPT)(
+                keys=[key, DIRTY_KEY],
+                args=[limit, QUOTA_TTL_SECONDS, _stored_used(user, day), f"{user.id}|{day.isoformat()}"]
+            )
+        except Exception as e:
+            # Redis indisponible : contrôle sur la valeur connue de la ligne, sans décompte
+            logger.warning(f"⚠️ Analysis quota unavailable, checking the stored counter: {str(e)}")
+            metrics.incr("analysis_quota.unavailable")
+            used = _stored_used(user, day)
+            if limit != -1 and used >= limit:
+                used = -1
+
+        if used == -1:
+            metrics.incr("analysis_quota.rejected")
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail=f"Daily analysis limit reached ({limit} per day). Upgrade your plan for more analyses."
+            )
+        return int(used)
+
+    async def refund(self, user: User) -> None:
+        """Give back the analysis consumed by a request that failed."""
+        day = _today().isoformat()
+        try:
+            r = await cache_service.get_redis()
+            await r.register_script(REFUND_SCRIPT)(
+                keys=[QUOTA_KEY.format(user_id=user.id, day=day), DIRTY_KEY],
+                args=[f"{user.id}|{day}"]
+            )
+            metrics.incr("analysis_quota.refunds")
+        except Exception as e:
+            logger.warning(f"⚠️ Analysis quota refund failed for {user.id}: {str(e)}")
+
+    async def used(self, user: User) -> int:
+        """Analyses used today (Redis counter, else the user row)."""
+        day = _today()
+        try:
+            value = await cache_service.get(QUOTA_KEY.format(user_id=user.id, day=day.isoformat()))
+        except Exception:
+            value = None
+        return int(value) if value is not None else _stored_used(user, day)
+
+    async def flush(self, db: AsyncSession) -> int:
+        """Write the changed counters back to users.daily_analyses_used, in batches."""
+        r = await cache_service.get_redis()
+        flushed = 0
+        while True:
+            members: List[str] = await r.spop(DIRTY_KEY, FLUSH_BATCH) or []
+            if not members:
+                break
+            entries: List[Tuple[str, str]] = [tuple(m.split("|", 1)) for m in members]
+            values = await r.mget([QUOTA_KEY.format(user_id=u, day=d) for u, d in entries])
+
+            # Jour le plus récent de chaque utilisateur (compteur expiré : ignoré)
+            latest: Dict[str, Tuple[date, int]] = {}
+            for (user_id, day), value in zip(entries, values):
+                if value is None:
+                    continue
+                day = date.fromisoformat(day)
+                if user_id not in latest or latest[user_id][0] < day:
+                    latest[user_id] = (day, int(value))
+
+            try:
+                for day in {d for d, _ in latest.values()}:
+                    counts = {u: n for u, (d, n) in latest.items() if d == day}
+                    day_start = datetime.combine(day, time.min)
+                    # Une journée plus ancienne n'écrase pas le compteur du jour
+                    await db.execute(
+                        update(User)
+                        .where(
+                            User.id.in_(list(counts)),
+                            or_(
+                                User.daily_analyses_reset_at.is_(None),
+                                User.daily_analyses_reset_at < day_start + timedelta(days=1)
+                            )
+                        )
+                        .values(
+                            daily_analyses_used=case(counts, value=User.id),
+                            daily_analyses_reset_at=day_start
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                # Compteurs remis à recopier au prochain passage
+                await r.sadd(DIRTY_KEY, *members)
+                raise
+            flushed += len(latest)
+
+        if flushed:
+            metrics.incr("analysis_quota.flushed", flushed)
+            logger.info(f"🧮 Analysis quotas flushed for {flushed} users")
+        return flushed
+
+
+# Singleton instance
+analysis_quota_service = AnalysisQuotaService()
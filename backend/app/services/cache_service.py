@@ -14,6 +14,7 @@ class CacheService:
     
     def __init__(self):
         self._redis: redis.Redis | None = None
+        self._binary_redis: redis.Redis | None = None
     
     async def get_redis(self) -> redis.Redis:
         """Get Redis connection."""
@@ -27,6 +28,12 @@ class CacheService:
             logger.info("✅ Redis connection established")
         return self._redis
     
+    async def get_binary_redis(self) -> redis.Redis:
+        """Get a Redis connection returning raw bytes (binary values)."""
+        if self._binary_redis is None:
+            self._binary_redis = redis.from_url(settings.redis_url, decode_responses=False)
+        return self._binary_redis
+    
     async def get(self, key: str) -> Any | None:
         """Get a value from cache."""
         r = await self.get_redis()
@@ -42,6 +49,23 @@ class CacheService:
         logger.log_cache('GET', key, hit=False)
         return None
     
+    async def get_many(self, keys: list[str]) -> list[Any | None]:
+        """Get several values in one round trip (None for missing keys)."""
+        if not keys:
+            return []
+        r = await self.get_redis()
+        values = []
+        for key, value in zip(keys, await r.mget(keys)):
+            logger.log_cache('GET', key, hit=bool(value))
+            if not value:
+                values.append(None)
+                continue
+            try:
+                values.append(json.loads(value))
+            except json.JSONDecodeError:
+                values.append(value)
+        return values
+    
     async def set(
         self,
         key: str,
@@ -78,6 +102,9 @@ class CacheService:
     
     async def close(self) -> None:
         """Close Redis connection."""
+        if self._binary_redis:
+            await self._binary_redis.close()
+            self._binary_redis = None
         if self._redis:
             await self._redis.close()
             self._redis = None
@@ -0,0 +1,185 @@
+"""
+Semantic answer cache for the analysis chat.
+
+Questions are embedded locally (Ollama embeddings endpoint) and kept, with
+their answers, in small array-backed indexes: one per analysis and one per
+fixture and prediction (analyses of a match sharing the same 1X2). A new
+question close enough (cosine similarity) to a cached one gets the cached
+answer instead of a new LLM generation. Only the opening question of a
+conversation is cached: a follow-up ("and the other team?") depends on the
+previous turns, which the question embedding does not capture.
+"""
+import time
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import httpx
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.providers.base import CHAT_FALLBACK_MESSAGES
+
+settings = get_settings()
+logger = get_logger('services.chat_cache')
+
+
+class SemanticIndex:
+    """Fixed-capacity matrix of unit vectors with their answers (LRU eviction)."""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.created_at = np.zeros(capacity, dtype=np.float64)
+        self.last_used = np.zeros(capacity, dtype=np.float64)
+        self.answers: List[Optional[str]] = [None] * capacity
+        self.size = 0
+
+    def search(self, vector: np.ndarray, now: float, ttl: float) -> Tuple[int, float]:
+        """Best live entry for a unit vector: (row, cosine similarity), (-1, -1) if none."""
+        if not self.size:
+            return -1, -1.0
+        scores = self.vectors[:self.size] @ vector
+        scores[self.created_at[:self.size] < now - ttl] = -1.0
+        row = int(np.argmax(scores))
+        return row, float(scores[row])
+
+    def add(self, vector: np.ndarray, answer: str, now: float) -> None:
+        """Insert an entry, replacing the least recently used one when full."""
+        if self.size < len(self.answers):
+            row = self.size
+            self.size += 1
+        else:
+            row = int(np.argmin(self.last_used))
+        self.vectors[row] = vector
+        self.answers[row] = answer
+        self.created_at[row] = now
+        self.last_used[row] = now
+
+
+class ChatAnswerCache:
+    """Per-analysis and per-fixture semantic cache of chat answers."""
+
+    def __init__(self):
+        self._indexes: "OrderedDict[str, SemanticIndex]" = OrderedDict()
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=5.0)
+        return self._client
+
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Unit-normalized embedding of a question, None when the embedder is unavailable."""
+        try:
+            response = await self._get_client().post(
+                f"{settings.ollama_url}/api/embed",
+                json={
+                    "model": settings.ollama_embed_model,
+                    "input": " ".join(text.lower().split()),
+                    "keep_alive": settings.ollama_keep_alive,
+                }
+            )
+            response.raise_for_status()
+            vector = np.asarray(response.json()["embeddings"][0], dtype=np.float32)
+        except Exception as e:
+            logger.warning(f"⚠️ Chat cache embedding unavailable: {str(e)}")
+            return None
+
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else None
+
+    def _scopes(
+        self,
+        analysis_id: str,
+        fixture_id: Optional[int],
+        prediction: Optional[Sequence[float]]
+    ) -> List[Tuple[str, float]]:
+        """Indexes to search, with their similarity threshold (analysis first)."""
+        scopes = [(f"analysis:{analysis_id}", settings.chat_cache_similarity)]
+        # fixture_id 0 = analyse personnalisée, pas de partage entre analyses ;
+        # partage limité aux analyses du match donnant les mêmes probabilités
+        if fixture_id and prediction:
+            key = "/".join(f"{p:.2f}" for p in prediction)
+            scopes.append((f"fixture:{fixture_id}:{key}", settings.chat_cache_fixture_similarity))
+        return scopes
+
+    def _index(self, scope: str, dim: int, create: bool = False) -> Optional[SemanticIndex]:
+        index = self._indexes.get(scope)
+        if index is not None and index.vectors.shape[1] != dim:
+            # Modèle d'embedding changé : vecteurs incomparables
+            index = None
+        if index is None:
+            if not create:
+                return None
+            index = SemanticIndex(dim, settings.chat_cache_max_entries)
+            self._indexes[scope] = index
+            while len(self._indexes) > settings.chat_cache_max_scopes:
+                self._indexes.popitem(last=False)
+        self._indexes.move_to_end(scope)
+        return index
+
+    async def lookup(
+        self,
+        question: str,
+        analysis_id: str,
+        fixture_id: Optional[int] = None,
+        prediction: Optional[Sequence[float]] = None
+    ) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Find a cached answer for the opening question of a conversation;
+        `prediction` is the (home, draw, away) probabilities of the analysis.
+
+        Returns (answer, question vector); the vector is passed back to
+        `store` on a miss so the question is embedded only once.
+        """
+        if not settings.chat_cache_enabled:
+            return None, None
+
+        vector = await self.embed(question)
+        if vector is None:
+            return None, None
+
+        now = time.time()
+        ttl = settings.chat_cache_ttl_seconds
+        for scope, threshold in self._scopes(analysis_id, fixture_id, prediction):
+            index = self._index(scope, vector.shape[0])
+            if index is None:
+                continue
+            row, score = index.search(vector, now, ttl)
+            if row >= 0 and score >= threshold:
+                index.last_used[row] = now
+                self._record(hit=True, scope=scope.split(":")[0])
+                logger.log_cache('CHAT', scope, hit=True)
+                logger.info(f"💬 Chat answer served from cache ({scope}, similarity {score:.3f})")
+                return index.answers[row], vector
+
+        self._record(hit=False)
+        logger.log_cache('CHAT', f"analysis:{analysis_id}", hit=False)
+        return None, vector
+
+    def store(
+        self,
+        vector: Optional[np.ndarray],
+        answer: str,
+        analysis_id: str,
+        fixture_id: Optional[int] = None,
+        prediction: Optional[Sequence[float]] = None
+    ) -> None:
+        """Cache an answer in the analysis and fixture indexes (fallback answers are skipped)."""
+        if vector is None or not answer or answer in CHAT_FALLBACK_MESSAGES:
+            return
+        now = time.time()
+        for scope, _ in self._scopes(analysis_id, fixture_id, prediction):
+            self._index(scope, vector.shape[0], create=True).add(vector, answer, now)
+
+    def _record(self, hit: bool, scope: str = "none") -> None:
+        metrics.incr("chat_cache.lookups")
+        if hit:
+            metrics.incr("chat_cache.hits")
+            metrics.incr("chat_cache.hits_by_scope", scope=scope)
+        metrics.set_gauge("chat_cache.hit_rate", metrics.ratio("chat_cache.hits", "chat_cache.lookups") or 0.0)
+
+
+# Singleton instance
+chat_answer_cache = ChatAnswerCache()
@@ -0,0 +1,151 @@
+"""
+Conversation memory of the analysis chat.
+
+Each analysis chat keeps a rolling summary of its older messages plus a
+window of recent messages replayed verbatim. After each turn, once the
+unsummarized messages exceed the window by CHAT_FOLD_STEP, the oldest ones
+are folded into the summary in the background. The window only moves by
+blocks, so consecutive turns share the same prompt prefix (cache-friendly
+for local models) and prompt size stays bounded.
+"""
+from typing import List, Sequence, Tuple
+
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.db.session import async_session_maker
+from app.models import ChatMemory, ChatMessage
+from app.providers import get_ai_provider
+from app.providers.ai.prompt_builder import estimate_tokens
+
+logger = get_logger('services.chat_memory')
+
+# Messages récents toujours renvoyés tels quels au modèle
+CHAT_WINDOW_MESSAGES = 6
+# Nombre de messages repliés d'un coup dans le résumé
+CHAT_FOLD_STEP = 4
+
+
+class ChatMemoryService:
+    """Rolling summary + recent window per analysis chat."""
+
+    async def load(self, db: AsyncSession, analysis_id: str) -> Tuple[str, List[ChatMessage]]:
+        """Return (rolling summary, messages not yet folded into it)."""
+        memory = (await db.execute(
+            select(ChatMemory).where(ChatMemory.analysis_id == analysis_id)
+        )).scalar_one_or_none()
+
+        result = await db.execute(
+            select(ChatMessage)
+            .where(ChatMessage.analysis_id == analysis_id)
+            # Même seconde : la question (user) avant la réponse (assistant)
+            .order_by(ChatMessage.created_at.asc(), ChatMessage.role.desc())
+            .offset(memory.summarized_count if memory else 0)
+        )
+        history = list(result.scalars().all())
+
+        # Si le repli en arrière-plan a pris du retard, la fenêtre reste bornée
+        max_messages = CHAT_WINDOW_MESSAGES + 2 * CHAT_FOLD_STEP
+        return (memory.summary if memory else ""), history[-max_messages:]
+
+    def record_turn(
+        self,
+        analysis_id: str,
+        analysis_summary: str,
+        memory_summary: str,
+        history: Sequence[ChatMessage],
+        question_tokens: int,
+        answer_tokens: int
+    ) -> int:
+        """Account the tokens of a chat turn; returns the estimated prompt tokens."""
+        summary_tokens = estimate_tokens(memory_summary)
+        history_tokens = sum(msg.token_count or estimate_tokens(msg.content) for msg in history)
+        prompt_tokens = estimate_tokens(analysis_summary) + summary_tokens + history_tokens + question_tokens
+
+        metrics.observe("chat.prompt_tokens", prompt_tokens)
+        metrics.observe("chat.answer_tokens", answer_tokens)
+        logger.info(
+            f"💬 Chat turn ~{prompt_tokens} prompt tokens "
+            f"(summary {summary_tokens}, window {len(history)} msgs / {history_tokens}), ~{answer_tokens} answer tokens",
+            extra={'extra_data': {
+                'analysis_id': analysis_id,
+                'prompt_tokens': prompt_tokens,
+                'summary_tokens': summary_tokens,
+                'history_messages': len(history),
+                'history_tokens': history_tokens,
+                'question_tokens': question_tokens,
+                'answer_tokens': answer_tokens
+            }}
+        )
+        return prompt_tokens
+
+    async def update(self, analysis_id: str) -> None:
+        """
+        Fold the oldest unsummarized messages into the summary (background task).
+
+        Uses its own session: the request session is closed by then. Concurrent
+        updates are resolved optimistically on `summarized_count`.
+        """
+        try:
+            async with async_session_maker() as db:
+                memory = (await db.execute(
+                    select(ChatMemory).where(ChatMemory.analysis_id == analysis_id)
+                )).scalar_one_or_none()
+                summarized_count = memory.summarized_count if memory else 0
+
+                result = await db.execute(
+                    select(ChatMessage)
+                    .where(ChatMessage.analysis_id == analysis_id)
+                    .order_by(ChatMessage.created_at.asc(), ChatMessage.role.desc())
+                    .offset(summarized_count)
+                )
+                pending = list(result.scalars().all())
+                if len(pending) < CHAT_WINDOW_MESSAGES + CHAT_FOLD_STEP:
+                    return
+
+                # Replier par blocs entiers de CHAT_FOLD_STEP messages
+                excess = len(pending) - CHAT_WINDOW_MESSAGES
+                to_fold = pending[:excess - excess % CHAT_FOLD_STEP]
+                summary = await get_ai_provider().summarize_conversation(
+                    memory.summary if memory else "", to_fold
+                )
+                values = {
+                    "summary": summary,
+                    "summary_tokens": estimate_tokens(summary),
+                    "summarized_count": summarized_count + len(to_fold),
+                }
+
+                if memory is None:
+                    db.add(ChatMemory(analysis_id=analysis_id, **values))
+                else:
+                    result = await db.execute(
+                        update(ChatMemory)
+                        .where(
+                            ChatMemory.id == memory.id,
+                            ChatMemory.summarized_count == summarized_count
+                        )
+                        .values(**values)
+                    )
+                    if result.rowcount == 0:
+                        logger.debug(f"Chat memory {analysis_id} already updated by another turn")
+                        await db.rollback()
+                        return
+                await db.commit()
+
+                metrics.incr("chat.memory_folds")
+                logger.info(
+                    f"🧠 Chat memory updated for analysis {analysis_id}: "
+                    f"{len(to_fold)} messages folded, summary ~{values['summary_tokens']} tokens"
+                )
+        except IntegrityError:
+            # Mémoire créée en parallèle par un autre tour
+            logger.debug(f"Chat memory {analysis_id} created concurrently")
+        except Exception as e:
+            logger.error(f"❌ Chat memory update failed for analysis {analysis_id}: {str(e)}", exc_info=True)
+
+
+# Singleton instance
+chat_memory_service = ChatMemoryService()
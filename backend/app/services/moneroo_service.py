@@ -1,11 +1,11 @@
-import requests
-import json
+import httpx
 import logging
 import hmac
 import hashlib
-from typing import Optional, Dict, Any
+from typing import Optional
 
 from app.core.config import get_settings
+from app.core.metrics import metrics
 from app.models.user import User
 
 settings = get_settings()
@@ -23,6 +23,17 @@ class MonerooService:
             "Authorization": f"Bearer {self.secret_key}",
             "Accept": "application/json"
         }
+        self.client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Pooled async client (connections reused across payments)."""
+        if self.client is None or self.client.is_closed:
+            self.client = httpx.AsyncClient(
+                base_url=self.base_url,
+                headers=self.headers,
+                timeout=settings.payment_timeout_seconds
+            )
+        return self.client
 
     def verify_signature(self, payload: bytes, signature: str) -> bool:
         """Verify Moneroo webhook signature."""
@@ -72,22 +83,18 @@ class MonerooService:
         }
         
         try:
-            # Using requests for simplicity as it's a single call, 
-            # but httpx would be better for async. 
-            # Given the environment, I'll use requests as it's already in requirements.
-            response = requests.post(
-                f"{self.base_url}/payments/initialize", 
-                headers=self.headers, 
-                data=json.dumps(data)
-            )
+            with metrics.timer("payments.latency_ms", provider="moneroo", operation="payment.initialize"):
+                response = await self._get_client().post("/payments/initialize", json=data)
             
             if response.status_code == 201:
                 result = response.json()
                 return result.get("data", {}).get("checkout_url") or result.get("checkout_url")
             else:
+                metrics.incr("payments.errors", provider="moneroo", operation="payment.initialize")
                 logger.error(f"Moneroo error: {response.status_code} - {response.text}")
                 return None
         except Exception as e:
+            metrics.incr("payments.errors", provider="moneroo", operation="payment.initialize")
             logger.error(f"Moneroo exception: {e}")
             return None
 
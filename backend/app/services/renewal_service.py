@@ -10,6 +10,7 @@ from sqlalchemy import select, and_
 
 from app.models.user import User, SubscriptionType
 from app.core.config import get_settings
+from app.services.user_cache import user_cache
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
@@ -90,6 +91,8 @@ class RenewalReminderService:
         
         if count > 0:
             await db.commit()
+            for user in expired_users:
+                await user_cache.invalidate(user.id)
             logger.info(f"Successfully downgraded {count} expired Mobile Money subscriptions")
         
         return count
@@ -0,0 +1,256 @@
+"""
+Settlement of analyses, coupon selections and coupons from final scores.
+
+Finished (or voided) fixtures are matched to the pending rows through the
+`fixture_id` indexes and resolved with set-based UPDATEs, one transaction
+per chunk of fixtures. Only pending rows are touched, so running the
+settlement again on the same fixtures is a no-op; settled analyses are
+added to the accuracy rollups in the same transaction.
+"""
+import re
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import case, func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.models import Coupon, CouponSelection, MatchAnalysis
+from app.models.coupon import CouponStatus, SelectionResult
+from app.services.stats.prediction_stats import prediction_stats_service
+from app.services.user_stats import user_stats_service
+
+logger = get_logger('services.settlement')
+
+# Matchs réglés par transaction
+SETTLEMENT_CHUNK = 500
+# Lignes par UPDATE (taille des listes IN / CASE)
+UPDATE_BATCH = 1000
+
+_LINE_PATTERN = re.compile(r"^(over|under)\s*(\d+(?:\.\d+)?)$")
+
+
+def match_outcome(home_goals: int, away_goals: int) -> str:
+    """1X2 outcome of a final score."""
+    if home_goals > away_goals:
+        return "1"
+    if home_goals < away_goals:
+        return "2"
+    return "X"
+
+
+def selection_result(selection_type: str, home_goals: int, away_goals: int) -> Optional[str]:
+    """
+    Result ("won"/"lost") of a selection for a final score: 1X2, double
+    chance, over/under any line and BTTS; None for unsupported markets.
+    """
+    label = selection_type.strip().lower()
+    outcome = match_outcome(home_goals, away_goals).lower()
+    total = home_goals + away_goals
+
+    if label in ("1", "x", "2"):
+        won = label == outcome
+    elif label in ("1x", "x2", "12"):
+        won = outcome in label
+    elif label in ("btts yes", "btts no"):
+        won = (home_goals > 0 and away_goals > 0) == (label == "btts yes")
+    else:
+        line = _LINE_PATTERN.match(label)
+        if not line:
+            return None
+        won = total > float(line.group(2)) if line.group(1) == "over" else total < float(line.group(2))
+    return SelectionResult.WON.value if won else SelectionResult.LOST.value
+
+
+def _chunks(items: List[Any], size: int) -> Iterable[List[Any]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class SettlementService:
+    """Resolves pending analyses, selections and coupons in bulk."""
+
+    async def _settle_analyses(self, db: AsyncSession, scores: Dict[int, Tuple[int, int]]) -> int:
+        """
+        actual_result / was_correct of the analyses, one UPDATE per outcome,
+        and their scores added to the accuracy rollups.
+        """
+        if not scores:
+            return 0
+        # Verrou des lignes réglées : un règlement concurrent les ignore
+        result = await db.execute(
+            select(
+                MatchAnalysis.id, MatchAnalysis.fixture_id, MatchAnalysis.user_id,
+                MatchAnalysis.league_id, MatchAnalysis.league_name, MatchAnalysis.model_name,
+                MatchAnalysis.prediction_home, MatchAnalysis.prediction_draw, MatchAnalysis.prediction_away,
+                MatchAnalysis.predicted_outcome
+            )
+            .where(MatchAnalysis.fixture_id.in_(list(scores)), MatchAnalysis.actual_result.is_(None))
+            .with_for_update(skip_locked=True)
+        )
+        rows = [
+            {**row, "actual_result": match_outcome(*scores[row["fixture_id"]])}
+            for row in result.mappings().all()
+        ]
+
+        by_outcome: Dict[str, List[str]] = {}
+        for row in rows:
+            by_outcome.setdefault(row["actual_result"], []).append(row["id"])
+        for outcome, analysis_ids in by_outcome.items():
+            for batch in _chunks(analysis_ids, UPDATE_BATCH):
+                await db.execute(
+                    update(MatchAnalysis)
+                    .where(MatchAnalysis.id.in_(batch))
+                    .values(actual_result=outcome, was_correct=MatchAnalysis.predicted_outcome == outcome)
+                    .execution_options(synchronize_session=False)
+                )
+
+        await prediction_stats_service.record(db, rows)
+        return len(rows)
+
+    async def _settle_selections(
+        self,
+        db: AsyncSession,
+        scores: Dict[int, Tuple[int, int]],
+        void_ids: List[int]
+    ) -> int:
+        """Result of the pending selections, one UPDATE per result."""
+        rows = await db.execute(
+            select(CouponSelection.id, CouponSelection.fixture_id, CouponSelection.selection_type)
+            .where(
+                CouponSelection.fixture_id.in_(list(scores) + void_ids),
+                CouponSelection.result == SelectionResult.PENDING.value
+            )
+        )
+        by_result: Dict[str, List[str]] = {}
+        for selection_id, fixture_id, selection_type in rows.all():
+            if fixture_id in scores:
+                result = selection_result(selection_type, *scores[fixture_id])
+            else:
+                result = SelectionResult.VOID.value
+            if result:
+                by_result.setdefault(result, []).append(selection_id)
+
+        for result, selection_ids in by_result.items():
+            for batch in _chunks(selection_ids, UPDATE_BATCH):
+                await db.execute(
+                    update(CouponSelection)
+                    .where(CouponSelection.id.in_(batch))
+                    .values(result=result)
+                    .execution_options(synchronize_session=False)
+                )
+        return sum(len(ids) for ids in by_result.values())
+
+    async def _settle_coupons(self, db: AsyncSession, fixture_ids: List[int]) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """
+        Counters and status of the pending coupons having a leg on these
+        fixtures: lost as soon as one leg is lost, won (or cancelled when
+        every leg is void) once no leg is pending. Returns the coupons
+        resolved per status and the coupons won per user.
+        """
+        touched = (
+            select(CouponSelection.coupon_id)
+            .join(Coupon, Coupon.id == CouponSelection.coupon_id)
+            .where(CouponSelection.fixture_id.in_(fixture_ids), Coupon.status == CouponStatus.PENDING.value)
+        )
+
+        def count(result: SelectionResult):
+            return func.sum(case((CouponSelection.result == result.value, 1), else_=0))
+
+        rows = await db.execute(
+            select(
+                CouponSelection.coupon_id,
+                Coupon.user_id,
+                count(SelectionResult.WON),
+                count(SelectionResult.LOST),
+                count(SelectionResult.PENDING)
+            )
+            .join(Coupon, Coupon.id == CouponSelection.coupon_id)
+            .where(CouponSelection.coupon_id.in_(touched))
+            .group_by(CouponSelection.coupon_id, Coupon.user_id)
+        )
+
+        won_counts, lost_counts, statuses, won_by_user = {}, {}, {}, {}
+        for coupon_id, user_id, won, lost, pending in rows.all():
+            won_counts[coupon_id], lost_counts[coupon_id] = int(won), int(lost)
+            if lost:
+                statuses[coupon_id] = CouponStatus.LOST.value
+            elif not pending:
+                statuses[coupon_id] = CouponStatus.WON.value if won else CouponStatus.CANCELLED.value
+                # Coupons du jour générés (user_id NULL) : pas de compteur
+                if won and user_id:
+                    won_by_user[user_id] = won_by_user.get(user_id, 0) + 1
+        if not won_counts:
+            return {}, {}
+
+        now = datetime.utcnow()
+        for batch in _chunks(list(won_counts), UPDATE_BATCH):
+            values = {
+                "matches_won": case({c: won_counts[c] for c in batch}, value=Coupon.id),
+                "matches_lost": case({c: lost_counts[c] for c in batch}, value=Coupon.id),
+            }
+            batch_statuses = {c: statuses[c] for c in batch if c in statuses}
+            if batch_statuses:
+                values["status"] = case(batch_statuses, value=Coupon.id, else_=Coupon.status)
+                values["resolved_at"] = case(
+                    (Coupon.id.in_(list(batch_statuses)), now),
+                    else_=Coupon.resolved_at
+                )
+            await db.execute(
+                update(Coupon)
+                .where(Coupon.id.in_(batch))
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        await user_stats_service.increment_many(db, {u: {"coupons_won": n} for u, n in won_by_user.items()})
+
+        resolved: Dict[str, int] = {}
+        for status in statuses.values():
+            resolved[status] = resolved.get(status, 0) + 1
+        return resolved, won_by_user
+
+    async def settle(
+        self,
+        db: AsyncSession,
+        scores: Dict[int, Tuple[int, int]],
+        void_ids: Iterable[int] = ()
+    ) -> Dict[str, int]:
+        """
+        Settle everything depending on the given fixtures: `scores` maps a
+        finished fixture to its final (home, away) score, `void_ids` are
+        postponed / cancelled fixtures whose selections are voided.
+        """
+        start_time = time.perf_counter()
+        fixture_ids = list(scores) + [f for f in void_ids if f not in scores]
+        summary = {"fixtures": len(fixture_ids), "analyses": 0, "selections": 0, "coupons": 0}
+
+        for chunk in _chunks(fixture_ids, SETTLEMENT_CHUNK):
+            chunk_scores = {f: scores[f] for f in chunk if f in scores}
+            chunk_voids = [f for f in chunk if f not in scores]
+            try:
+                summary["analyses"] += await self._settle_analyses(db, chunk_scores)
+                summary["selections"] += await self._settle_selections(db, chunk_scores, chunk_voids)
+                resolved, won_by_user = await self._settle_coupons(db, chunk)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+            await user_stats_service.invalidate(*won_by_user)
+            summary["coupons"] += sum(resolved.values())
+            for status, n in resolved.items():
+                metrics.incr("settlement.coupons", n, status=status)
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        metrics.observe("settlement.duration_ms", duration_ms)
+        logger.info(
+            f"🏁 Settlement: {summary['fixtures']} fixtures, {summary['analyses']} analyses, "
+            f"{summary['selections']} selections, {summary['coupons']} coupons resolved ({duration_ms:.0f}ms)",
+            extra={'extra_data': {**summary, 'duration_ms': duration_ms}}
+        )
+        return summary
+
+
+# Singleton instance
+settlement_service = SettlementService()
@@ -0,0 +1,35 @@
+from app.services.stats.goals_model import (
+    GoalsModel,
+    GoalsModelService,
+    goals_model_service,
+)
+from app.services.stats.elo import EloRatings, EloService, elo_service
+from app.services.stats.odds_history import OddsHistoryService, odds_history_service
+from app.services.stats.coupon_simulator import CouponSimulator, coupon_simulator, simulate_coupon
+from app.services.stats.prediction_stats import PredictionStatsService, prediction_stats_service
+from app.services.stats.odds import (
+    fair_probabilities,
+    fixture_consensus,
+    market_consensus,
+    remove_margin,
+)
+
+__all__ = [
+    "GoalsModel",
+    "GoalsModelService",
+    "goals_model_service",
+    "EloRatings",
+    "EloService",
+    "elo_service",
+    "fair_probabilities",
+    "fixture_consensus",
+    "market_consensus",
+    "remove_margin",
+    "OddsHistoryService",
+    "odds_history_service",
+    "CouponSimulator",
+    "coupon_simulator",
+    "simulate_coupon",
+    "PredictionStatsService",
+    "prediction_stats_service",
+]
@@ -0,0 +1,105 @@
+"""
+Accumulator search over candidate selections (vectorized beam search).
+
+Each candidate is one priced outcome of a fixture with its probability.
+A coupon maximizes a sum of per-leg gains (log probability for safe
+coupons, log expected return otherwise) under constraints on the number
+of legs, the leg probability, the total odds (sum of log odds) and the
+diversity (one leg per fixture, at most `max_per_league` per league).
+The beam keeps the best partial coupons at each depth; legs are added in
+increasing candidate order, so each combination is explored once.
+"""
+from dataclasses import dataclass
+from typing import List, Optional
+
+import numpy as np
+
+
+@dataclass(frozen=True)
+class CouponProfile:
+    """Constraints and objective of a generated coupon."""
+    coupon_type: str
+    min_legs: int
+    max_legs: int
+    min_leg_probability: float
+    min_total_odds: float
+    max_total_odds: float
+    objective: str  # "probability" ou "expected_value"
+    max_per_league: int = 2
+
+
+def beam_search(
+    probabilities: np.ndarray,
+    prices: np.ndarray,
+    fixture_index: np.ndarray,
+    league_index: np.ndarray,
+    profile: CouponProfile,
+    beam_width: int = 256
+) -> Optional[List[int]]:
+    """Best coupon of a profile as candidate indices, None when no combination fits."""
+    valid = (probabilities >= profile.min_leg_probability) & (prices > 1.0)
+    candidates = np.flatnonzero(valid)
+    if len(candidates) < profile.min_legs:
+        return None
+
+    p, log_odds = probabilities[candidates], np.log(prices[candidates])
+    fixtures = np.unique(fixture_index[candidates], return_inverse=True)[1]
+    leagues = np.unique(league_index[candidates], return_inverse=True)[1]
+    gain = np.log(p) if profile.objective == "probability" else np.log(p) + log_odds
+    n = len(candidates)
+    max_log_odds = np.log(profile.max_total_odds)
+    min_log_odds = np.log(profile.min_total_odds)
+
+    # Faisceau : dernier index, score, cote (log), équipes/ligues utilisées, sélections
+    last = np.arange(n)
+    score = gain.copy()
+    total = log_odds.copy()
+    used_fixtures = np.zeros((n, fixtures.max() + 1), dtype=bool)
+    used_fixtures[np.arange(n), fixtures] = True
+    league_counts = np.zeros((n, leagues.max() + 1), dtype=np.int16)
+    league_counts[np.arange(n), leagues] = 1
+    legs = last[:, None]
+
+    keep = total <= max_log_odds
+    last, score, total, used_fixtures, league_counts, legs = (
+        x[keep] for x in (last, score, total, used_fixtures, league_counts, legs)
+    )
+
+    best_score, best_legs = -np.inf, None
+    for depth in range(1, profile.max_legs + 1):
+        if depth >= profile.min_legs and len(score):
+            complete = total >= min_log_odds
+            if np.any(complete):
+                i = int(np.argmax(np.where(complete, score, -np.inf)))
+                if score[i] > best_score:
+                    best_score, best_legs = float(score[i]), legs[i]
+        if depth == profile.max_legs or not len(score):
+            break
+
+        # Extensions (faisceau x candidats) valides
+        ok = (
+            (np.arange(n)[None, :] > last[:, None])
+            & ~used_fixtures[:, fixtures]
+            & (league_counts[:, leagues] < profile.max_per_league)
+            & (total[:, None] + log_odds[None, :] <= max_log_odds)
+        )
+        new_score = np.where(ok, score[:, None] + gain[None, :], -np.inf)
+        flat = new_score.ravel()
+        n_valid = int(np.count_nonzero(np.isfinite(flat)))
+        if not n_valid:
+            break
+        top = np.argpartition(-flat, min(beam_width, n_valid) - 1)[:min(beam_width, n_valid)]
+        parent, candidate = np.divmod(top, n)
+
+        last = candidate
+        score = flat[top]
+        total = total[parent] + log_odds[candidate]
+        used_fixtures = used_fixtures[parent].copy()
+        used_fixtures[np.arange(len(top)), fixtures[candidate]] = True
+        league_counts = league_counts[parent].copy()
+        league_counts[np.arange(len(top)), leagues[candidate]] += 1
+        legs = np.hstack([legs[parent], candidate[:, None]])
+
+    if best_legs is None:
+        return None
+    return [int(candidates[i]) for i in best_legs]
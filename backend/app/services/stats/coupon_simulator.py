@@ -0,0 +1,230 @@
+"""
+Monte Carlo simulation of a coupon with correlated selections.
+
+Each fixture of the coupon draws its final score from the goals model
+score matrix (one draw per simulation); every leg on that fixture is then
+settled from the same score, so same-match selections (e.g. "1" and
+"Over 2.5") are correlated as they should be. When the 1X2 of a fixture
+comes from an AI analysis, its score matrix is first conditioned on those
+probabilities, so the simulation agrees with the leg probabilities shown.
+Legs without a score
+distribution (unknown teams, unsupported markets) are drawn independently
+from their probability. A voided fixture (postponed, abandoned) settles
+its legs at odds 1.0.
+"""
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.services.cache_service import cache_service
+from app.services.stats.goals_model import MAX_GOALS, REDIS_UPCOMING_KEY, goals_model_service
+from app.services.stats.odds import OUTCOMES, SELECTION_INDEX
+
+settings = get_settings()
+logger = get_logger('services.coupon_simulator')
+
+# Multiplicateurs distincts renvoyés dans la distribution des gains
+MAX_DISTRIBUTION_POINTS = 20
+
+
+def _outcome_cells() -> np.ndarray:
+    """(outcomes, MAX_GOALS²) mask of the scores winning each outcome of OUTCOMES."""
+    home, away = np.meshgrid(np.arange(MAX_GOALS), np.arange(MAX_GOALS), indexing="ij")
+    total = home + away
+    masks = {"1": home > away, "X": home == away, "2": home < away}
+    for line in (1.5, 2.5, 3.5):
+        masks[f"Over {line}"] = total > line
+        masks[f"Under {line}"] = total < line
+    masks["Yes"] = (home > 0) & (away > 0)
+    masks["No"] = ~masks["Yes"]
+    return np.stack([masks[outcome].ravel() for _, outcome, _, _ in OUTCOMES])
+
+
+OUTCOME_CELLS = _outcome_cells()
+
+
+def condition_on_result(matrix: np.ndarray, probabilities: Sequence[float]) -> np.ndarray:
+    """
+    Rescale a score matrix so that its home win / draw / away win masses
+    equal `probabilities`, keeping the distribution of the scores within
+    each result (goals lines and BTTS follow the new 1X2).
+    """
+    target = np.asarray(probabilities, dtype=float)
+    if target.shape != (3,) or not np.all(np.isfinite(target)) or target.sum() <= 0:
+        return matrix
+    flat = matrix.ravel()
+    masses = OUTCOME_CELLS[:3] @ flat
+    weights = np.divide(target / target.sum(), masses, out=np.zeros(3), where=masses > 0)
+    return ((weights @ OUTCOME_CELLS[:3]) * flat).reshape(matrix.shape)
+
+
+def simulate_coupon(
+    legs: Sequence[Dict[str, Any]],
+    score_matrices: Dict[int, np.ndarray],
+    result_probabilities: Optional[Dict[int, Sequence[float]]] = None,
+    draws: Optional[int] = None,
+    void_probability: Optional[float] = None,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Simulate a coupon; legs are dicts with `fixture_id`, `selection_type`,
+    `odds` and `probability` (used when the leg cannot be settled from a
+    score matrix). `result_probabilities` maps fixtures to the (home, draw,
+    away) probabilities their score matrix is conditioned on.
+
+    Returns the success probability, the expected value per unit staked,
+    the payout distribution (multiplier of the stake) and, per leg, its
+    win probability and marginal risk: the share of the coupon's success
+    probability lost by adding this leg.
+    """
+    draws = draws or settings.coupon_sim_draws
+    if void_probability is None:
+        void_probability = settings.coupon_sim_void_probability
+    rng = np.random.default_rng(seed)
+    n_legs = len(legs)
+
+    # Un score et un éventuel report par match, partagés par ses sélections
+    cells, fixture_void = {}, {}
+    for fixture_id in dict.fromkeys(leg["fixture_id"] for leg in legs):
+        matrix = score_matrices.get(fixture_id)
+        if matrix is not None:
+            if result_probabilities and fixture_id in result_probabilities:
+                matrix = condition_on_result(matrix, result_probabilities[fixture_id])
+            cdf = np.cumsum(matrix.ravel())
+            cells[fixture_id] = np.minimum(
+                np.searchsorted(cdf, rng.random(draws) * cdf[-1], side="right"), cdf.size - 1
+            )
+        fixture_void[fixture_id] = rng.random(draws) < void_probability
+
+    # Tirages par sélection (legs, draws) : réductions contiguës sur l'axe des sélections
+    won = np.empty((n_legs, draws), dtype=bool)
+    void = np.empty((n_legs, draws), dtype=bool)
+    correlated = np.zeros(n_legs, dtype=bool)
+    for j, leg in enumerate(legs):
+        outcome = SELECTION_INDEX.get(str(leg["selection_type"]).strip().lower())
+        cell = cells.get(leg["fixture_id"])
+        if outcome is not None and cell is not None:
+            won[j] = OUTCOME_CELLS[outcome][cell]
+            correlated[j] = True
+        else:
+            won[j] = rng.random(draws) < leg["probability"]
+        void[j] = fixture_void[leg["fixture_id"]]
+
+    log_odds = np.log(np.array([float(leg["odds"]) for leg in legs]))
+    lost = ~(won | void)
+    failures = lost.sum(axis=0, dtype=np.int16)
+    success = failures == 0
+    # Cote d'un tirage gagnant : cote totale hors matchs annulés
+    multiplier = np.zeros(draws)
+    multiplier[success] = np.exp(log_odds.sum() - log_odds @ void[:, success])
+
+    # Succès sans la sélection j : toutes les autres gagnées (ou annulées)
+    p_success = float(success.mean())
+    p_without = p_success + np.count_nonzero(lost[:, failures == 1], axis=1) / draws
+    p_legs = 1 - lost.mean(axis=1)
+    marginal_risk = np.where(p_without > 0, 1 - p_success / np.maximum(p_without, 1e-12), 0.0)
+
+    # Gains distincts des tirages gagnants (combinaisons de matchs annulés)
+    values, counts = np.unique(np.round(multiplier[success], 2), return_counts=True)
+    top = np.sort(np.argsort(-counts)[:MAX_DISTRIBUTION_POINTS - 1])
+    distribution = [{"multiplier": 0.0, "probability": round(1 - p_success, 4)}] + [
+        {"multiplier": float(values[i]), "probability": round(float(counts[i]) / draws, 4)}
+        for i in top
+    ]
+
+    return {
+        "draws": draws,
+        "success_probability": round(p_success, 4),
+        "standard_error": round(float(np.sqrt(p_success * (1 - p_success) / draws)), 4),
+        "independent_probability": round(float(np.prod(p_legs)), 4),
+        "expected_value": round(float(multiplier.mean()) - 1, 4),
+        "payout": {
+            "mean": round(float(multiplier.mean()), 4),
+            "std": round(float(multiplier.std()), 4),
+            "distribution": distribution,
+        },
+        "legs": [
+            {
+                "fixture_id": leg["fixture_id"],
+                "selection_type": leg["selection_type"],
+                "probability": round(float(p_legs[j]), 4),
+                "marginal_risk": round(float(marginal_risk[j]), 4),
+                "correlated": bool(correlated[j]),
+            }
+            for j, leg in enumerate(legs)
+        ],
+    }
+
+
+class CouponSimulator:
+    """Simulates coupons with the score matrices of the precomputed goals model predictions."""
+
+    async def score_matrices(
+        self,
+        fixture_ids: Sequence[int],
+        upcoming: Optional[Dict[str, Any]] = None
+    ) -> Dict[int, np.ndarray]:
+        """
+        Score matrices of the fixtures predicted by the goals model (upcoming
+        fixtures only); `upcoming` avoids reloading predictions already read.
+        """
+        model = await goals_model_service.get_model()
+        if model is None:
+            return {}
+        if upcoming is None:
+            try:
+                upcoming = await cache_service.get(REDIS_UPCOMING_KEY) or {}
+            except Exception as e:
+                logger.warning(f"⚠️ Goals model predictions unavailable: {str(e)}")
+                return {}
+
+        known = [
+            (fixture_id, upcoming[str(fixture_id)]["expected_goals"])
+            for fixture_id in dict.fromkeys(fixture_ids)
+            if str(fixture_id) in upcoming
+        ]
+        if not known:
+            return {}
+        lam = np.array([xg["home"] for _, xg in known], dtype=float)
+        mu = np.array([xg["away"] for _, xg in known], dtype=float)
+        matrices = model.score_matrices(lam, mu)
+        return {fixture_id: matrices[i] for i, (fixture_id, _) in enumerate(known)}
+
+    async def simulate(
+        self,
+        legs: List[Dict[str, Any]],
+        upcoming: Optional[Dict[str, Any]] = None,
+        result_probabilities: Optional[Dict[int, Sequence[float]]] = None,
+        seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Simulate a coupon (see `simulate_coupon`) in a worker thread: the
+        draws take tens of milliseconds and would block the event loop.
+        """
+        start_time = time.perf_counter()
+        matrices = await self.score_matrices([leg["fixture_id"] for leg in legs], upcoming)
+        result = await asyncio.to_thread(simulate_coupon, legs, matrices, result_probabilities, seed=seed)
+
+        duration_ms = (time.perf_counter() - start_time) * 1000
+        metrics.observe("coupon_simulator.simulate_ms", duration_ms)
+        logger.info(
+            f"🎲 Coupon simulated: {len(legs)} legs, {len(matrices)} score matrices, "
+            f"P(success) {result['success_probability']:.2%} ({duration_ms:.1f}ms)",
+            extra={'extra_data': {
+                'legs': len(legs),
+                'score_matrices': len(matrices),
+                'draws': result['draws'],
+                'success_probability': result['success_probability'],
+                'duration_ms': duration_ms
+            }}
+        )
+        return result
+
+
+# Singleton instance
+coupon_simulator = CouponSimulator()
@@ -0,0 +1,313 @@
+"""
+Elo ratings of teams, updated incrementally from stored match results.
+
+Current ratings live in a NumPy array indexed by team; each team also keeps
+the dated history of its last `elo_history_matches` ratings, so the rating
+of a team at a recent past date is looked up in memory while the state
+published to Redis stays bounded. The full history of each team is kept
+apart in `elo_history:{team_id}`, one fixed-size binary record (uint32
+timestamp, float32 rating) appended per match, and read only for dates
+older than the in-memory window (backtests, settled analyses). New results
+are applied in match-date order since the last update (watermark on
+`created_at` / `updated_at`); a full rebuild replays all stored results,
+and is forced when the score of an already applied result was corrected.
+"""
+import asyncio
+import time
+from bisect import bisect_right
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.models import MatchResult
+from app.services.cache_service import cache_service
+
+settings = get_settings()
+logger = get_logger('services.elo')
+
+REDIS_STATE_KEY = "elo:state"
+HISTORY_KEY = "elo_history:{team_id}"
+HISTORY_DTYPE = np.dtype([("ts", "<u4"), ("rating", "<f4")])
+# Durée de vie en mémoire de l'état chargé depuis Redis (secondes)
+LOCAL_CACHE_TTL = 600
+
+
+def goal_difference_multiplier(goal_diff: np.ndarray) -> np.ndarray:
+    """World Football Elo margin factor: 1, 1.5, then (11 + diff) / 8."""
+    diff = np.abs(goal_diff)
+    return np.where(diff <= 1, 1.0, np.where(diff == 2, 1.5, (11 + diff) / 8))
+
+
+def expected_score(rating_diff: np.ndarray) -> np.ndarray:
+    """Expected score of the first team for a rating difference (home advantage included)."""
+    return 1 / (1 + 10 ** (-rating_diff / 400))
+
+
+def decode_history(raw: Optional[bytes]) -> np.ndarray:
+    """Decode a team's full history, sorted by match date (results may be stored late)."""
+    if not raw:
+        return np.zeros(0, dtype=HISTORY_DTYPE)
+    records = np.frombuffer(raw[:len(raw) - len(raw) % HISTORY_DTYPE.itemsize], dtype=HISTORY_DTYPE)
+    return records[np.argsort(records["ts"], kind="stable")]
+
+
+class EloRatings:
+    """Array-backed Elo ratings with per-team dated history."""
+
+    def __init__(self, initial: float, k_factor: float, home_advantage: float, history_size: int = 40):
+        self.initial = initial
+        self.k_factor = k_factor
+        self.home_advantage = home_advantage
+        self.history_size = history_size
+        self.team_ids: List[int] = []
+        self.index: Dict[int, int] = {}
+        self.ratings = np.zeros(0)
+        self.matches = np.zeros(0, dtype=np.int32)
+        # Historique par équipe : timestamps et classement après chaque match
+        self.history_ts: List[List[float]] = []
+        self.history_ratings: List[List[float]] = []
+        self.watermark: Optional[float] = None  # created_at / updated_at du dernier résultat appliqué
+        # Classements appliqués depuis le chargement, à ajouter à l'historique complet (non publiés)
+        self.new_history: Dict[int, List[Tuple[float, float]]] = {}
+
+    def _team(self, team_id: int) -> int:
+        i = self.index.get(team_id)
+        if i is None:
+            i = len(self.team_ids)
+            self.index[team_id] = i
+            self.team_ids.append(team_id)
+            self.ratings = np.append(self.ratings, self.initial)
+            self.matches = np.append(self.matches, 0)
+            self.history_ts.append([])
+            self.history_ratings.append([])
+        return i
+
+    def apply(self, home_id: int, away_id: int, home_goals: int, away_goals: int, played_at: float) -> float:
+        """Apply one result; returns the rating points won by the home team."""
+        h, a = self._team(home_id), self._team(away_id)
+        expected = expected_score(self.ratings[h] + self.home_advantage - self.ratings[a])
+        actual = 1.0 if home_goals > away_goals else 0.5 if home_goals == away_goals else 0.0
+        delta = float(self.k_factor * goal_difference_multiplier(np.array(home_goals - away_goals)) * (actual - expected))
+
+        self.ratings[h] += delta
+        self.ratings[a] -= delta
+        self.matches[[h, a]] += 1
+        for i in (h, a):
+            self.new_history.setdefault(self.team_ids[i], []).append((played_at, float(self.ratings[i])))
+            self.history_ts[i].append(played_at)
+            self.history_ratings[i].append(round(float(self.ratings[i]), 1))
+            if len(self.history_ts[i]) > self.history_size:
+                del self.history_ts[i][:-self.history_size]
+                del self.history_ratings[i][:-self.history_size]
+        return delta
+
+    def rating(self, team_id: int, at: Optional[datetime] = None) -> Optional[float]:
+        """
+        Current rating of a team, or its rating before the given date (None if
+        unknown, or older than the history kept for the team).
+        """
+        i = self.index.get(team_id)
+        if i is None:
+            return None
+        if at is None:
+            return float(self.ratings[i])
+        pos = bisect_right(self.history_ts[i], at.timestamp() - 1)
+        if pos:
+            return self.history_ratings[i][pos - 1]
+        # Avant le premier match connu : classement initial, sauf si l'historique a été tronqué
+        return self.initial if len(self.history_ts[i]) == self.matches[i] else None
+
+    def matchup(self, home_id: int, away_id: int, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Ratings of both teams and the home win expectancy (None if a team is unknown)."""
+        home, away = self.rating(home_id, at), self.rating(away_id, at)
+        if home is None or away is None:
+            return None
+        return self.describe(home, away)
+
+    def describe(self, home: float, away: float) -> Dict[str, Any]:
+        """Matchup of two ratings: rounded ratings and the home win expectancy."""
+        return {
+            "home": round(home),
+            "away": round(away),
+            "home_expectancy": round(float(expected_score(home + self.home_advantage - away)), 3),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "initial": self.initial,
+            "k_factor": self.k_factor,
+            "home_advantage": self.home_advantage,
+            "history_size": self.history_size,
+            "team_ids": self.team_ids,
+            "ratings": self.ratings.round(2).tolist(),
+            "matches": self.matches.tolist(),
+            "history_ts": self.history_ts,
+            "history_ratings": self.history_ratings,
+            "watermark": self.watermark,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "EloRatings":
+        ratings = cls(data["initial"], data["k_factor"], data["home_advantage"], data.get("history_size", 40))
+        ratings.team_ids = data["team_ids"]
+        ratings.index = {team_id: i for i, team_id in enumerate(ratings.team_ids)}
+        ratings.ratings = np.asarray(data["ratings"], dtype=np.float64)
+        ratings.matches = np.asarray(data["matches"], dtype=np.int32)
+        # États publiés avant la limite d'historique : tronqués au chargement
+        ratings.history_ts = [h[-ratings.history_size:] for h in data["history_ts"]]
+        ratings.history_ratings = [h[-ratings.history_size:] for h in data["history_ratings"]]
+        ratings.watermark = data.get("watermark")
+        return ratings
+
+
+class EloService:
+    """Maintains the Elo ratings from stored results and serves lookups."""
+
+    def __init__(self):
+        self._ratings: Optional[EloRatings] = None
+        self._loaded_at = 0.0
+
+    def _new_ratings(self) -> EloRatings:
+        return EloRatings(
+            settings.elo_initial_rating,
+            settings.elo_k_factor,
+            settings.elo_home_advantage,
+            settings.elo_history_matches
+        )
+
+    async def _has_corrections(self, db: AsyncSession, watermark: float) -> bool:
+        """Whether the score of a result applied before `watermark` was corrected since."""
+        since = datetime.fromtimestamp(watermark)
+        corrected = await db.scalar(
+            select(func.count())
+            .select_from(MatchResult)
+            .where(MatchResult.updated_at > since, MatchResult.created_at <= since)
+        )
+        return bool(corrected)
+
+    async def update_from_db(self, db: AsyncSession, rebuild: bool = False) -> EloRatings:
+        """Apply results stored since the last update (all results when rebuilding) and publish to Redis."""
+        ratings = None if rebuild else await self.get_ratings()
+        if ratings is not None and ratings.watermark is not None and await self._has_corrections(db, ratings.watermark):
+            # Elo dépend de l'ordre des matchs : un score corrigé impose de tout rejouer
+            logger.info("📊 Corrected match results found, rebuilding Elo ratings")
+            rebuild, ratings = True, None
+        if ratings is None:
+            ratings = self._new_ratings()
+
+        query = select(
+            MatchResult.home_team_id,
+            MatchResult.away_team_id,
+            MatchResult.home_goals,
+            MatchResult.away_goals,
+            MatchResult.match_date,
+            MatchResult.created_at,
+            MatchResult.updated_at
+        ).order_by(MatchResult.match_date.asc(), MatchResult.fixture_id.asc())
+        if ratings.watermark is not None:
+            query = query.where(MatchResult.created_at > datetime.fromtimestamp(ratings.watermark))
+        rows = (await db.execute(query)).all()
+        if not rows:
+            return ratings
+
+        replay = ratings.watermark is None
+        start_time = time.perf_counter()
+        for home_id, away_id, home_goals, away_goals, match_date, created_at, updated_at in rows:
+            ratings.apply(home_id, away_id, home_goals, away_goals, match_date.timestamp())
+            ratings.watermark = max(ratings.watermark or 0.0, (updated_at or created_at).timestamp())
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+        # Historique complet avant l'état : un passage interrompu ne rejoue que des doublons sans effet
+        await self._store_history(ratings, replace=replay)
+        await cache_service.set(REDIS_STATE_KEY, ratings.to_dict(), 30 * 86400)
+        self._ratings, self._loaded_at = ratings, time.time()
+
+        logger.info(
+            f"📊 Elo ratings updated with {len(rows)} results ({len(ratings.team_ids)} teams, {duration_ms:.0f}ms)",
+            extra={'extra_data': {
+                'results': len(rows),
+                'teams': len(ratings.team_ids),
+                'rebuild': rebuild,
+                'duration_ms': duration_ms
+            }}
+        )
+        return ratings
+
+    async def _store_history(self, ratings: EloRatings, replace: bool) -> None:
+        """Append the ratings applied by this update to the full history of each team (rewritten on a replay)."""
+        r = await cache_service.get_binary_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for team_id, entries in ratings.new_history.items():
+                records = np.zeros(len(entries), dtype=HISTORY_DTYPE)
+                records["ts"], records["rating"] = zip(*entries)
+                key = HISTORY_KEY.format(team_id=team_id)
+                if replace:
+                    pipe.set(key, records.tobytes())
+                else:
+                    pipe.append(key, records.tobytes())
+            await pipe.execute()
+        ratings.new_history = {}
+
+    async def _history_rating(self, ratings: EloRatings, team_id: int, at: datetime) -> Optional[float]:
+        """Rating of a team before `at` from its full history (older than the in-memory window)."""
+        try:
+            r = await cache_service.get_binary_redis()
+            history = decode_history(await r.get(HISTORY_KEY.format(team_id=team_id)))
+        except Exception as e:
+            logger.warning(f"⚠️ Elo history of team {team_id} unavailable: {str(e)}")
+            return None
+        if not len(history):
+            return None
+        pos = np.searchsorted(history["ts"], at.timestamp() - 1, side="right")
+        return round(float(history["rating"][pos - 1]), 1) if pos else ratings.initial
+
+    async def get_ratings(self) -> Optional[EloRatings]:
+        """Current ratings (state cached in-process, refreshed from Redis)."""
+        if self._ratings is not None and time.time() - self._loaded_at < LOCAL_CACHE_TTL:
+            return self._ratings
+        try:
+            data = await cache_service.get(REDIS_STATE_KEY)
+        except Exception as e:
+            logger.warning(f"⚠️ Elo ratings unavailable: {str(e)}")
+            data = None
+        if data:
+            self._ratings = EloRatings.from_dict(data)
+        self._loaded_at = time.time()
+        return self._ratings
+
+    async def matchup(self, home_team_id: int, away_team_id: int, at: Optional[datetime] = None) -> Optional[Dict[str, Any]]:
+        """Elo matchup of two teams, optionally as of any past date."""
+        ratings = await self.get_ratings()
+        if ratings is None:
+            return None
+        home, away = await asyncio.gather(
+            self.rating(home_team_id, at, ratings),
+            self.rating(away_team_id, at, ratings)
+        )
+        if home is None or away is None:
+            return None
+        return ratings.describe(home, away)
+
+    async def rating(
+        self,
+        team_id: int,
+        at: Optional[datetime] = None,
+        ratings: Optional[EloRatings] = None
+    ) -> Optional[float]:
+        """Rating of a team, now or before any past date (None if the team is unknown)."""
+        ratings = ratings or await self.get_ratings()
+        if ratings is None:
+            return None
+        value = ratings.rating(team_id, at)
+        if value is None and at is not None and team_id in ratings.index:
+            value = await self._history_rating(ratings, team_id, at)
+        return value
+
+
+# Singleton instance
+elo_service = EloService()
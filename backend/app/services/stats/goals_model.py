@@ -0,0 +1,377 @@
+"""
+Dixon-Coles goals model (NumPy).
+
+Each team has an attack and a defence strength; the goals of a match are
+modelled as two Poisson variables (home: base * attack_home * defence_away *
+home_advantage, away: base * attack_away * defence_home) with the
+Dixon-Coles correction of low scores. Strengths are fitted on stored match
+results with exponential time decay and shrinkage towards an average team.
+
+Predictions are batched: one pass computes the correct-score matrices of
+all requested fixtures, from which 1X2, over/under and BTTS are summed.
+"""
+import math
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.models import MatchResult
+from app.services.cache_service import cache_service
+
+settings = get_settings()
+logger = get_logger('services.goals_model')
+
+# Scores 0..MAX_GOALS-1 par équipe dans les matrices de score
+MAX_GOALS = 11
+# Buts "fictifs" attribués à chaque équipe au niveau moyen (rétrécissement)
+PRIOR_GOALS = 3.0
+# Grille de recherche du paramètre rho de Dixon-Coles
+RHO_GRID = np.linspace(-0.25, 0.25, 51)
+OVER_UNDER_LINES = (1.5, 2.5, 3.5)
+
+REDIS_PARAMS_KEY = "goals_model:params"
+REDIS_UPCOMING_KEY = "goals_model:upcoming"
+# Durée de vie en mémoire des paramètres chargés depuis Redis (secondes)
+LOCAL_CACHE_TTL = 600
+
+_LOG_FACTORIALS = np.array([math.lgamma(k + 1) for k in range(MAX_GOALS)])
+_GOALS = np.arange(MAX_GOALS)
+_HOME_WIN_MASK = _GOALS[:, None] > _GOALS[None, :]
+_AWAY_WIN_MASK = _GOALS[:, None] < _GOALS[None, :]
+_TOTAL_GOALS = _GOALS[:, None] + _GOALS[None, :]
+
+
+def _dc_tau(home_goals: np.ndarray, away_goals: np.ndarray, lam: np.ndarray, mu: np.ndarray, rho: np.ndarray) -> np.ndarray:
+    """Dixon-Coles low-score correction factor (broadcasts over rho)."""
+    tau = np.ones(np.broadcast(home_goals, rho).shape)
+    tau = np.where((home_goals == 0) & (away_goals == 0), 1 - lam * mu * rho, tau)
+    tau = np.where((home_goals == 0) & (away_goals == 1), 1 + lam * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 0), 1 + mu * rho, tau)
+    tau = np.where((home_goals == 1) & (away_goals == 1), 1 - rho, tau)
+    return tau
+
+
+class GoalsModel:
+    """Fitted team strengths and batched score-matrix predictions."""
+
+    def __init__(
+        self,
+        team_ids: Sequence[int],
+        attack: np.ndarray,
+        defence: np.ndarray,
+        base: float,
+        home_advantage: float,
+        rho: float,
+        fitted_at: Optional[float] = None,
+        n_matches: int = 0
+    ):
+        self.team_ids = [int(t) for t in team_ids]
+        self.index = {team_id: i for i, team_id in enumerate(self.team_ids)}
+        self.attack = np.asarray(attack, dtype=np.float64)
+        self.defence = np.asarray(defence, dtype=np.float64)
+        self.base = float(base)
+        self.home_advantage = float(home_advantage)
+        self.rho = float(rho)
+        self.fitted_at = fitted_at or time.time()
+        self.n_matches = n_matches
+
+    @classmethod
+    def fit(
+        cls,
+        home_ids: np.ndarray,
+        away_ids: np.ndarray,
+        home_goals: np.ndarray,
+        away_goals: np.ndarray,
+        weights: np.ndarray,
+        max_iter: int = 200,
+        tol: float = 1e-6
+    ) -> "GoalsModel":
+        """
+        Fit strengths by weighted maximum likelihood (fixed-point updates).
+
+        Each update sets a strength to (weighted goals + prior) / (weighted
+        expected goals at that strength + prior), the Poisson MLE with
+        PRIOR_GOALS pseudo-goals pulling teams with few matches to average.
+        """
+        team_ids, inverse = np.unique(np.concatenate([home_ids, away_ids]), return_inverse=True)
+        n_teams = len(team_ids)
+        h, a = inverse[:len(home_ids)], inverse[len(home_ids):]
+        hg, ag, w = (np.asarray(x, dtype=np.float64) for x in (home_goals, away_goals, weights))
+
+        goals_for = np.bincount(h, w * hg, n_teams) + np.bincount(a, w * ag, n_teams)
+        goals_against = np.bincount(h, w * ag, n_teams) + np.bincount(a, w * hg, n_teams)
+
+        attack = np.ones(n_teams)
+        defence = np.ones(n_teams)
+        base = max(np.sum(w * ag) / np.sum(w), 0.1)
+        home_advantage = max(np.sum(w * hg) / max(np.sum(w * ag), 1e-9), 0.5)
+
+        for _ in range(max_iter):
+            previous = np.concatenate([attack, defence])
+
+            exp_for = (
+                np.bincount(h, w * base * defence[a] * home_advantage, n_teams)
+                + np.bincount(a, w * base * defence[h], n_teams)
+            )
+            attack = (goals_for + PRIOR_GOALS) / (exp_for + PRIOR_GOALS)
+
+            exp_against = (
+                np.bincount(h, w * base * attack[a], n_teams)
+                + np.bincount(a, w * base * attack[h] * home_advantage, n_teams)
+            )
+            defence = (goals_against + PRIOR_GOALS) / (exp_against + PRIOR_GOALS)
+
+            # Identifiabilité : moyenne géométrique des forces à 1
+            attack /= np.exp(np.mean(np.log(attack)))
+            defence /= np.exp(np.mean(np.log(defence)))
+
+            home_rate = np.sum(w * attack[h] * defence[a])
+            away_rate = np.sum(w * attack[a] * defence[h])
+            home_advantage = np.sum(w * hg) / max(base * home_rate, 1e-9)
+            base = np.sum(w * (hg + ag)) / max(home_rate * home_advantage + away_rate, 1e-9)
+
+            if np.max(np.abs(np.concatenate([attack, defence]) - previous)) < tol:
+                break
+
+        lam = base * attack[h] * defence[a] * home_advantage
+        mu = base * attack[a] * defence[h]
+        rho = cls._fit_rho(hg, ag, lam, mu, w)
+
+        return cls(team_ids, attack, defence, base, home_advantage, rho, n_matches=len(hg))
+
+    @staticmethod
+    def _fit_rho(hg: np.ndarray, ag: np.ndarray, lam: np.ndarray, mu: np.ndarray, w: np.ndarray) -> float:
+        """Dixon-Coles rho maximizing the weighted likelihood of low scores (grid search)."""
+        low = (hg <= 1) & (ag <= 1)
+        if not np.any(low):
+            return 0.0
+        rho = RHO_GRID[:, None]
+        tau = _dc_tau(hg[low][None, :], ag[low][None, :], lam[low][None, :], mu[low][None, :], rho)
+        valid = np.all(tau > 0, axis=1)
+        loglik = np.where(valid, np.sum(w[low][None, :] * np.log(np.clip(tau, 1e-12, None)), axis=1), -np.inf)
+        return float(RHO_GRID[int(np.argmax(loglik))])
+
+    def expected_goals(self, home_ids: Sequence[int], away_ids: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Expected goals of each fixture; unknown teams get average strengths."""
+        h = np.array([self.index.get(int(t), -1) for t in home_ids])
+        a = np.array([self.index.get(int(t), -1) for t in away_ids])
+        attack = np.append(self.attack, 1.0)  # index -1 = équipe moyenne
+        defence = np.append(self.defence, 1.0)
+        lam = self.base * attack[h] * defence[a] * self.home_advantage
+        mu = self.base * attack[a] * defence[h]
+        return lam, mu, (h >= 0) & (a >= 0)
+
+    def score_matrices(self, lam: np.ndarray, mu: np.ndarray) -> np.ndarray:
+        """Correct-score probabilities, shape (fixtures, MAX_GOALS, MAX_GOALS)."""
+        log_home = _GOALS[None, :] * np.log(lam)[:, None] - lam[:, None] - _LOG_FACTORIALS[None, :]
+        log_away = _GOALS[None, :] * np.log(mu)[:, None] - mu[:, None] - _LOG_FACTORIALS[None, :]
+        matrices = np.exp(log_home)[:, :, None] * np.exp(log_away)[:, None, :]
+
+        tau = _dc_tau(
+            _GOALS[None, :2, None], _GOALS[None, None, :2],
+            lam[:, None, None], mu[:, None, None], self.rho
+        )
+        matrices[:, :2, :2] *= tau
+        # Renormaliser (troncature à MAX_GOALS et correction DC)
+        matrices /= matrices.sum(axis=(1, 2), keepdims=True)
+        return matrices
+
+    def predict(self, home_ids: Sequence[int], away_ids: Sequence[int], top_scores: int = 3) -> List[Dict[str, Any]]:
+        """Batched 1X2, over/under, BTTS and most likely scores for fixtures."""
+        if not len(home_ids):
+            return []
+        start_time = time.perf_counter()
+
+        lam, mu, known = self.expected_goals(home_ids, away_ids)
+        matrices = self.score_matrices(lam, mu)
+
+        home = matrices[:, _HOME_WIN_MASK].sum(axis=1)
+        away = matrices[:, _AWAY_WIN_MASK].sum(axis=1)
+        draw = np.trace(matrices, axis1=1, axis2=2)
+        over = {line: matrices[:, _TOTAL_GOALS > line].sum(axis=1) for line in OVER_UNDER_LINES}
+        btts = matrices[:, 1:, 1:].sum(axis=1).sum(axis=1)
+        flat = matrices.reshape(len(lam), -1)
+        best = np.argsort(flat, axis=1)[:, ::-1][:, :top_scores]
+
+        predictions = []
+        for i in range(len(lam)):
+            predictions.append({
+                "probabilities": {
+                    "home": round(float(home[i]), 4),
+                    "draw": round(float(draw[i]), 4),
+                    "away": round(float(away[i]), 4),
+                },
+                "expected_goals": {"home": round(float(lam[i]), 2), "away": round(float(mu[i]), 2)},
+                "over_under": {
+                    str(line): {"over": round(float(over[line][i]), 4), "under": round(1 - float(over[line][i]), 4)}
+                    for line in OVER_UNDER_LINES
+                },
+                "btts": {"yes": round(float(btts[i]), 4), "no": round(1 - float(btts[i]), 4)},
+                "correct_scores": [
+                    {
+                        "score": f"{cell // MAX_GOALS}-{cell % MAX_GOALS}",
+                        "probability": round(float(flat[i, cell]), 4)
+                    }
+                    for cell in best[i]
+                ],
+                "known_teams": bool(known[i]),
+            })
+
+        metrics.observe("goals_model.predict_ms", (time.perf_counter() - start_time) * 1000)
+        return predictions
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "team_ids": self.team_ids,
+            "attack": self.attack.round(6).tolist(),
+            "defence": self.defence.round(6).tolist(),
+            "base": self.base,
+            "home_advantage": self.home_advantage,
+            "rho": self.rho,
+            "fitted_at": self.fitted_at,
+            "n_matches": self.n_matches,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GoalsModel":
+        return cls(
+            data["team_ids"],
+            np.asarray(data["attack"]),
+            np.asarray(data["defence"]),
+            data["base"],
+            data["home_advantage"],
+            data["rho"],
+            fitted_at=data.get("fitted_at"),
+            n_matches=data.get("n_matches", 0)
+        )
+
+
+class GoalsModelService:
+    """Fits the goals model from stored results and serves its predictions."""
+
+    def __init__(self):
+        self._model: Optional[GoalsModel] = None
+        self._loaded_at = 0.0
+
+    async def fit_from_db(self, db: AsyncSession) -> Optional[GoalsModel]:
+        """Fit on the stored results of the last `goals_model_history_days` and publish to Redis."""
+        now = datetime.utcnow()
+        since = datetime.fromtimestamp(now.timestamp() - settings.goals_model_history_days * 86400)
+        result = await db.execute(
+            select(
+                MatchResult.home_team_id,
+                MatchResult.away_team_id,
+                MatchResult.home_goals,
+                MatchResult.away_goals,
+                MatchResult.match_date
+            ).where(MatchResult.match_date >= since)
+        )
+        rows = result.all()
+        if len(rows) < settings.goals_model_min_matches:
+            logger.warning(f"⚠️ Goals model not fitted: only {len(rows)} results stored")
+            return None
+
+        home_ids, away_ids, home_goals, away_goals, dates = (np.asarray(col) for col in zip(*rows))
+        age_days = np.array([(now - d).total_seconds() / 86400 for d in dates])
+        weights = 0.5 ** (age_days / settings.goals_model_half_life_days)
+
+        start_time = time.perf_counter()
+        model = GoalsModel.fit(home_ids, away_ids, home_goals, away_goals, weights)
+        duration_ms = (time.perf_counter() - start_time) * 1000
+
+        await cache_service.set(REDIS_PARAMS_KEY, model.to_dict(), 30 * 86400)
+        self._model, self._loaded_at = model, time.time()
+
+        logger.info(
+            f"📈 Goals model fitted on {len(rows)} results, {len(model.team_ids)} teams ({duration_ms:.0f}ms) "
+            f"- home advantage {model.home_advantage:.2f}, rho {model.rho:.2f}",
+            extra={'extra_data': {
+                'matches': len(rows),
+                'teams': len(model.team_ids),
+                'duration_ms': duration_ms,
+                'home_advantage': model.home_advantage,
+                'rho': model.rho
+            }}
+        )
+        return model
+
+    async def get_model(self) -> Optional[GoalsModel]:
+        """Current model (parameters cached in-process, refreshed from Redis)."""
+        if self._model is not None and time.time() - self._loaded_at < LOCAL_CACHE_TTL:
+            return self._model
+        try:
+            data = await cache_service.get(REDIS_PARAMS_KEY)
+        except Exception as e:
+            logger.warning(f"⚠️ Goals model parameters unavailable: {str(e)}")
+            data = None
+        if data:
+            self._model = GoalsModel.from_dict(data)
+        self._loaded_at = time.time()
+        return self._model
+
+    async def predict_many(self, pairs: Sequence[Tuple[int, int]]) -> List[Optional[Dict[str, Any]]]:
+        """Predictions for (home_team_id, away_team_id) pairs, None when no model is fitted."""
+        model = await self.get_model()
+        if model is None or not pairs:
+            return [None] * len(pairs)
+        home_ids, away_ids = zip(*pairs)
+        return model.predict(home_ids, away_ids)
+
+    async def predict(self, home_team_id: int, away_team_id: int) -> Optional[Dict[str, Any]]:
+        """Prediction for one fixture (None when no model or either team is unknown)."""
+        prediction = (await self.predict_many([(home_team_id, away_team_id)]))[0]
+        if prediction is None or not prediction["known_teams"]:
+            return None
+        return prediction
+
+    async def precompute_upcoming(self, fixtures: List[Dict[str, Any]]) -> int:
+        """Predict all upcoming fixtures in one pass and store them in Redis."""
+        pairs = [(f["teams"]["home"]["id"], f["teams"]["away"]["id"]) for f in fixtures]
+        predictions = await self.predict_many(pairs)
+        payload = {
+            str(f["fixture"]["id"]): p for f, p in zip(fixtures, predictions) if p and p["known_teams"]
+        }
+        if payload:
+            await cache_service.set(REDIS_UPCOMING_KEY, payload, 86400)
+        return len(payload)
+
+    def fallback_analysis(self, prediction: Dict[str, Any], home_team: str, away_team: str) -> Dict[str, Any]:
+        """Analysis built from the model when the AI provider is unavailable."""
+        probs = prediction["probabilities"]
+        outcome = max(("1", probs["home"]), ("X", probs["draw"]), ("2", probs["away"]), key=lambda o: o[1])[0]
+        xg = prediction["expected_goals"]
+        over = prediction["over_under"]["2.5"]["over"]
+        btts = prediction["btts"]["yes"]
+        scores = ", ".join(f"{s['score']} ({s['probability']:.0%})" for s in prediction["correct_scores"])
+
+        return {
+            "probabilities": {k: round(v, 3) for k, v in probs.items()},
+            "predicted_outcome": outcome,
+            "confidence": round(max(probs.values()), 2),
+            "key_factors": [
+                f"Buts attendus (modèle): {home_team} {xg['home']:.2f} - {xg['away']:.2f} {away_team}",
+                f"Plus de 2.5 buts: {over:.0%} | Les deux équipes marquent: {btts:.0%}",
+                f"Scores les plus probables: {scores}",
+            ],
+            "scenarios": [
+                {"name": f"Score {s['score']}", "probability": s["probability"], "description": "Score le plus probable selon le modèle statistique."}
+                for s in prediction["correct_scores"]
+            ],
+            "summary": (
+                f"Analyse statistique (modèle Dixon-Coles) : {home_team} {probs['home']:.0%}, "
+                f"nul {probs['draw']:.0%}, {away_team} {probs['away']:.0%}. Service IA indisponible."
+            ),
+            "is_fallback": True,
+            "served_by": {"provider": "goals_model", "model": "dixon-coles", "tier": "statistical"},
+        }
+
+
+# Singleton instance
+goals_model_service = GoalsModelService()
@@ -0,0 +1,209 @@
+"""
+Odds normalisation: bookmaker margin removal and market consensus.
+
+Odds of any number of bookmakers are held in dense (..., bookmaker,
+outcome) arrays (NaN where a price is missing). The overround of each
+market is removed with the proportional, Shin or power method; the
+consensus fair probability of an outcome is the mean over the bookmakers
+quoting its full market, and the best price is the highest quote.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+
+settings = get_settings()
+
+# Axe "outcome" : (marché, issue, nom du pari, libellé de la cote)
+OUTCOMES: List[Tuple[str, str, str, str]] = [
+    ("1X2", "1", "Match Winner", "Home"),
+    ("1X2", "X", "Match Winner", "Draw"),
+    ("1X2", "2", "Match Winner", "Away"),
+    ("O/U 1.5", "Over 1.5", "Goals Over/Under", "Over 1.5"),
+    ("O/U 1.5", "Under 1.5", "Goals Over/Under", "Under 1.5"),
+    ("O/U 2.5", "Over 2.5", "Goals Over/Under", "Over 2.5"),
+    ("O/U 2.5", "Under 2.5", "Goals Over/Under", "Under 2.5"),
+    ("O/U 3.5", "Over 3.5", "Goals Over/Under", "Over 3.5"),
+    ("O/U 3.5", "Under 3.5", "Goals Over/Under", "Under 3.5"),
+    ("BTTS", "Yes", "Both Teams Score", "Yes"),
+    ("BTTS", "No", "Both Teams Score", "No"),
+]
+OUTCOME_INDEX = {(bet, label): i for i, (_, _, bet, label) in enumerate(OUTCOMES)}
+# Index d'une issue par son libellé de sélection ("1", "X", "Over 2.5", "BTTS Yes"...)
+SELECTION_INDEX = {outcome.lower(): i for i, (_, outcome, _, _) in enumerate(OUTCOMES)}
+SELECTION_INDEX.update({f"btts {outcome.lower()}": i for i, (market, outcome, _, _) in enumerate(OUTCOMES) if market == "BTTS"})
+# Issues d'un même marché (la marge est retirée marché par marché)
+MARKET_GROUPS = [
+    [i for i, outcome in enumerate(OUTCOMES) if outcome[0] == market]
+    for market in dict.fromkeys(outcome[0] for outcome in OUTCOMES)
+]
+
+MARGIN_METHODS = ("proportional", "shin", "power")
+# Itérations de bissection (Shin, power) : précision ~1e-12
+SOLVER_ITERATIONS = 40
+
+
+def parse_bookmakers(odds_data: List[Dict[str, Any]]) -> List[Tuple[str, np.ndarray]]:
+    """
+    Odds of each bookmaker as (name, prices over OUTCOMES).
+
+    Accepts the API-Football shape (`bookmakers` list) and the single
+    bookmaker entries returned by the hybrid provider.
+    """
+    entries = []
+    for item in odds_data or []:
+        if "bookmakers" in item:
+            entries.extend(item.get("bookmakers") or [])
+        elif "bets" in item:
+            entries.append({"name": (item.get("bookmaker") or {}).get("name", "Average"), "bets": item["bets"]})
+
+    bookmakers = []
+    for entry in entries:
+        prices = np.full(len(OUTCOMES), np.nan)
+        for bet in entry.get("bets", []):
+            for val in bet.get("values", []):
+                i = OUTCOME_INDEX.get((bet.get("name"), str(val.get("value"))))
+                if i is None:
+                    continue
+                try:
+                    odd = float(val.get("odd"))
+                except (ValueError, TypeError):
+                    continue
+                if odd > 1.0:
+                    prices[i] = odd
+        if not np.all(np.isnan(prices)):
+            bookmakers.append((str(entry.get("name", "")), prices))
+    return bookmakers
+
+
+def build_odds_array(odds_by_fixture: Sequence[List[Dict[str, Any]]]) -> Tuple[np.ndarray, List[List[str]]]:
+    """Dense (fixtures, bookmakers, outcomes) price array, NaN-padded, and the bookmaker names."""
+    parsed = [parse_bookmakers(odds) for odds in odds_by_fixture]
+    n_books = max((len(books) for books in parsed), default=0)
+    prices = np.full((len(parsed), max(n_books, 1), len(OUTCOMES)), np.nan)
+    names = []
+    for f, books in enumerate(parsed):
+        names.append([name for name, _ in books])
+        for b, (_, row) in enumerate(books):
+            prices[f, b] = row
+    return prices, names
+
+
+def _bisect(func, low: np.ndarray, high: np.ndarray) -> np.ndarray:
+    """Vectorized bisection of an increasing function, one root per element."""
+    for _ in range(SOLVER_ITERATIONS):
+        mid = (low + high) / 2
+        above = func(mid) > 0
+        high = np.where(above, mid, high)
+        low = np.where(above, low, mid)
+    return (low + high) / 2
+
+
+def remove_margin(implied: np.ndarray, method: str = "proportional") -> np.ndarray:
+    """
+    Fair probabilities of one market from its implied probabilities (last axis).
+
+    - proportional: scale by the overround.
+    - shin: Shin's insider-trading model, which puts more margin on longshots.
+    - power: p = implied ** k, with k such that the probabilities sum to 1.
+
+    Rows with a missing outcome stay NaN.
+    """
+    overround = implied.sum(axis=-1, keepdims=True)
+    if method == "proportional":
+        return implied / overround
+
+    with np.errstate(invalid="ignore"):
+        valid = np.isfinite(overround[..., 0]) & (overround[..., 0] > 1.0)
+    safe = np.where(valid[..., None], implied, 0.5)
+    safe_overround = safe.sum(axis=-1, keepdims=True)
+
+    if method == "shin":
+        def shin(z: np.ndarray) -> np.ndarray:
+            z = z[..., None]
+            return (np.sqrt(z ** 2 + 4 * (1 - z) * safe ** 2 / safe_overround) - z) / (2 * (1 - z))
+
+        # La somme décroît avec z : chercher la racine de 1 - somme
+        z = _bisect(lambda z: 1 - shin(z).sum(axis=-1), np.zeros(valid.shape), np.full(valid.shape, 0.5))
+        fair = shin(z)
+    elif method == "power":
+        # implied < 1 : la somme des implied ** k décroît avec k
+        k = _bisect(lambda k: 1 - (safe ** k[..., None]).sum(axis=-1), np.ones(valid.shape), np.full(valid.shape, 20.0))
+        fair = safe ** k[..., None]
+    else:
+        raise ValueError(f"Unknown margin removal method: {method}")
+
+    # Pas de marge (ou marge négative) : normalisation proportionnelle
+    return np.where(valid[..., None], fair / fair.sum(axis=-1, keepdims=True), implied / overround)
+
+
+def fair_probabilities(prices: np.ndarray, method: Optional[str] = None) -> np.ndarray:
+    """Fair probabilities of every market of a (..., outcomes) price array."""
+    method = method or settings.odds_margin_method
+    implied = 1.0 / prices
+    fair = np.full_like(implied, np.nan)
+    for group in MARKET_GROUPS:
+        fair[..., group] = remove_margin(implied[..., group], method)
+    return fair
+
+
+def market_consensus(prices: np.ndarray, method: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Consensus of a (fixtures, bookmakers, outcomes) price array.
+
+    Returns per (fixture, outcome): `fair_probability` (mean over the
+    bookmakers quoting the full market), `best_price` and `best_bookmaker`;
+    and per (fixture, bookmaker, market): `overround`.
+    """
+    fair = fair_probabilities(prices, method)
+    quotes = np.sum(~np.isnan(fair), axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        consensus = np.where(quotes > 0, np.nansum(fair, axis=1) / np.maximum(quotes, 1), np.nan)
+
+    masked = np.where(np.isnan(prices), -np.inf, prices)
+    best_bookmaker = np.argmax(masked, axis=1)
+    best_price = np.take_along_axis(prices, best_bookmaker[:, None, :], axis=1)[:, 0, :]
+
+    overround = np.stack([(1.0 / prices[..., group]).sum(axis=-1) for group in MARKET_GROUPS], axis=-1)
+
+    return {
+        "fair_probability": consensus,
+        "best_price": best_price,
+        "best_bookmaker": best_bookmaker,
+        "overround": overround,
+    }
+
+
+def fixture_consensus(odds_data: List[Dict[str, Any]], method: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Consensus of one fixture keyed by outcome ("1", "X", "Over 2.5", "Yes"...).
+
+    Each outcome quoted by at least one bookmaker gets `fair_probability`
+    (None if no bookmaker quotes its full market), `best_odds` and `bookmaker`.
+    """
+    prices, names = build_odds_array([odds_data])
+    consensus = market_consensus(prices, method)
+
+    result = {}
+    for o, (market, outcome, _, _) in enumerate(OUTCOMES):
+        best = consensus["best_price"][0, o]
+        if np.isnan(best):
+            continue
+        fair = consensus["fair_probability"][0, o]
+        result[outcome] = {
+            "market": market,
+            "fair_probability": None if np.isnan(fair) else round(float(fair), 4),
+            "best_odds": float(best),
+            "bookmaker": names[0][consensus["best_bookmaker"][0, o]],
+        }
+    return result
+
+
+def selection_fair_probability(selection_type: str, consensus: Dict[str, Dict[str, Any]]) -> Optional[float]:
+    """Consensus fair probability of a coupon selection ("1", "X", "Over 2.5"...), None if unknown."""
+    i = SELECTION_INDEX.get(selection_type.strip().lower())
+    if i is None:
+        return None
+    entry = consensus.get(OUTCOMES[i][1])
+    return entry["fair_probability"] if entry else None
@@ -0,0 +1,156 @@
+"""
+Odds time series per fixture, stored append-only in Redis.
+
+Each poll appends one fixed-size binary record to `odds_ts:{fixture_id}`:
+a uint32 timestamp and, for every outcome of services.stats.odds.OUTCOMES
+(all markets), the int16 delta of the best price in hundredths since the
+previous record (0 = outcome not quoted). Unchanged prices are not
+appended. A series decodes with one `np.frombuffer` + cumulative sum,
+from which the line movement features are computed. As each delta depends
+on the whole series, the read and the append of a record are one
+optimistic transaction (WATCH/MULTI): overlapping polls of a fixture
+cannot append two deltas against the same previous prices.
+"""
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from redis.exceptions import WatchError
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.services.cache_service import cache_service
+from app.services.stats.odds import OUTCOMES, build_odds_array, market_consensus
+
+settings = get_settings()
+logger = get_logger('services.odds_history')
+
+RECORD_DTYPE = np.dtype([("ts", "<u4"), ("delta", "<i2", (len(OUTCOMES),))])
+SERIES_KEY = "odds_ts:{fixture_id}"
+# Conservation de l'historique après le coup d'envoi
+SERIES_TTL = 14 * 86400
+
+# Raccourcissement de cote considéré comme "steam move" (en fraction)
+STEAM_DROP = 0.05
+STEAM_WINDOW_SECONDS = 3600
+# Nouvelles tentatives quand la série est modifiée entre lecture et ajout
+APPEND_MAX_ATTEMPTS = 5
+
+
+def _encode_prices(prices: np.ndarray) -> np.ndarray:
+    """Best prices (NaN = not quoted) as int16 hundredths, 0 when not quoted."""
+    return np.where(np.isnan(prices), 0, np.round(prices * 100)).clip(0, 32767).astype(np.int32)
+
+
+def decode_series(raw: Optional[bytes]) -> Dict[str, np.ndarray]:
+    """Decode a stored series: `ts` (n,) and `prices` (n, outcomes), NaN when not quoted."""
+    if not raw:
+        return {"ts": np.zeros(0, dtype=np.uint32), "prices": np.zeros((0, len(OUTCOMES)))}
+    records = np.frombuffer(raw[:len(raw) - len(raw) % RECORD_DTYPE.itemsize], dtype=RECORD_DTYPE)
+    levels = np.cumsum(records["delta"].astype(np.int32), axis=0)
+    return {
+        "ts": records["ts"],
+        "prices": np.where(levels > 0, levels / 100.0, np.nan),
+    }
+
+
+class OddsHistoryService:
+    """Appends polled odds to the per-fixture series and computes movement features."""
+
+    async def _load(self, fixture_id: int) -> Optional[bytes]:
+        r = await cache_service.get_binary_redis()
+        return await r.get(SERIES_KEY.format(fixture_id=fixture_id))
+
+    async def append(self, fixture_id: int, odds_data: List[Dict[str, Any]], now: Optional[float] = None) -> bool:
+        """Append the best prices of a poll; returns False when nothing changed."""
+        prices, _ = build_odds_array([odds_data])
+        best = market_consensus(prices)["best_price"][0]
+        if np.all(np.isnan(best)):
+            return False
+
+        current = _encode_prices(best)
+        r = await cache_service.get_binary_redis()
+        key = SERIES_KEY.format(fixture_id=fixture_id)
+        async with r.pipeline(transaction=True) as pipe:
+            for _ in range(APPEND_MAX_ATTEMPTS):
+                try:
+                    await pipe.watch(key)
+                    series = decode_series(await pipe.get(key))
+                    previous = _encode_prices(series["prices"][-1]) if len(series["ts"]) else np.zeros_like(current)
+                    if len(series["ts"]) and np.array_equal(current, previous):
+                        await pipe.unwatch()
+                        return False
+
+                    record = np.zeros(1, dtype=RECORD_DTYPE)
+                    record["ts"] = int(now or time.time())
+                    record["delta"][0] = current - previous
+
+                    pipe.multi()
+                    pipe.append(key, record.tobytes())
+                    pipe.expire(key, SERIES_TTL)
+                    await pipe.execute()
+                    metrics.incr("odds_history.appends")
+                    return True
+                except WatchError:
+                    # Série modifiée par une autre collecte : delta recalculé
+                    metrics.incr("odds_history.append_conflicts")
+                    continue
+
+        logger.warning(f"⚠️ Odds history append abandoned for fixture {fixture_id} (concurrent polls)")
+        return False
+
+    def features(self, series: Dict[str, np.ndarray]) -> Dict[str, Dict[str, Any]]:
+        """
+        Movement of each quoted outcome: opening and current price, change
+        (negative = shortened), and `steam` when the price shortened by at
+        least STEAM_DROP within STEAM_WINDOW_SECONDS.
+        """
+        ts, prices = series["ts"].astype(np.int64), series["prices"]
+        if len(ts) < 2:
+            return {}
+
+        # Cote de référence = plus haute cote dans la fenêtre précédant chaque point
+        in_window = (ts[None, :] <= ts[:, None]) & (ts[None, :] >= ts[:, None] - STEAM_WINDOW_SECONDS)
+        quoted_prices = np.where(np.isnan(prices), -np.inf, prices)
+        window_high = np.max(np.where(in_window[:, :, None], quoted_prices[None, :, :], -np.inf), axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            drops = 1 - prices / window_high
+        steam = np.max(np.where(np.isfinite(drops), drops, -np.inf), axis=0) >= STEAM_DROP
+
+        movement = {}
+        for o, (market, outcome, _, _) in enumerate(OUTCOMES):
+            quoted = ~np.isnan(prices[:, o])
+            if quoted.sum() < 2:
+                continue
+            opening, current = prices[quoted, o][0], prices[quoted, o][-1]
+            movement[outcome] = {
+                "market": market,
+                "opening": round(float(opening), 2),
+                "current": round(float(current), 2),
+                "change": round(float(current / opening - 1), 4),
+                "steam": bool(steam[o]),
+            }
+        return movement
+
+    async def movement(self, fixture_id: int) -> Dict[str, Dict[str, Any]]:
+        """Movement features of a fixture from its stored series (one Redis read)."""
+        try:
+            return self.features(decode_series(await self._load(fixture_id)))
+        except Exception as e:
+            logger.warning(f"⚠️ Odds history unavailable for fixture {fixture_id}: {str(e)}")
+            return {}
+
+
+def poll_interval(seconds_to_kickoff: float) -> Optional[int]:
+    """Seconds between two odds polls of a fixture, None once it has kicked off."""
+    if seconds_to_kickoff <= 0:
+        return None
+    for horizon, interval in settings.odds_poll_schedule:
+        if seconds_to_kickoff <= horizon * 3600:
+            return interval * 60
+    return settings.odds_poll_schedule[-1][1] * 60
+
+
+# Singleton instance
+odds_history_service = OddsHistoryService()
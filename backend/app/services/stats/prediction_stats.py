@@ -0,0 +1,215 @@
+"""
+Prediction accuracy rollups (hit rate, Brier score, log-loss, calibration).
+
+Settled 1X2 predictions are scored in one vectorized pass and added to
+the counters of their scopes: "global", "user", "league" and "model".
+Counters are plain sums upserted with `col = col + VALUES(col)`, so the
+stats endpoints read one row per scope (plus its calibration bins)
+instead of scanning the analyses.
+"""
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.models import MatchAnalysis, PredictionCalibration, PredictionStats
+
+logger = get_logger('services.prediction_stats')
+
+SCOPES = ("global", "user", "league", "model")
+OUTCOMES = ("1", "X", "2")
+CALIBRATION_BINS = 10
+# Plancher de probabilité du log-loss (prédiction à 0 d'une issue arrivée)
+LOG_LOSS_FLOOR = 1e-6
+REBUILD_BATCH = 5000
+
+
+def score_predictions(
+    probabilities: np.ndarray,
+    outcomes: np.ndarray,
+    predicted: Optional[np.ndarray] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Per prediction scores of (n, 3) 1X2 probabilities against the outcome
+    indexes (n,): hit, multi-class Brier score, log-loss, calibration bin
+    and occurrence of each of the 3 probabilities. A hit is the predicted
+    outcome index (n,) having happened; argmax of the probabilities when
+    not given.
+    """
+    occurred = np.zeros_like(probabilities, dtype=bool)
+    occurred[np.arange(len(outcomes)), outcomes] = True
+    if predicted is None:
+        predicted = np.argmax(probabilities, axis=1)
+    return {
+        "hit": predicted == outcomes,
+        "brier": ((probabilities - occurred) ** 2).sum(axis=1),
+        "log_loss": -np.log(np.maximum(probabilities[np.arange(len(outcomes)), outcomes], LOG_LOSS_FLOOR)),
+        "bin": np.minimum((probabilities * CALIBRATION_BINS).astype(int), CALIBRATION_BINS - 1),
+        "occurred": occurred,
+    }
+
+
+def _summary(stats: PredictionStats) -> Dict[str, Any]:
+    n = stats.predictions or 0
+    return {
+        "scope": stats.scope,
+        "key": stats.scope_key,
+        "label": stats.label,
+        "predictions": n,
+        "hits": stats.hits,
+        "hit_rate": round(stats.hits / n, 4) if n else None,
+        "brier": round(stats.brier_sum / n, 4) if n else None,
+        "log_loss": round(stats.log_loss_sum / n, 4) if n else None,
+    }
+
+
+class PredictionStatsService:
+    """Maintains and reads the accuracy rollups."""
+
+    async def record(self, db: AsyncSession, rows: Sequence[Dict[str, Any]]) -> None:
+        """
+        Add settled predictions to the rollups (in the caller's transaction).
+
+        Rows have `user_id`, `league_id`, `league_name`, `model_name`,
+        `prediction_home/draw/away`, `predicted_outcome` and `actual_result`
+        ("1", "X", "2"). Hits are scored against `predicted_outcome`, like
+        `was_correct` (ties of probabilities are not resolved as argmax does).
+        """
+        rows = [r for r in rows if r["actual_result"] in OUTCOMES]
+        if not rows:
+            return
+        probabilities = np.array(
+            [(r["prediction_home"], r["prediction_draw"], r["prediction_away"]) for r in rows], dtype=float
+        )
+        # Issue prédite inconnue (-1) : jamais comptée juste, comme was_correct
+        predicted = np.array([
+            OUTCOMES.index(r["predicted_outcome"]) if r.get("predicted_outcome") in OUTCOMES else -1
+            for r in rows
+        ])
+        scores = score_predictions(
+            probabilities, np.array([OUTCOMES.index(r["actual_result"]) for r in rows]), predicted
+        )
+
+        scope_keys = {
+            "global": [("", "") for _ in rows],
+            "user": [(str(r["user_id"]), "") for r in rows],
+            "league": [(str(r["league_id"]), r["league_name"] or "") for r in rows],
+            "model": [(r["model_name"] or "unknown", r["model_name"] or "unknown") for r in rows],
+        }
+
+        now = datetime.utcnow()
+        totals, calibration = [], []
+        for scope, keys in scope_keys.items():
+            unique, inverse = np.unique([key for key, _ in keys], return_inverse=True)
+            labels = dict(keys)
+            n = np.bincount(inverse, minlength=len(unique))
+            hits = np.bincount(inverse, weights=scores["hit"], minlength=len(unique))
+            brier = np.bincount(inverse, weights=scores["brier"], minlength=len(unique))
+            log_loss = np.bincount(inverse, weights=scores["log_loss"], minlength=len(unique))
+            for i, key in enumerate(unique):
+                totals.append({
+                    "scope": scope, "scope_key": str(key), "label": labels[key],
+                    "predictions": int(n[i]), "hits": int(hits[i]),
+                    "brier_sum": float(brier[i]), "log_loss_sum": float(log_loss[i]),
+                    "updated_at": now,
+                })
+
+            # Bins de calibration : (clé, bin) sur les 3 probabilités de chaque prédiction
+            cells = (inverse[:, None] * CALIBRATION_BINS + scores["bin"]).ravel()
+            size = len(unique) * CALIBRATION_BINS
+            count = np.bincount(cells, minlength=size)
+            probability_sum = np.bincount(cells, weights=probabilities.ravel(), minlength=size)
+            occurred = np.bincount(cells, weights=scores["occurred"].ravel(), minlength=size)
+            for cell in np.flatnonzero(count):
+                calibration.append({
+                    "scope": scope, "scope_key": str(unique[cell // CALIBRATION_BINS]),
+                    "bin": int(cell % CALIBRATION_BINS),
+                    "count": int(count[cell]), "probability_sum": float(probability_sum[cell]),
+                    "hits": int(occurred[cell]),
+                })
+
+        stmt = insert(PredictionStats).values(totals)
+        await db.execute(stmt.on_duplicate_key_update(
+            label=stmt.inserted.label,
+            predictions=PredictionStats.predictions + stmt.inserted.predictions,
+            hits=PredictionStats.hits + stmt.inserted.hits,
+            brier_sum=PredictionStats.brier_sum + stmt.inserted.brier_sum,
+            log_loss_sum=PredictionStats.log_loss_sum + stmt.inserted.log_loss_sum,
+            updated_at=stmt.inserted.updated_at,
+        ))
+        stmt = insert(PredictionCalibration).values(calibration)
+        await db.execute(stmt.on_duplicate_key_update(
+            count=PredictionCalibration.count + stmt.inserted.count,
+            probability_sum=PredictionCalibration.probability_sum + stmt.inserted.probability_sum,
+            hits=PredictionCalibration.hits + stmt.inserted.hits,
+        ))
+
+    async def get(self, db: AsyncSession, scope: str, key: str = "") -> Optional[Dict[str, Any]]:
+        """Summary and calibration curve of one scope, None if nothing settled yet."""
+        stats = await db.get(PredictionStats, (scope, key))
+        if stats is None:
+            return None
+        result = await db.execute(
+            select(PredictionCalibration)
+            .where(PredictionCalibration.scope == scope, PredictionCalibration.scope_key == key)
+            .order_by(PredictionCalibration.bin)
+        )
+        return {
+            **_summary(stats),
+            "calibration": [
+                {
+                    "bin": f"{b.bin / CALIBRATION_BINS:.1f}-{(b.bin + 1) / CALIBRATION_BINS:.1f}",
+                    "count": b.count,
+                    "mean_probability": round(b.probability_sum / b.count, 4),
+                    "frequency": round(b.hits / b.count, 4),
+                }
+                for b in result.scalars().all()
+                if b.count
+            ],
+        }
+
+    async def list(self, db: AsyncSession, scope: str, min_predictions: int = 1, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of every key of a scope (leagues, models...), most predictions first."""
+        result = await db.execute(
+            select(PredictionStats)
+            .where(PredictionStats.scope == scope, PredictionStats.predictions >= min_predictions)
+            .order_by(PredictionStats.predictions.desc())
+            .limit(limit)
+        )
+        return [_summary(stats) for stats in result.scalars().all()]
+
+    async def rebuild(self, db: AsyncSession) -> int:
+        """Recompute every rollup from the settled analyses (backfill, repair)."""
+        await db.execute(delete(PredictionCalibration))
+        await db.execute(delete(PredictionStats))
+
+        columns = (
+            MatchAnalysis.id, MatchAnalysis.user_id, MatchAnalysis.league_id, MatchAnalysis.league_name,
+            MatchAnalysis.model_name, MatchAnalysis.prediction_home, MatchAnalysis.prediction_draw,
+            MatchAnalysis.prediction_away, MatchAnalysis.predicted_outcome, MatchAnalysis.actual_result,
+        )
+        total, last_id = 0, ""
+        while True:
+            result = await db.execute(
+                select(*columns)
+                .where(MatchAnalysis.actual_result.is_not(None), MatchAnalysis.id > last_id)
+                .order_by(MatchAnalysis.id)
+                .limit(REBUILD_BATCH)
+            )
+            rows = result.mappings().all()
+            if not rows:
+                break
+            await self.record(db, rows)
+            total += len(rows)
+            last_id = rows[-1]["id"]
+        await db.commit()
+        logger.info(f"📊 Prediction stats rebuilt from {total} settled analyses")
+        return total
+
+
+# Singleton instance
+prediction_stats_service = PredictionStatsService()
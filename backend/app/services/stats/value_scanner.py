@@ -0,0 +1,161 @@
+"""
+Value-bet scanner over all upcoming fixtures and bookmakers.
+
+Odds of every fixture are loaded into a dense (fixture x bookmaker x
+outcome) array (see services.stats.odds). The expected value of every
+price against the model/AI probabilities is computed in one vectorized
+pass, next to the margin-free market consensus. The ranked result is
+precomputed by a Celery task and served from Redis.
+"""
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.services.cache_service import cache_service
+from app.services.stats.odds import OUTCOMES, build_odds_array, market_consensus
+
+settings = get_settings()
+logger = get_logger('services.value_scanner')
+
+REDIS_VALUE_BETS_KEY = "value_bets:upcoming"
+
+
+def model_probabilities(
+    predictions: Sequence[Optional[Dict[str, Any]]],
+    ai_probabilities: Sequence[Optional[Dict[str, float]]]
+) -> np.ndarray:
+    """(fixtures, outcomes) probabilities: AI 1X2 when analysed, goals model otherwise."""
+    probs = np.full((len(predictions), len(OUTCOMES)), np.nan)
+    for f, (prediction, ai) in enumerate(zip(predictions, ai_probabilities)):
+        if prediction:
+            p = prediction["probabilities"]
+            probs[f, 0:3] = (p["home"], p["draw"], p["away"])
+            for j, line in enumerate(("1.5", "2.5", "3.5")):
+                over = prediction["over_under"][line]["over"]
+                probs[f, 3 + 2 * j:5 + 2 * j] = (over, 1 - over)
+            btts = prediction["btts"]["yes"]
+            probs[f, 9:11] = (btts, 1 - btts)
+        if ai:
+            probs[f, 0:3] = (ai.get("home", np.nan), ai.get("draw", np.nan), ai.get("away", np.nan))
+    return probs
+
+
+def scan(prices: np.ndarray, probs: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Expected value of every price in one pass.
+
+    Returns, per (fixture, outcome): best EV, index of the best bookmaker,
+    best price and the market consensus fair probability.
+    """
+    ev = probs[:, None, :] * prices - 1.0
+    has_price = ~np.all(np.isnan(ev), axis=1)
+    best_book = np.argmax(np.where(np.isnan(ev), -np.inf, ev), axis=1)
+    best_ev = np.take_along_axis(ev, best_book[:, None, :], axis=1)[:, 0, :]
+    best_price = np.take_along_axis(prices, best_book[:, None, :], axis=1)[:, 0, :]
+
+    return {
+        "ev": np.where(has_price, best_ev, np.nan),
+        "bookmaker": best_book,
+        "price": best_price,
+        "market_probability": market_consensus(prices)["fair_probability"],
+    }
+
+
+def fixture_value_bets(probabilities: Dict[str, float], odds_data: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """1X2 expected values of one fixture at the best price of all its bookmakers, best first."""
+    prices, names = build_odds_array([odds_data])
+    probs = np.full((1, len(OUTCOMES)), np.nan)
+    probs[0, 0:3] = (probabilities.get("home", 0), probabilities.get("draw", 0), probabilities.get("away", 0))
+    result = scan(prices, probs)
+
+    values = []
+    for o in range(3):
+        if np.isnan(result["ev"][0, o]):
+            continue
+        value = float(result["ev"][0, o])
+        market_probability = result["market_probability"][0, o]
+        values.append({
+            "outcome": OUTCOMES[o][1],
+            "ai_probability": float(probs[0, o]),
+            "market_odds": float(result["price"][0, o]),
+            "market_probability": None if np.isnan(market_probability) else round(float(market_probability), 4),
+            "bookmaker": names[0][result["bookmaker"][0, o]],
+            "value_percentage": round(value * 100, 2),
+            "is_value": value > settings.value_bet_min_edge,
+        })
+    values.sort(key=lambda x: x["value_percentage"], reverse=True)
+    return values
+
+
+def rank_value_bets(
+    fixtures: Sequence[Dict[str, Any]],
+    odds_by_fixture: Sequence[List[Dict[str, Any]]],
+    predictions: Sequence[Optional[Dict[str, Any]]],
+    ai_probabilities: Sequence[Optional[Dict[str, float]]],
+    min_edge: float
+) -> List[Dict[str, Any]]:
+    """Value bets of all fixtures (EV above `min_edge`), best first."""
+    if not fixtures:
+        return []
+    start_time = time.perf_counter()
+
+    prices, names = build_odds_array(odds_by_fixture)
+    probs = model_probabilities(predictions, ai_probabilities)
+    result = scan(prices, probs)
+
+    with np.errstate(invalid="ignore"):
+        f_idx, o_idx = np.nonzero(result["ev"] > min_edge)
+    order = np.argsort(-result["ev"][f_idx, o_idx])
+
+    value_bets = []
+    for f, o in zip(f_idx[order], o_idx[order]):
+        fixture = fixtures[f]
+        market, outcome, _, _ = OUTCOMES[o]
+        market_probability = result["market_probability"][f, o]
+        value_bets.append({
+            "fixture_id": fixture["fixture"]["id"],
+            "date": fixture["fixture"].get("date"),
+            "league": fixture.get("league", {}).get("name"),
+            "home_team": fixture["teams"]["home"]["name"],
+            "away_team": fixture["teams"]["away"]["name"],
+            "market": market,
+            "outcome": outcome,
+            "probability": round(float(probs[f, o]), 4),
+            "source": "ai" if ai_probabilities[f] and o < 3 else "model",
+            "market_probability": None if np.isnan(market_probability) else round(float(market_probability), 4),
+            "odds": float(result["price"][f, o]),
+            "bookmaker": names[f][result["bookmaker"][f, o]],
+            "value_percentage": round(float(result["ev"][f, o]) * 100, 2),
+        })
+
+    duration_ms = (time.perf_counter() - start_time) * 1000
+    metrics.observe("value_scanner.scan_ms", duration_ms)
+    logger.info(
+        f"🎯 Value scan: {len(value_bets)} value bets over {len(fixtures)} fixtures "
+        f"x {prices.shape[1]} bookmakers ({duration_ms:.1f}ms)",
+        extra={'extra_data': {
+            'fixtures': len(fixtures),
+            'bookmakers': prices.shape[1],
+            'value_bets': len(value_bets),
+            'duration_ms': duration_ms
+        }}
+    )
+    return value_bets
+
+
+async def store_value_bets(value_bets: List[Dict[str, Any]]) -> None:
+    await cache_service.set(
+        REDIS_VALUE_BETS_KEY,
+        {"generated_at": datetime.utcnow().isoformat(), "value_bets": value_bets},
+        settings.value_scan_interval_minutes * 60 * 2
+    )
+
+
+async def get_value_bets() -> Optional[Dict[str, Any]]:
+    """Last precomputed scan ({"generated_at", "value_bets"}), None if not computed yet."""
+    return await cache_service.get(REDIS_VALUE_BETS_KEY)
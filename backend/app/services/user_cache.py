@@ -0,0 +1,107 @@
+"""
+Authenticated user snapshot cache.
+
+`get_current_user` runs on every authenticated request; the user row it
+needs is kept in a small in-process cache backed by Redis, so most
+requests authenticate without touching the database. Snapshots are
+detached `User` instances holding the profile and subscription columns
+only (no password hash, OTP or refresh token): endpoints that modify the
+user or need those columns load the live row (`get_current_user_for_update`).
+Every write to a user invalidates its snapshot; other processes drop
+their in-process copy after `LOCAL_TTL_SECONDS` at most.
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import DateTime, inspect
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.models import User
+from app.services.cache_service import cache_service
+
+logger = get_logger('services.user_cache')
+
+USER_CACHE_KEY = "user_snapshot:{user_id}"
+REDIS_TTL_SECONDS = 300
+LOCAL_TTL_SECONDS = 15
+LOCAL_MAX_ENTRIES = 10000
+# Colonnes sensibles jamais mises en cache
+EXCLUDED_COLUMNS = {"hashed_password", "otp_code", "otp_expires_at", "refresh_token"}
+
+_COLUMNS = [c for c in inspect(User).columns if c.key not in EXCLUDED_COLUMNS]
+_DATETIME_COLUMNS = {c.key for c in _COLUMNS if isinstance(c.type, DateTime)}
+
+
+def _to_snapshot(user: User) -> Dict[str, Any]:
+    data = {}
+    for column in _COLUMNS:
+        value = getattr(user, column.key)
+        data[column.key] = value.isoformat() if isinstance(value, datetime) else value
+    return data
+
+
+def _from_snapshot(data: Dict[str, Any]) -> User:
+    """Detached User from a snapshot; excluded columns raise if accessed."""
+    user = User(**{
+        key: datetime.fromisoformat(value) if key in _DATETIME_COLUMNS and value else value
+        for key, value in data.items()
+    })
+    make_transient_to_detached(user)
+    return user
+
+
+class UserCache:
+    """In-process + Redis cache of user snapshots, keyed by user id."""
+
+    def __init__(self):
+        self._local: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, user_id: str) -> Optional[User]:
+        entry = self._local.get(user_id)
+        if entry and entry[0] > time.monotonic():
+            metrics.incr("user_cache.hits", tier="local")
+            return _from_snapshot(entry[1])
+
+        try:
+            data = await cache_service.get(USER_CACHE_KEY.format(user_id=user_id))
+        except Exception as e:
+            logger.warning(f"⚠️ User cache unavailable: {str(e)}")
+            data = None
+        if not data:
+            self._local.pop(user_id, None)
+            metrics.incr("user_cache.misses")
+            return None
+
+        self._store_local(user_id, data)
+        metrics.incr("user_cache.hits", tier="redis")
+        return _from_snapshot(data)
+
+    async def set(self, user: User) -> None:
+        data = _to_snapshot(user)
+        self._store_local(user.id, data)
+        try:
+            await cache_service.set(USER_CACHE_KEY.format(user_id=user.id), data, REDIS_TTL_SECONDS)
+        except Exception as e:
+            logger.warning(f"⚠️ User cache unavailable: {str(e)}")
+
+    async def invalidate(self, user_id: str) -> None:
+        """Drop a user's snapshot (call after committing any change to the user)."""
+        self._local.pop(user_id, None)
+        try:
+            await cache_service.delete(USER_CACHE_KEY.format(user_id=user_id))
+        except Exception as e:
+            logger.warning(f"⚠️ User cache invalidation failed for {user_id}: {str(e)}")
+
+    def _store_local(self, user_id: str, data: Dict[str, Any]) -> None:
+        self._local[user_id] = (time.monotonic() + LOCAL_TTL_SECONDS, data)
+        self._local.move_to_end(user_id)
+        while len(self._local) > LOCAL_MAX_ENTRIES:
+            self._local.popitem(last=False)
+
+
+# Singleton instance
+user_cache = UserCache()
@@ -0,0 +1,129 @@
+"""
+User dashboard statistics.
+
+Counts come from the denormalised `user_counters` row, incremented in the
+transaction that creates (or settles, deletes) the counted rows; accuracy
+from the prediction rollups; the recent analyses from a column-projected
+top-5 query. The assembled stats are cached per user and invalidated
+after every counter change; stats read from a replica are not cached, as
+the replica may not have the change that caused the invalidation yet.
+"""
+from datetime import datetime
+from typing import Any, Dict, Mapping
+
+from sqlalchemy import case, func, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logger import get_logger
+from app.db.session import is_replica
+from app.models import Coupon, CouponStatus, MatchAnalysis, UserCounters
+from app.services.cache_service import cache_service
+from app.services.stats.prediction_stats import prediction_stats_service
+
+logger = get_logger('services.user_stats')
+
+STATS_CACHE_KEY = "user_stats:{user_id}"
+STATS_CACHE_TTL = 300
+COUNTERS = ("analyses_count", "coupons_count", "coupons_won")
+RECENT_ANALYSES = 5
+
+
+class UserStatsService:
+    """Maintains the per-user counters and serves the dashboard stats."""
+
+    async def increment(self, db: AsyncSession, user_id: str, **deltas: int) -> None:
+        """Add to a user's counters in the caller's transaction (commit and `invalidate` are up to the caller)."""
+        await self.increment_many(db, {user_id: deltas})
+
+    async def increment_many(self, db: AsyncSession, deltas: Mapping[str, Mapping[str, int]]) -> None:
+        """Add to the counters of several users in one upsert."""
+        rows = [
+            {"user_id": user_id, **{c: int(d.get(c, 0)) for c in COUNTERS}, "updated_at": datetime.utcnow()}
+            for user_id, d in deltas.items()
+            if user_id
+        ]
+        if not rows:
+            return
+        stmt = insert(UserCounters).values(rows)
+        await db.execute(stmt.on_duplicate_key_update(
+            analyses_count=UserCounters.analyses_count + stmt.inserted.analyses_count,
+            coupons_count=UserCounters.coupons_count + stmt.inserted.coupons_count,
+            coupons_won=UserCounters.coupons_won + stmt.inserted.coupons_won,
+            updated_at=stmt.inserted.updated_at,
+        ))
+
+    async def invalidate(self, *user_ids: str) -> None:
+        for user_id in user_ids:
+            if user_id:
+                await cache_service.delete(STATS_CACHE_KEY.format(user_id=user_id))
+
+    async def _counters(self, db: AsyncSession, user_id: str) -> Dict[str, int]:
+        """Counters row of a user, COUNT/SUM aggregates when it does not exist yet."""
+        counters = await db.get(UserCounters, user_id)
+        if counters is not None:
+            return {c: getattr(counters, c) for c in COUNTERS}
+
+        analyses_count = await db.scalar(
+            select(func.count()).select_from(MatchAnalysis).where(MatchAnalysis.user_id == user_id)
+        )
+        coupons_count, coupons_won = (await db.execute(
+            select(
+                func.count(),
+                func.coalesce(func.sum(case((Coupon.status == CouponStatus.WON.value, 1), else_=0)), 0)
+            ).where(Coupon.user_id == user_id)
+        )).one()
+        # Pas de ligne : aucun compteur incrémenté depuis la migration (lecture seule, réplica possible)
+        return {"analyses_count": analyses_count or 0, "coupons_count": coupons_count, "coupons_won": int(coupons_won)}
+
+    async def get_stats(self, db: AsyncSession, user_id: str) -> Dict[str, Any]:
+        """Dashboard stats of a user (cached)."""
+        key = STATS_CACHE_KEY.format(user_id=user_id)
+        cached = await cache_service.get(key)
+        if cached:
+            return cached
+
+        counters = await self._counters(db, user_id)
+        accuracy = await prediction_stats_service.get(db, "user", str(user_id))
+        recent = await db.execute(
+            select(
+                MatchAnalysis.id,
+                MatchAnalysis.home_team,
+                MatchAnalysis.away_team,
+                MatchAnalysis.league_name,
+                MatchAnalysis.predicted_outcome,
+                MatchAnalysis.confidence_score,
+                MatchAnalysis.created_at
+            )
+            .where(MatchAnalysis.user_id == user_id)
+            .order_by(MatchAnalysis.created_at.desc())
+            .limit(RECENT_ANALYSES)
+        )
+
+        stats = {
+            "total_analyses": counters["analyses_count"],
+            "success_rate": round(accuracy["hit_rate"] * 100, 1) if accuracy else 0,
+            "settled_analyses": accuracy["predictions"] if accuracy else 0,
+            "brier_score": accuracy["brier"] if accuracy else None,
+            "total_coupons": counters["coupons_count"],
+            "validated_coupons": counters["coupons_won"],
+            "recent_analyses": [
+                {
+                    "id": str(row.id),
+                    "home_team": row.home_team,
+                    "away_team": row.away_team,
+                    "league_name": row.league_name,
+                    "predicted_outcome": row.predicted_outcome,
+                    "confidence_score": row.confidence_score,
+                    "created_at": row.created_at.isoformat()
+                }
+                for row in recent.all()
+            ]
+        }
+        if not is_replica(db):
+            await cache_service.set(key, stats, STATS_CACHE_TTL)
+        return stats
+
+
+# Singleton instance
+user_stats_service = UserStatsService()
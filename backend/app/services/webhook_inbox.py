@@ -0,0 +1,266 @@
+"""
+Durable inbox of the payment providers webhooks.
+
+The webhook endpoints only verify the signature and store the event
+(`store`), then answer at once: a slow database no longer makes Stripe or
+Moneroo time out and deliver the same event again. A worker (`process`)
+applies the stored events in arrival order, the events of one customer
+strictly one after the other, loading the users of a batch in one query
+and committing the batch with the events marked processed. A retried
+delivery hits the (provider, event_id) unique key and is ignored.
+"""
+import hashlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Set
+
+from sqlalchemy import or_, select
+from sqlalchemy.dialects.mysql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import get_settings
+from app.core.logger import get_logger
+from app.core.metrics import metrics
+from app.models import User, SubscriptionType, WebhookEvent, WebhookEventStatus
+from app.services.cache_service import cache_service
+from app.services.user_cache import user_cache
+
+settings = get_settings()
+logger = get_logger('services.webhook_inbox')
+
+WEBHOOK_LOCK_KEY = "webhook_inbox:lock"
+LIFETIME_DAYS = 36500  # 100 ans
+MONEROO_PERIOD_DAYS = 30
+
+
+class _UserIndex:
+    """Users of a batch, by id and by Stripe customer id."""
+
+    def __init__(self, users: List[User]):
+        self.by_id = {u.id: u for u in users}
+        self.by_customer = {u.stripe_customer_id: u for u in users if u.stripe_customer_id}
+
+    def link_customer(self, user: User, customer_id: Optional[str]) -> None:
+        if customer_id:
+            self.by_customer[customer_id] = user
+
+
+def _stripe_object(payload: Dict[str, Any]) -> Dict[str, Any]:
+    return payload.get("data", {}).get("object", {}) or {}
+
+
+def _metadata(obj: Dict[str, Any]) -> Dict[str, Any]:
+    return obj.get("metadata") or {}
+
+
+class WebhookInbox:
+    """Storage of verified webhook events and their in-order application."""
+
+    # ---- Réception ----
+
+    async def store(self, db: AsyncSession, provider: str, payload: Dict[str, Any], raw: bytes) -> bool:
+        """Store a verified event; False if this event was already received."""
+        if provider == "stripe":
+            obj = _stripe_object(payload)
+            event_id = payload.get("id") or hashlib.sha256(raw).hexdigest()
+            event_type = payload.get("type", "")
+            customer_key = obj.get("customer") or _metadata(obj).get("user_id") or event_id
+        else:
+            data = payload.get("data", {}) or {}
+            event_type = payload.get("event", "")
+            # Moneroo n'envoie pas d'identifiant d'événement : paiement + type
+            event_id = f"{event_type}:{data['id']}" if data.get("id") else hashlib.sha256(raw).hexdigest()
+            customer_key = _metadata(data).get("user_id") or event_id
+
+        result = await db.execute(
+            insert(WebhookEvent)
+            .prefix_with("IGNORE")
+            .values(
+                provider=provider,
+                event_id=str(event_id),
+                event_type=event_type[:100],
+                customer_key=str(customer_key)[:255],
+                payload=payload,
+                status=WebhookEventStatus.PENDING.value,
+                attempts=0,
+                received_at=datetime.utcnow()
+            )
+        )
+        await db.commit()
+
+        stored = result.rowcount > 0
+        metrics.incr("webhooks.received", provider=provider, duplicate=str(not stored).lower())
+        logger.info(
+            f"📥 Webhook {provider} {event_type} {'stored' if stored else 'already received'}",
+            extra={'extra_data': {'provider': provider, 'event_id': event_id, 'customer_key': customer_key}}
+        )
+        return stored
+
+    # ---- Traitement ----
+
+    async def acquire(self) -> bool:
+        """Single worker at a time, so a customer's events are never applied concurrently."""
+        r = await cache_service.get_redis()
+        return bool(await r.set(WEBHOOK_LOCK_KEY, "1", nx=True, ex=settings.webhook_lock_seconds))
+
+    async def release(self) -> None:
+        r = await cache_service.get_redis()
+        await r.delete(WEBHOOK_LOCK_KEY)
+
+    async def process(self, db: AsyncSession) -> int:
+        """Apply the pending events, batch by batch; returns the number processed."""
+        processed = 0
+        last_id = 0
+        # Clients dont un événement a échoué : leurs suivants attendent le prochain passage
+        blocked: Set[str] = set()
+        while True:
+            events: List[WebhookEvent] = list((await db.execute(
+                select(WebhookEvent)
+                .where(WebhookEvent.status == WebhookEventStatus.PENDING.value, WebhookEvent.id > last_id)
+                .order_by(WebhookEvent.id)
+                .limit(settings.webhook_batch_size)
+            )).scalars().all())
+            if not events:
+                break
+            last_id = events[-1].id
+            processed += await self._process_batch(db, events, blocked)
+            if len(events) < settings.webhook_batch_size:
+                break
+        return processed
+
+    async def _process_batch(self, db: AsyncSession, events: List[WebhookEvent], blocked: Set[str]) -> int:
+        user_ids: Set[str] = set()
+        customer_ids: Set[str] = set()
+        for event in events:
+            obj = _stripe_object(event.payload) if event.provider == "stripe" else event.payload.get("data", {}) or {}
+            if _metadata(obj).get("user_id"):
+                user_ids.add(str(_metadata(obj)["user_id"]))
+            if event.provider == "stripe" and obj.get("customer"):
+                customer_ids.add(obj["customer"])
+
+        # Tous les utilisateurs du lot en une requête
+        users = (await db.execute(
+            select(User).where(or_(User.id.in_(user_ids), User.stripe_customer_id.in_(customer_ids)))
+        )).scalars().all() if user_ids or customer_ids else []
+        index = _UserIndex(list(users))
+
+        now = datetime.utcnow()
+        touched: Set[str] = set()
+        processed = 0
+        for event in events:
+            if event.customer_key in blocked:
+                continue
+            event.attempts += 1
+            try:
+                if event.provider == "stripe":
+                    user = self._apply_stripe(event, index)
+                else:
+                    user = self._apply_moneroo(event, index)
+            except Exception as e:
+                event.last_error = str(e)[:2000]
+                metrics.incr("webhooks.errors", provider=event.provider, event_type=event.event_type)
+                if event.attempts >= settings.webhook_max_attempts:
+                    event.status = WebhookEventStatus.FAILED.value
+                    logger.error(
+                        f"❌ Webhook {event.provider} {event.event_type} failed {event.attempts} times, skipped: {str(e)}",
+                        extra={'extra_data': {'event_id': event.event_id, 'customer_key': event.customer_key}}
+                    )
+                else:
+                    blocked.add(event.customer_key)
+                    logger.warning(f"⚠️ Webhook {event.provider} {event.event_type} failed, will retry: {str(e)}")
+                continue
+
+            event.status = WebhookEventStatus.PROCESSED.value
+            event.processed_at = now
+            event.last_error = None
+            processed += 1
+            if user is not None:
+                touched.add(user.id)
+
+        try:
+            await db.commit()
+        except Exception:
+            await db.rollback()
+            raise
+
+        for user_id in touched:
+            await user_cache.invalidate(user_id)
+        metrics.incr("webhooks.processed", processed)
+        for event in events:
+            if event.status == WebhookEventStatus.PROCESSED.value:
+                metrics.observe(
+                    "webhooks.delay_ms",
+                    (event.processed_at - event.received_at).total_seconds() * 1000,
+                    provider=event.provider
+                )
+        return processed
+
+    def _apply_stripe(self, event: WebhookEvent, index: _UserIndex) -> Optional[User]:
+        obj = _stripe_object(event.payload)
+        customer_id = obj.get("customer")
+
+        # Handle checkout.session.completed
+        if event.event_type == "checkout.session.completed":
+            user_id = _metadata(obj).get("user_id")
+            plan_type = _metadata(obj).get("plan_type")
+            user = index.by_id.get(str(user_id)) if user_id and plan_type else None
+            if user:
+                user.subscription = plan_type.lower()
+                user.stripe_customer_id = customer_id
+                user.stripe_subscription_id = obj.get("subscription")
+                user.payment_method = 'stripe'  # Stripe = renouvellement automatique
+                # Lifetime: 100 years; for subscriptions, expiration is managed by Stripe
+                if plan_type.lower() == "lifetime":
+                    user.subscription_expires_at = event.received_at + timedelta(days=LIFETIME_DAYS)
+                else:
+                    user.subscription_expires_at = None
+                index.link_customer(user, customer_id)
+                logger.info(f"User {user_id} upgraded to {plan_type}")
+            return user
+
+        user = index.by_customer.get(customer_id) if customer_id else None
+        if user is None:
+            return None
+
+        # Handle subscription updated (renewal, change)
+        if event.event_type == "customer.subscription.updated":
+            status = obj.get("status")
+            if status == "active" or (status in ["canceled", "unpaid", "past_due"] and obj.get("cancel_at_period_end")):
+                user.subscription_expires_at = datetime.fromtimestamp(obj["current_period_end"])
+            logger.info(f"Subscription updated for customer {customer_id}: {status}")
+
+        # Handle subscription deleted (cancellation): downgrade to free
+        elif event.event_type == "customer.subscription.deleted":
+            user.subscription = SubscriptionType.FREE.value
+            user.subscription_expires_at = None
+            user.stripe_subscription_id = None
+            logger.info(f"Subscription canceled for customer {customer_id}")
+
+        # Handle payment failed
+        elif event.event_type == "invoice.payment_failed":
+            logger.warning(f"Payment failed for user {user.id} ({user.email})")
+            return None
+
+        else:
+            return None
+        return user
+
+    def _apply_moneroo(self, event: WebhookEvent, index: _UserIndex) -> Optional[User]:
+        if event.event_type != "payment.success":
+            return None
+
+        metadata = _metadata(event.payload.get("data", {}) or {})
+        user_id = metadata.get("user_id")
+        plan_type = metadata.get("plan_type")
+        user = index.by_id.get(str(user_id)) if user_id and plan_type else None
+        if user:
+            user.subscription = plan_type.lower()
+            user.payment_method = 'moneroo'  # Moneroo = renouvellement MANUEL
+            # Lifetime: 100 years; otherwise monthly MANUAL payment, 30 days from the payment
+            days = LIFETIME_DAYS if plan_type.lower() == "lifetime" else MONEROO_PERIOD_DAYS
+            user.subscription_expires_at = event.received_at + timedelta(days=days)
+            logger.info(f"User {user_id} upgraded to {plan_type} via Moneroo")
+        return user
+
+
+# Singleton instance
+webhook_inbox = WebhookInbox()
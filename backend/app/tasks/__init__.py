@@ -1,6 +1,20 @@
 from app.tasks.email import send_otp_email, send_reset_password_email
+from app.tasks.results import rebuild_prediction_stats, settle_results, sync_match_results
+from app.tasks.value_bets import scan_value_bets
+from app.tasks.odds import poll_odds
+from app.tasks.coupons import generate_daily_coupons
+from app.tasks.quota import flush_analysis_quotas
+from app.tasks.webhooks import process_webhook_events
 
 __all__ = [
     "send_otp_email",
     "send_reset_password_email",
+    "sync_match_results",
+    "settle_results",
+    "rebuild_prediction_stats",
+    "scan_value_bets",
+    "poll_odds",
+    "generate_daily_coupons",
+    "flush_analysis_quotas",
+    "process_webhook_events",
 ]
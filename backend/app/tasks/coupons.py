@@ -0,0 +1,88 @@
+"""
+Tâche Celery de génération des coupons du jour.
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from celery import shared_task
+
+from app.core.config import get_settings
+from app.db.session import async_session_maker, dispose_engines
+from app.providers import get_football_provider
+from app.services.analysis.daily_coupons import daily_coupon_generator
+from app.services.cache_service import cache_service
+from app.services.stats import goals_model_service
+from app.tasks.value_bets import fetch_odds, latest_ai_probabilities
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def _generate_daily_coupons(force: bool) -> Dict[str, Any]:
+    day = datetime.utcnow().strftime("%Y-%m-%d")
+    if force:
+        await daily_coupon_generator.release(day, done=False)
+    if not await daily_coupon_generator.acquire(day):
+        return {"day": day, "skipped": True, "coupons": 0}
+
+    done = False
+    try:
+        provider = get_football_provider()
+        horizon = time.time() + settings.daily_coupons_horizon_hours * 3600
+        fixtures: List[Dict[str, Any]] = [
+            f for f in await provider.get_fixtures(next=settings.value_scan_max_fixtures)
+            if f.get("fixture", {}).get("status", {}).get("short") == "NS"
+            and datetime.fromisoformat(f["fixture"]["date"].replace("Z", "+00:00")).timestamp() <= horizon
+        ]
+        fixture_ids = [f["fixture"]["id"] for f in fixtures]
+
+        odds_by_fixture, predictions, ai_probabilities = await asyncio.gather(
+            fetch_odds(fixture_ids),
+            goals_model_service.predict_many(
+                [(f["teams"]["home"]["id"], f["teams"]["away"]["id"]) for f in fixtures]
+            ),
+            latest_ai_probabilities(fixture_ids)
+        )
+        coupons = daily_coupon_generator.build(
+            fixtures,
+            odds_by_fixture,
+            [p if p and p["known_teams"] else None for p in predictions],
+            [ai_probabilities.get(fixture_id) for fixture_id in fixture_ids]
+        )
+        if coupons:
+            async with async_session_maker() as db:
+                await daily_coupon_generator.save(db, coupons)
+            done = True
+        return {"day": day, "skipped": False, "coupons": len(coupons), "fixtures": len(fixtures)}
+    finally:
+        if done:
+            await daily_coupon_generator.release(day, done)
+        # Aucun coupon (cotes pas encore collectées...) ou échec : le verrou expire
+        # et le passage suivant de Celery Beat régénère la journée
+
+
+async def _run(force: bool) -> Dict[str, Any]:
+    try:
+        return await _generate_daily_coupons(force)
+    finally:
+        # Connexions liées à la boucle asyncio de cette exécution
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="generate_daily_coupons")
+def generate_daily_coupons(force: bool = False):
+    """
+    Génère les coupons Sûr / Équilibré / Ambitieux du jour (une fois par jour,
+    verrou Redis partagé entre les workers). Lancée toutes les 30 minutes le
+    matin : les passages suivant une génération réussie sont ignorés.
+    """
+    summary = asyncio.run(_run(force))
+    if summary["skipped"]:
+        logger.info(f"Daily coupons of {summary['day']} already generated or in progress")
+    else:
+        logger.info(f"Daily coupons of {summary['day']}: {summary['coupons']} generated from {summary['fixtures']} fixtures")
+    return summary
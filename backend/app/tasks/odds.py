@@ -0,0 +1,92 @@
+"""
+Tâche Celery de collecte des cotes (historique et cache des cotes).
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Any, Dict, List
+
+from celery import shared_task
+
+from app.core.config import get_settings
+from app.providers import get_football_provider
+from app.services.cache_service import cache_service, CACHE_TTL
+from app.services.stats.odds_history import odds_history_service, poll_interval
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FIXTURES_KEY = "odds_poll:fixtures"
+LAST_POLL_KEY = "odds_poll:last"
+# Requêtes de cotes simultanées (scraping)
+ODDS_CONCURRENCY = 4
+
+
+def _kickoff(fixture: Dict[str, Any]) -> float:
+    return datetime.fromisoformat(fixture["fixture"]["date"].replace("Z", "+00:00")).timestamp()
+
+
+async def _poll_odds() -> Dict[str, int]:
+    provider = get_football_provider()
+    fixtures: List[Dict[str, Any]] = await cache_service.get(FIXTURES_KEY) or []
+    if not fixtures:
+        fixtures = await provider.get_fixtures(next=settings.value_scan_max_fixtures)
+        await cache_service.set(FIXTURES_KEY, fixtures, CACHE_TTL["fixtures"] * 4)
+
+    r = await cache_service.get_redis()
+    now = time.time()
+    fixture_ids = [str(f["fixture"]["id"]) for f in fixtures]
+    last_polls = await r.hmget(LAST_POLL_KEY, fixture_ids) if fixture_ids else []
+
+    # Fréquence de collecte selon la proximité du coup d'envoi
+    due = []
+    for fixture, last_poll in zip(fixtures, last_polls):
+        interval = poll_interval(_kickoff(fixture) - now)
+        if interval is not None and now - float(last_poll or 0) >= interval:
+            due.append((fixture, interval))
+
+    semaphore = asyncio.Semaphore(ODDS_CONCURRENCY)
+
+    async def poll(fixture: Dict[str, Any], interval: int) -> bool:
+        fixture_id = fixture["fixture"]["id"]
+        async with semaphore:
+            try:
+                # Noms des équipes déjà connus : pas de nouvel appel à l'API des matchs (quota)
+                odds = await provider.get_fixture_odds(fixture)
+            except Exception as e:
+                logger.error(f"Failed to poll odds for fixture {fixture_id}: {e}")
+                return False
+        if not odds:
+            # Pas de cotes (erreur, quota) : la collecte sera retentée au prochain passage
+            return False
+        await r.hset(LAST_POLL_KEY, str(fixture_id), now)
+        # Le cache reste valide jusqu'à la prochaine collecte : pas de scraping à la demande
+        await cache_service.set(f"odds:{fixture_id}", odds, max(CACHE_TTL["odds"], interval + 300))
+        return await odds_history_service.append(fixture_id, odds, now)
+
+    changed = await asyncio.gather(*(poll(fixture, interval) for fixture, interval in due))
+    await r.expire(LAST_POLL_KEY, 14 * 86400)
+    return {"fixtures": len(fixtures), "polled": len(due), "changed": sum(changed)}
+
+
+async def _run() -> Dict[str, int]:
+    try:
+        return await _poll_odds()
+    finally:
+        # Connexions liées à la boucle asyncio de cette exécution
+        await cache_service.close()
+
+
+@shared_task(name="poll_odds")
+def poll_odds():
+    """
+    Collecte les cotes des matchs à venir, plus souvent à l'approche du coup
+    d'envoi (toutes les `odds_poll_tick_minutes` via Celery Beat).
+    """
+    summary = asyncio.run(_run())
+    logger.info(
+        f"Odds polled: {summary['polled']}/{summary['fixtures']} fixtures due, "
+        f"{summary['changed']} lines moved"
+    )
+    return summary
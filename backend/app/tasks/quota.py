@@ -0,0 +1,34 @@
+"""
+Tâche Celery de recopie des quotas d'analyses (Redis) dans la table users.
+"""
+import asyncio
+import logging
+
+from celery import shared_task
+
+from app.db.session import async_session_maker, dispose_engines
+from app.services.analysis_quota import analysis_quota_service
+from app.services.cache_service import cache_service
+
+logger = logging.getLogger(__name__)
+
+
+async def _flush() -> int:
+    try:
+        async with async_session_maker() as db:
+            return await analysis_quota_service.flush(db)
+    finally:
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="flush_analysis_quotas")
+def flush_analysis_quotas():
+    """
+    Recopie les compteurs d'analyses du jour modifiés dans users.daily_analyses_used.
+    À exécuter toutes les minutes via Celery Beat.
+    """
+    flushed = asyncio.run(_flush())
+    if flushed:
+        logger.info(f"Analysis quotas flushed for {flushed} users")
+    return flushed
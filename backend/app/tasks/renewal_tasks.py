@@ -5,7 +5,8 @@ from celery import shared_task
 import logging
 from datetime import datetime
 
-from app.db.session import async_session_maker
+from app.db.session import async_session_maker, dispose_engines
+from app.services.cache_service import cache_service
 from app.services.renewal_service import renewal_reminder_service
 from app.services.email_service import send_email
 
@@ -24,50 +25,54 @@ def send_renewal_reminders_task(days_before: int = 7):
     import asyncio
     
     async def _send_reminders():
-        async with async_session_maker() as db:
-            users = await renewal_reminder_service.get_users_needing_renewal_reminder(
-                db, days_before_expiration=days_before
-            )
+        try:
+            async with async_session_maker() as db:
+                users = await renewal_reminder_service.get_users_needing_renewal_reminder(
+                    db, days_before_expiration=days_before
+                )
             
-            sent_count = 0
-            failed_count = 0
+                sent_count = 0
+                failed_count = 0
             
-            for user in users:
-                try:
-                    # Calculer les jours restants
-                    if user.subscription_expires_at:
-                        days_remaining = (user.subscription_expires_at - datetime.utcnow()).days
-                    else:
-                        continue
+                for user in users:
+                    try:
+                        # Calculer les jours restants
+                        if user.subscription_expires_at:
+                            days_remaining = (user.subscription_expires_at - datetime.utcnow()).days
+                        else:
+                            continue
                     
-                    # URL de renouvellement
-                    renewal_url = f"https://footgenius.com/pricing?renew={user.subscription}"
+                        # URL de renouvellement
+                        renewal_url = f"https://footgenius.com/pricing?renew={user.subscription}"
                     
-                    # Générer l'email
-                    subject = renewal_reminder_service.get_renewal_email_subject(lang='fr')
-                    body = renewal_reminder_service.get_renewal_email_body(
-                        user=user,
-                        days_remaining=days_remaining,
-                        renewal_url=renewal_url,
-                        lang='fr'
-                    )
+                        # Générer l'email
+                        subject = renewal_reminder_service.get_renewal_email_subject(lang='fr')
+                        body = renewal_reminder_service.get_renewal_email_body(
+                            user=user,
+                            days_remaining=days_remaining,
+                            renewal_url=renewal_url,
+                            lang='fr'
+                        )
                     
-                    # Envoyer l'email (via tâche Celery)
-                    send_email.delay(
-                        to_email=user.email,
-                        subject=subject,
-                        html_content=body
-                    )
+                        # Envoyer l'email (via tâche Celery)
+                        send_email.delay(
+                            to_email=user.email,
+                            subject=subject,
+                            html_content=body
+                        )
                     
-                    sent_count += 1
-                    logger.info(f"Renewal reminder sent to {user.email} ({days_remaining} days remaining)")
+                        sent_count += 1
+                        logger.info(f"Renewal reminder sent to {user.email} ({days_remaining} days remaining)")
                     
-                except Exception as e:
-                    failed_count += 1
-                    logger.error(f"Failed to send renewal reminder to {user.email}: {e}")
+                    except Exception as e:
+                        failed_count += 1
+                        logger.error(f"Failed to send renewal reminder to {user.email}: {e}")
             
-            logger.info(f"Renewal reminders: {sent_count} sent, {failed_count} failed")
-            return {"sent": sent_count, "failed": failed_count}
+                logger.info(f"Renewal reminders: {sent_count} sent, {failed_count} failed")
+                return {"sent": sent_count, "failed": failed_count}
+        finally:
+            # Connexions MySQL liées à la boucle de ce asyncio.run
+            await dispose_engines()
     
     return asyncio.run(_send_reminders())
 
@@ -81,10 +86,15 @@ def downgrade_expired_subscriptions_task():
     import asyncio
     
     async def _downgrade():
-        async with async_session_maker() as db:
-            count = await renewal_reminder_service.downgrade_expired_subscriptions(db)
-            logger.info(f"Downgraded {count} expired Mobile Money subscriptions")
-            return {"downgraded": count}
+        try:
+            async with async_session_maker() as db:
+                count = await renewal_reminder_service.downgrade_expired_subscriptions(db)
+                logger.info(f"Downgraded {count} expired Mobile Money subscriptions")
+                return {"downgraded": count}
+        finally:
+            # Connexion Redis liée à la boucle de ce asyncio.run (invalidation des snapshots)
+            await cache_service.close()
+            await dispose_engines()
     
     return asyncio.run(_downgrade())
 
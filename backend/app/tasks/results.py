@@ -0,0 +1,198 @@
+"""
+Tâches Celery des résultats de matchs et du modèle statistique.
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple
+
+from celery import shared_task
+from sqlalchemy import case, or_
+from sqlalchemy.dialects.mysql import insert
+
+from app.core.config import get_settings
+from app.db.session import async_session_maker, dispose_engines
+from app.models import MatchResult
+from app.providers import get_football_provider
+from app.services.cache_service import cache_service
+from app.services.settlement_service import settlement_service
+from app.services.stats import elo_service, goals_model_service, prediction_stats_service
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+FINISHED_STATUSES = {"FT", "AET", "PEN"}
+# Matchs reportés / annulés / arrêtés : sélections remboursées
+VOID_STATUSES = {"PST", "CANC", "ABD"}
+# Plage maximale d'une requête de matchs (Football-Data.org)
+FETCH_RANGE_DAYS = 10
+
+
+def _result_row(fixture: Dict[str, Any]) -> Dict[str, Any] | None:
+    """Row of match_results for a finished fixture (score after 90 minutes), None otherwise."""
+    status = fixture.get("fixture", {}).get("status", {}).get("short")
+    # Les buts de la prolongation ne comptent pas pour le 1X2 ni pour les modèles
+    goals = fixture.get("score", {}).get("fulltime") or {}
+    if goals.get("home") is None:
+        goals = fixture.get("goals", {})
+    if status not in FINISHED_STATUSES or goals.get("home") is None or goals.get("away") is None:
+        return None
+    home, away = fixture["teams"]["home"], fixture["teams"]["away"]
+    if not home.get("id") or not away.get("id"):
+        return None
+    return {
+        "fixture_id": fixture["fixture"]["id"],
+        "league_id": fixture.get("league", {}).get("id") or 0,
+        "league_name": fixture.get("league", {}).get("name") or "",
+        "match_date": datetime.fromisoformat(
+            fixture["fixture"]["date"].replace("Z", "+00:00")
+        ).replace(tzinfo=None),
+        "home_team_id": home["id"],
+        "home_team": home.get("name") or "",
+        "away_team_id": away["id"],
+        "away_team": away.get("name") or "",
+        "home_goals": goals["home"],
+        "away_goals": goals["away"],
+    }
+
+
+async def _fetch_results(provider, days_back: int) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Finished fixtures (match_results rows) and voided fixture ids of the last days, one query per range."""
+    today = datetime.utcnow().date()
+    rows: List[Dict[str, Any]] = []
+    void_ids: List[int] = []
+    end = today
+    start = today - timedelta(days=days_back)
+    while end >= start:
+        range_start = max(start, end - timedelta(days=FETCH_RANGE_DAYS - 1))
+        try:
+            fixtures = await provider.get_fixtures(
+                date_from=range_start.strftime("%Y-%m-%d"),
+                date_to=end.strftime("%Y-%m-%d")
+            )
+        except Exception as e:
+            logger.error(f"Failed to fetch fixtures from {range_start} to {end}: {e}")
+            fixtures = []
+        for fixture in fixtures:
+            row = _result_row(fixture)
+            if row:
+                rows.append(row)
+            elif fixture.get("fixture", {}).get("status", {}).get("short") in VOID_STATUSES:
+                void_ids.append(fixture["fixture"]["id"])
+        end = range_start - timedelta(days=1)
+    return rows, void_ids
+
+
+async def _store_results(db, rows: List[Dict[str, Any]]) -> None:
+    if not rows:
+        return
+    stmt = insert(MatchResult).values(rows)
+    # updated_at avant les scores : MySQL évalue les affectations dans l'ordre
+    stmt = stmt.on_duplicate_key_update([
+        ("updated_at", case(
+            (
+                or_(
+                    MatchResult.home_goals != stmt.inserted.home_goals,
+                    MatchResult.away_goals != stmt.inserted.away_goals
+                ),
+                datetime.utcnow()
+            ),
+            else_=MatchResult.updated_at
+        )),
+        ("home_goals", stmt.inserted.home_goals),
+        ("away_goals", stmt.inserted.away_goals),
+    ])
+    await db.execute(stmt)
+    await db.commit()
+
+
+async def _sync_results(days_back: int) -> Dict[str, int]:
+    provider = get_football_provider()
+    rows, _ = await _fetch_results(provider, days_back)
+
+    async with async_session_maker() as db:
+        await _store_results(db, rows)
+        await elo_service.update_from_db(db)
+        model = await goals_model_service.fit_from_db(db)
+
+    precomputed = 0
+    if model is not None:
+        try:
+            upcoming = await provider.get_fixtures(next=100)
+            precomputed = await goals_model_service.precompute_upcoming(upcoming)
+        except Exception as e:
+            logger.error(f"Failed to precompute upcoming fixtures: {e}")
+
+    return {"results": len(rows), "precomputed": precomputed}
+
+
+async def _run(days_back: int) -> Dict[str, int]:
+    try:
+        return await _sync_results(days_back)
+    finally:
+        # Connexions liées à la boucle asyncio de cette exécution
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="sync_match_results")
+def sync_match_results(days_back: int | None = None):
+    """
+    Importe les résultats des derniers jours, met à jour les classements Elo,
+    réentraîne le modèle de buts et précalcule les probabilités des prochains matchs.
+    À exécuter quotidiennement via Celery Beat.
+    """
+    summary = asyncio.run(_run(days_back or settings.results_sync_days_back))
+    logger.info(
+        f"Match results synced: {summary['results']} results, "
+        f"{summary['precomputed']} upcoming fixtures precomputed"
+    )
+    return summary
+
+
+async def _settle(days_back: int) -> Dict[str, int]:
+    provider = get_football_provider()
+    rows, void_ids = await _fetch_results(provider, days_back)
+    scores = {row["fixture_id"]: (row["home_goals"], row["away_goals"]) for row in rows}
+    async with async_session_maker() as db:
+        await _store_results(db, rows)
+        return await settlement_service.settle(db, scores, void_ids)
+
+
+async def _run_settlement(days_back: int) -> Dict[str, int]:
+    try:
+        return await _settle(days_back)
+    finally:
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="settle_results")
+def settle_results(days_back: int | None = None):
+    """
+    Règle les analyses, sélections et coupons en attente à partir des matchs
+    terminés (ou annulés) des derniers jours. Idempotent : seules les lignes
+    encore en attente sont mises à jour.
+    """
+    summary = asyncio.run(_run_settlement(days_back or settings.settlement_days_back))
+    logger.info(
+        f"Results settled: {summary['analyses']} analyses, {summary['selections']} selections, "
+        f"{summary['coupons']} coupons over {summary['fixtures']} fixtures"
+    )
+    return summary
+
+
+async def _rebuild_stats() -> int:
+    try:
+        async with async_session_maker() as db:
+            return await prediction_stats_service.rebuild(db)
+    finally:
+        await dispose_engines()
+
+
+@shared_task(name="rebuild_prediction_stats")
+def rebuild_prediction_stats():
+    """Recalcule les statistiques de précision depuis les analyses réglées (rattrapage, réparation)."""
+    total = asyncio.run(_rebuild_stats())
+    logger.info(f"Prediction stats rebuilt from {total} settled analyses")
+    return total
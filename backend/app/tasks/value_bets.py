@@ -0,0 +1,97 @@
+"""
+Tâche Celery du scanner de value bets.
+"""
+import asyncio
+import logging
+from typing import Any, Dict, List
+
+from celery import shared_task
+from sqlalchemy import select
+
+from app.core.config import get_settings
+from app.db.session import async_session_maker, dispose_engines
+from app.models import MatchAnalysis
+from app.providers import get_football_provider
+from app.services.cache_service import cache_service
+from app.services.stats import goals_model_service
+from app.services.stats.value_scanner import rank_value_bets, store_value_bets
+
+logger = logging.getLogger(__name__)
+settings = get_settings()
+
+
+async def fetch_odds(fixture_ids: List[int]) -> List[List[Dict[str, Any]]]:
+    """
+    Odds of each fixture from the odds cache kept fresh by `poll_odds`, in
+    one round trip; a fixture not polled yet has no odds ([]) rather than
+    being scraped on demand.
+    """
+    cached = await cache_service.get_many([f"odds:{fixture_id}" for fixture_id in fixture_ids])
+    return [odds or [] for odds in cached]
+
+
+async def latest_ai_probabilities(fixture_ids: List[int]) -> Dict[int, Dict[str, float]]:
+    """1X2 probabilities of the latest AI analysis of each fixture (fallback analyses excluded)."""
+    async with async_session_maker() as db:
+        result = await db.execute(
+            select(
+                MatchAnalysis.fixture_id,
+                MatchAnalysis.prediction_home,
+                MatchAnalysis.prediction_draw,
+                MatchAnalysis.prediction_away
+            )
+            .where(MatchAnalysis.fixture_id.in_(fixture_ids), MatchAnalysis.from_ai_model())
+            .order_by(MatchAnalysis.created_at.asc())
+        )
+        return {
+            fixture_id: {"home": home, "draw": draw, "away": away}
+            for fixture_id, home, draw, away in result.all()
+        }
+
+
+async def _scan_value_bets() -> int:
+    provider = get_football_provider()
+    fixtures = await provider.get_fixtures(next=settings.value_scan_max_fixtures)
+    fixtures = [f for f in fixtures if f.get("fixture", {}).get("status", {}).get("short") == "NS"]
+    if not fixtures:
+        await store_value_bets([])
+        return 0
+
+    fixture_ids = [f["fixture"]["id"] for f in fixtures]
+    odds_by_fixture, predictions, ai_probabilities = await asyncio.gather(
+        fetch_odds(fixture_ids),
+        goals_model_service.predict_many(
+            [(f["teams"]["home"]["id"], f["teams"]["away"]["id"]) for f in fixtures]
+        ),
+        latest_ai_probabilities(fixture_ids)
+    )
+
+    value_bets = rank_value_bets(
+        fixtures,
+        odds_by_fixture,
+        [p if p and p["known_teams"] else None for p in predictions],
+        [ai_probabilities.get(fixture_id) for fixture_id in fixture_ids],
+        settings.value_bet_min_edge
+    )
+    await store_value_bets(value_bets)
+    return len(value_bets)
+
+
+async def _run() -> int:
+    try:
+        return await _scan_value_bets()
+    finally:
+        # Connexions liées à la boucle asyncio de cette exécution
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="scan_value_bets")
+def scan_value_bets():
+    """
+    Recalcule les value bets de tous les prochains matchs (toutes les
+    `value_scan_interval_minutes` via Celery Beat).
+    """
+    count = asyncio.run(_run())
+    logger.info(f"Value bets scanned: {count} value bets")
+    return count
@@ -0,0 +1,41 @@
+"""
+Tâche Celery d'application des webhooks de paiement stockés dans l'inbox.
+"""
+import asyncio
+import logging
+from typing import Any, Dict
+
+from celery import shared_task
+
+from app.db.session import async_session_maker, dispose_engines
+from app.services.cache_service import cache_service
+from app.services.webhook_inbox import webhook_inbox
+
+logger = logging.getLogger(__name__)
+
+
+async def _process() -> Dict[str, Any]:
+    try:
+        if not await webhook_inbox.acquire():
+            return {"skipped": True, "processed": 0}
+        try:
+            async with async_session_maker() as db:
+                return {"skipped": False, "processed": await webhook_inbox.process(db)}
+        finally:
+            await webhook_inbox.release()
+    finally:
+        await cache_service.close()
+        await dispose_engines()
+
+
+@shared_task(name="process_webhook_events")
+def process_webhook_events():
+    """
+    Applique les webhooks Stripe / Moneroo en attente, dans l'ordre de réception.
+    Déclenchée par chaque webhook reçu, et via Celery Beat en filet de sécurité
+    (un seul worker à la fois, verrou Redis).
+    """
+    summary = asyncio.run(_process())
+    if summary["processed"]:
+        logger.info(f"Webhook events processed: {summary['processed']}")
+    return summary
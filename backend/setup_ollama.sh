@@ -34,6 +34,11 @@ echo "📥 Téléchargement du modèle Mistral (7B)..."
 echo "⏳ Cela peut prendre 5-10 minutes selon votre connexion..."
 docker exec api-football-ollama-1 ollama pull mistral
 
+# Modèle rapide (chat, coupons) et modèle d'embeddings (cache sémantique du chat)
+echo "📥 Téléchargement du modèle rapide (llama3.2:3b) et du modèle d'embeddings (nomic-embed-text)..."
+docker exec api-football-ollama-1 ollama pull llama3.2:3b
+docker exec api-football-ollama-1 ollama pull nomic-embed-text
+
 # Vérifier que le modèle est installé
 echo "🔍 Vérification du modèle..."
 docker exec api-football-ollama-1 ollama list